@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Literal, Optional
+from datetime import date, datetime
+
+from app.db.session import get_db
+from app.services import reliability
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+GroupBy = Literal["asset", "category", "plant"]
+
+def _month_range(start: Optional[str], end: Optional[str]):
+    """[first month, month after the last) from YYYY-MM strings; defaults to the 12 months up to this one"""
+    def parse(value: str, name: str) -> date:
+        try:
+            return datetime.strptime(value, "%Y-%m").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"{name} must be a month as YYYY-MM")
+
+    last = parse(end, "end") if end else date.today().replace(day=1)
+    first = parse(start, "start") if start else date(last.year - 1, last.month, 1)
+    stop = reliability.month_end(last)
+    if first >= stop:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (stop.year - first.year) * 12 + stop.month - first.month > 120:
+        raise HTTPException(status_code=400, detail="At most 120 months")
+    return first, stop
+
+@router.get("/reliability")
+def read_reliability(
+    group_by: GroupBy = Query("category"),
+    start: Optional[str] = Query(None, description="First month, YYYY-MM (default 11 months before end)"),
+    end: Optional[str] = Query(None, description="Last month, YYYY-MM (default this month)"),
+    db: Session = Depends(get_db)
+):
+    """MTTR, MTBF, availability and backlog per asset, asset category or plant, from the monthly rollups"""
+    first, stop = _month_range(start, end)
+    return reliability.summary(db, group_by, first, stop)
+
+@router.get("/reliability/trend")
+def read_reliability_trend(
+    group_by: Optional[GroupBy] = Query(None, description="With group_id, limit to one asset, category or plant"),
+    group_id: Optional[int] = Query(None),
+    start: Optional[str] = Query(None, description="First month, YYYY-MM (default 11 months before end)"),
+    end: Optional[str] = Query(None, description="Last month, YYYY-MM (default this month)"),
+    db: Session = Depends(get_db)
+):
+    """The same KPIs month by month, for all assets or one group"""
+    if (group_by is None) != (group_id is None):
+        raise HTTPException(status_code=400, detail="Pass both group_by and group_id, or neither")
+    first, stop = _month_range(start, end)
+    return reliability.trend(db, first, stop, group_by, group_id)
+
+@router.post("/reliability/rebuild")
+def rebuild_reliability(db: Session = Depends(get_db)):
+    """Recompute the rollups from every work order, e.g. after importing history or editing data by hand"""
+    rows = reliability.rebuild(db)
+    db.commit()
+    return {"rollup_rows": rows}
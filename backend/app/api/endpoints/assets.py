@@ -1,14 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from decimal import Decimal
 from datetime import date
 
+from ...core.http_cache import cached_json_response
 from ...db.session import get_db
 from ...models.asset import Asset
 from ...models.location import Location
 from ...models.asset_category import AssetCategory
 from ...schemas.asset import Asset as AssetSchema, AssetCreate, AssetUpdate
+from ...services import filter_options
 
 router = APIRouter(prefix="/assets", tags=["assets"])
 
@@ -94,25 +96,10 @@ def get_assets(
     return query.all()
 
 @router.get("/filters")
-def get_asset_filters(db: Session = Depends(get_db)):
-    """Get unique values for filter dropdowns"""
-    # Get unique plants (location addresses)
-    plants = db.query(Location.address).distinct().all()
-    plants = [plant[0] for plant in plants if plant[0]]
-    
-    # Get unique asset categories
-    asset_categories = db.query(AssetCategory.name).distinct().all()
-    asset_categories = [cat[0] for cat in asset_categories if cat[0]]
-    
-    # Get unique statuses
-    statuses = db.query(Asset.status).distinct().all()
-    statuses = [status[0] for status in statuses if status[0]]
-    
-    return {
-        "plants": plants,
-        "asset_categories": asset_categories,
-        "statuses": statuses
-    }
+def get_asset_filters(request: Request, db: Session = Depends(get_db)):
+    """Get unique values for filter dropdowns (cached; honours If-None-Match)"""
+    _, body, etag = filter_options.assets.get(db)
+    return cached_json_response(request, body, etag)
 
 @router.get("/asset-categories/")
 def get_asset_categories(db: Session = Depends(get_db)):
@@ -167,6 +154,7 @@ def create_asset(asset: AssetCreate, db: Session = Depends(get_db)):
     db.add(db_asset)
     db.commit()
     db.refresh(db_asset)
+    filter_options.changed("assets")
     return db_asset
 
 @router.get("/{asset_id}", response_model=AssetSchema)
@@ -187,6 +175,7 @@ def update_asset(asset_id: int, asset: AssetUpdate, db: Session = Depends(get_db
     
     db.commit()
     db.refresh(db_asset)
+    filter_options.changed("assets")
     return db_asset
 
 @router.delete("/{asset_id}")
@@ -197,5 +186,6 @@ def delete_asset(asset_id: int, db: Session = Depends(get_db)):
     
     db.delete(asset)
     db.commit()
+    filter_options.changed("assets")
     return {"message": "Asset deleted successfully"}
 
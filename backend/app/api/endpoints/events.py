@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import List, Literal, Optional
+
+from app.core.events import feed
+from app.db.session import get_db
+from app.models.location import Location
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+HEARTBEAT_SECONDS = 15
+RETRY_MILLISECONDS = 3000
+
+@router.get("/")
+def stream_events(
+    request: Request,
+    location_id: Optional[List[int]] = Query(None, description="Only events of these locations (repeatable)"),
+    plant: Optional[str] = Query(None, description="Only events of locations whose address matches, as in the work order filters"),
+    topic: Optional[List[Literal["work_order", "balance"]]] = Query(None, description="Only these kinds of event (repeatable)"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    db: Session = Depends(get_db)
+):
+    """
+    Server-sent events for work orders (work_order.created, work_order.status_changed) and stock
+    balances (balance.changed), each with the location it belongs to. Browsers resume after the
+    last event they received; if that is no longer buffered, a `reset` event asks the client to
+    reload what it shows before following the stream again.
+    """
+    locations = set(location_id or ())
+    if plant:
+        locations.update(
+            row.id for row in db.query(Location.id).filter(Location.address.ilike(f"%{plant.strip()}%"))
+        )
+    # Not held for the life of the stream
+    db.close()
+    subscribed = bool(location_id or plant)
+    prefixes = tuple(f"{name}." for name in topic or ())
+
+    def wanted(event) -> bool:
+        if subscribed and event.location_id not in locations:
+            return False
+        return not prefixes or event.type.startswith(prefixes)
+
+    try:
+        position = int(last_event_id) if last_event_id else feed.last_id
+    except ValueError:
+        position = -1  # unknown id: reset
+
+    async def stream():
+        nonlocal position
+        yield f"retry: {RETRY_MILLISECONDS}\n\n"
+        while not await request.is_disconnected():
+            events, missed = feed.since(position)
+            if missed:
+                position = feed.last_id
+                yield f"id: {position}\nevent: reset\ndata: {{}}\n\n"
+                continue
+            if events:
+                position = events[-1].id
+                chunk = "".join(event.encode() for event in events if wanted(event))
+                if chunk:
+                    yield chunk
+                continue
+            if not await feed.wait(position, HEARTBEAT_SECONDS):
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.orm import Session
+
+from app.core.http_cache import cached_json_response
+from app.db.session import get_db
+from app.services import filter_options
+
+router = APIRouter(tags=["filters"])
+
+@router.get("/filters")
+def get_all_filters(request: Request, db: Session = Depends(get_db)):
+    """Filter options for the inventory, work order and asset views in one payload"""
+    body, etag = filter_options.combined(db)
+    return cached_json_response(request, body, etag)
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
 from datetime import datetime
 import os
 import platform
 
+from app.core import metrics
+
 router = APIRouter()
 
 # Version information
@@ -88,4 +91,11 @@ async def get_status():
             "status": "error",
             "error": str(e),
             "timestamp": datetime.now().isoformat(),
-        } 
\ No newline at end of file
+        } 
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Application counters (stock retries and version conflicts) in the Prometheus text format
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
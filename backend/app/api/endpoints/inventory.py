@@ -1,16 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, UploadFile, File, Form, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import case, or_, func
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel
+import csv
+import io
+import json
+from pydantic import BaseModel, Field
 
-from app.db.session import get_db
+from app.api.errors import STOCK_CONFLICT_RESPONSES, stock_conflict
+from app.core import cache
+from app.core.http_cache import cached_json_response
+from app.core.pagination import approximate_count, paginate, set_page_headers
+from app.db.session import get_db, SessionLocal
 from app.models.inventory import InventoryMaster, InventoryBalance, InventoryInflow
 from app.models.work_order import WorkOrderPart, WorkOrder
 from app.models.location import Location
 from app.models.user import User
 from app.models.transfer import TransferHeader, TransferItem
-from app.schemas.inventory import InventoryMaster as Inventory, InventoryMasterCreate
+from app.schemas.inventory import InventoryMaster as Inventory, InventoryMasterCreate, InventoryMasterUpdate
+from app.services import catalogue, filter_options, part_search
+from app.services.receipts import import_receipts
+from app.services.reorder import ReorderParameters, get_reorder_result, select_suggestions, suggestion_rows
+from app.services.ledger import balances_as_of
+from app.services.stock import StockConflict, execute_transfers, lock_balances, record_movements, run_stock_transaction
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
 
@@ -28,6 +42,10 @@ class TransferRequest(BaseModel):
     notes: Optional[str] = None
     items: List[TransferItemRequest]
 
+class BatchTransferRequest(BaseModel):
+    transfers: List[TransferRequest] = Field(..., min_length=1, max_length=1000)
+    atomic: bool = False  # reject the whole batch if any transfer fails
+
 class ReceivePartRequest(BaseModel):
     spare_part_id: int
     location_id: int
@@ -39,39 +57,39 @@ class ReceivePartRequest(BaseModel):
     unit_cost: Optional[float] = None
 
 @router.get("/", response_model=List[Inventory])
-def read_inventory(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    items = db.query(InventoryMaster).offset(skip).limit(limit).all()
-    return items
+def read_inventory(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor / X-Prev-Cursor of another page"),
+    limit: int = Query(100, ge=1, le=1000),
+    skip: int = Query(0, ge=0, deprecated=True, description="Offset; use cursor instead"),
+    include_total: bool = Query(False, description="Send X-Total-Count (estimated on large tables)"),
+    db: Session = Depends(get_db)
+):
+    query = db.query(InventoryMaster)
+    page = paginate(query, (InventoryMaster.id,), lambda item: [item.id], cursor, limit, skip)
+    set_page_headers(response, request, page, approximate_count(query) if include_total else None)
+    return page.rows
+
+@router.post("/", response_model=Inventory, status_code=status.HTTP_201_CREATED)
+def create_inventory_item(item: InventoryMasterCreate, db: Session = Depends(get_db)):
+    if db.query(InventoryMaster.id).filter(InventoryMaster.part_code == item.part_code).first():
+        raise HTTPException(status_code=400, detail=f"Part code {item.part_code} already exists")
+    
+    db_item = InventoryMaster(**item.dict())
+    db.add(db_item)
+    db.commit()
+    db.refresh(db_item)
+    cache.parts.invalidate([db_item.id])
+    filter_options.changed("parts")
+    part_search.index.add_parts([db_item])
+    return db_item
 
 @router.get("/filters")
-def get_inventory_filters(db: Session = Depends(get_db)):
-    """Get filter options for inventory"""
-    try:
-        # Get unique locations
-        locations = db.query(Location).distinct().all()
-        location_names = [loc.name for loc in locations]
-        
-        # Get unique asset categories
-        from app.models.asset_category import AssetCategory
-        asset_categories = db.query(AssetCategory).distinct().all()
-        category_names = [cat.name for cat in asset_categories]
-        
-        # Get unique categories from inventory_master
-        categories = db.query(InventoryMaster.category).distinct().filter(InventoryMaster.category.isnot(None)).all()
-        inventory_categories = [cat[0] for cat in categories]
-        
-        # Get unique criticality values
-        criticalities = db.query(InventoryMaster.criticality).distinct().filter(InventoryMaster.criticality.isnot(None)).all()
-        criticality_values = [crit[0] for crit in criticalities]
-        
-        return {
-            "locations": location_names,
-            "asset_categories": category_names,
-            "categories": inventory_categories,
-            "criticalities": criticality_values
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching filters: {str(e)}")
+def get_inventory_filters(request: Request, db: Session = Depends(get_db)):
+    """Get filter options for inventory (cached; honours If-None-Match)"""
+    _, body, etag = filter_options.inventory.get(db)
+    return cached_json_response(request, body, etag)
 
 @router.get("/locations")
 def get_locations(db: Session = Depends(get_db)):
@@ -80,75 +98,289 @@ def get_locations(db: Session = Depends(get_db)):
     return [{"id": loc.id, "name": loc.name} for loc in locations]
 
 @router.get("/transfers")
-def get_transfer_history(db: Session = Depends(get_db)):
-    """Get all transfer history"""
-    transfers = db.query(TransferHeader).order_by(TransferHeader.created_at.desc()).all()
+def get_transfer_history(
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor / X-Prev-Cursor of another page"),
+    date_from: Optional[datetime] = Query(None, description="Earliest transfer date"),
+    date_to: Optional[datetime] = Query(None, description="Latest transfer date"),
+    location_id: Optional[int] = Query(None, description="Transfers from or to this location"),
+    spare_part_id: Optional[int] = Query(None, description="Transfers containing this part"),
+    db: Session = Depends(get_db)
+):
+    """Get transfer history by transfer date, newest first, one page at a time"""
+    query = db.query(TransferHeader).options(selectinload(TransferHeader.transfer_items))
+    
+    if date_from:
+        query = query.filter(TransferHeader.transfer_date >= date_from)
+    
+    if date_to:
+        query = query.filter(TransferHeader.transfer_date <= date_to)
+    
+    if location_id:
+        query = query.filter(or_(
+            TransferHeader.from_location_id == location_id,
+            TransferHeader.to_location_id == location_id
+        ))
+    
+    if spare_part_id:
+        query = query.filter(TransferHeader.transfer_items.any(TransferItem.spare_part_id == spare_part_id))
+    
+    # Paged on the date the filters use, so back-dated transfers fall in place
+    page = paginate(
+        query,
+        (TransferHeader.transfer_date, TransferHeader.id),
+        lambda transfer: [transfer.transfer_date, transfer.id],
+        cursor,
+        limit,
+        descending=True
+    )
+    set_page_headers(response, request, page)
+    transfers = page.rows
+    
+    # Display names come from the process-wide dimension caches rather than joined relationships:
+    # a page needs no join or extra query for them, and the names are shared across requests
+    location_names = cache.locations.get_many(
+        db, [t.from_location_id for t in transfers] + [t.to_location_id for t in transfers]
+    )
+    user_names = cache.users.get_many(db, [t.transferred_by for t in transfers])
+    part_names = cache.parts.get_many(db, [item.spare_part_id for t in transfers for item in t.transfer_items])
     
     results = []
     for transfer in transfers:
-        # Get location names
-        from_location = db.query(Location).filter(Location.id == transfer.from_location_id).first()
-        to_location = db.query(Location).filter(Location.id == transfer.to_location_id).first()
-        transferred_by_user = db.query(User).filter(User.id == transfer.transferred_by).first()
-        
-        # Get transfer items
-        items = db.query(TransferItem).filter(TransferItem.transfer_id == transfer.id).all()
-        transfer_items = []
-        
-        for item in items:
-            part = db.query(InventoryMaster).filter(InventoryMaster.id == item.spare_part_id).first()
-            if part:
-                transfer_items.append({
-                    "part_code": part.part_code,
-                    "part_name": part.part_name,
-                    "quantity": item.quantity
-                })
-        
+        from_location = location_names.get(transfer.from_location_id)
+        to_location = location_names.get(transfer.to_location_id)
+        transferred_by = user_names.get(transfer.transferred_by)
         results.append({
             "id": transfer.id,
             "transfer_date": transfer.transfer_date.isoformat(),
-            "from_location_name": from_location.name if from_location else "Unknown",
-            "to_location_name": to_location.name if to_location else "Unknown",
-            "transferred_by": transferred_by_user.username if transferred_by_user else "Unknown",
+            "created_at": transfer.created_at.isoformat(),
+            "from_location_name": from_location["name"] if from_location else "Unknown",
+            "to_location_name": to_location["name"] if to_location else "Unknown",
+            "transferred_by": transferred_by["username"] if transferred_by else "Unknown",
             "status": transfer.status,
             "notes": transfer.notes,
-            "items": transfer_items
+            "items": [
+                {
+                    "part_code": part_names[item.spare_part_id]["part_code"],
+                    "part_name": part_names[item.spare_part_id]["part_name"],
+                    "quantity": item.quantity
+                }
+                for item in transfer.transfer_items
+                if item.spare_part_id in part_names
+            ]
         })
     
     return results
 
-@router.get("/receipts")
-def get_receipt_history(db: Session = Depends(get_db)):
-    """Get all receipt history"""
-    receipts = db.query(InventoryInflow).order_by(InventoryInflow.created_at.desc()).all()
+# Rows fetched per round trip when streaming receipts through a server-side cursor
+RECEIPT_STREAM_BATCH_SIZE = 1000
+
+RECEIPT_CSV_COLUMNS = [
+    "id", "received_date", "supplier", "reference_number", "location_name",
+    "received_by", "part_code", "part_name", "quantity", "unit_cost"
+]
+
+def _receipt_query(
+    db: Session,
+    date_from: Optional[datetime],
+    date_to: Optional[datetime],
+    supplier: Optional[str],
+    location_id: Optional[int],
+    spare_part_id: Optional[int]
+):
+    """Build the joined, filtered receipt query returning plain row tuples"""
+    query = db.query(
+        InventoryInflow.id,
+        InventoryInflow.received_date,
+        InventoryInflow.supplier,
+        InventoryInflow.reference_number,
+        InventoryInflow.quantity,
+        InventoryInflow.unit_cost,
+        Location.name.label("location_name"),
+        User.username.label("received_by"),
+        InventoryMaster.part_code,
+        InventoryMaster.part_name
+    ).join(
+        InventoryMaster, InventoryMaster.id == InventoryInflow.spare_part_id
+    ).outerjoin(
+        Location, Location.id == InventoryInflow.location_id
+    ).outerjoin(
+        User, User.id == InventoryInflow.received_by
+    )
     
-    results = []
-    for receipt in receipts:
-        # Get location name
-        location = db.query(Location).filter(Location.id == receipt.location_id).first()
-        received_by_user = db.query(User).filter(User.id == receipt.received_by).first()
+    if date_from:
+        query = query.filter(InventoryInflow.received_date >= date_from)
+    
+    if date_to:
+        query = query.filter(InventoryInflow.received_date <= date_to)
+    
+    if supplier:
+        query = query.filter(InventoryInflow.supplier.ilike(f"%{supplier}%"))
+    
+    if location_id:
+        query = query.filter(InventoryInflow.location_id == location_id)
+    
+    if spare_part_id:
+        query = query.filter(InventoryInflow.spare_part_id == spare_part_id)
+    
+    return query
+
+def _receipt_row(row) -> dict:
+    return {
+        "id": row.id,
+        "received_date": row.received_date.isoformat(),
+        "received_from": row.supplier,
+        "received_to_name": row.location_name or "Unknown",
+        "received_by": row.received_by or "Unknown",
+        "supplier": row.supplier,
+        "reference_number": row.reference_number,
+        "items": [{
+            "part_code": row.part_code,
+            "part_name": row.part_name,
+            "quantity": row.quantity,
+            "unit_cost": float(row.unit_cost) if row.unit_cost else 0
+        }]
+    }
+
+def _stream_receipts(output: str, filters: dict):
+    """Yield receipts as NDJSON lines or CSV chunks straight off a server-side cursor"""
+    # The request-scoped session may be closed before the body is consumed, so use our own
+    db = SessionLocal()
+    try:
+        query = _receipt_query(db, **filters).order_by(
+            InventoryInflow.received_date.desc(), InventoryInflow.id.desc()
+        ).yield_per(RECEIPT_STREAM_BATCH_SIZE)
         
-        # Get part details
-        part = db.query(InventoryMaster).filter(InventoryMaster.id == receipt.spare_part_id).first()
+        if output == "ndjson":
+            for row in query:
+                yield json.dumps(_receipt_row(row)) + "\n"
+            return
         
-        if part:
-            results.append({
-                "id": receipt.id,
-                "received_date": receipt.received_date.isoformat(),
-                "received_from": receipt.supplier,
-                "received_to_name": location.name if location else "Unknown",
-                "received_by": received_by_user.username if received_by_user else "Unknown",
-                "supplier": receipt.supplier,
-                "reference_number": receipt.reference_number,
-                "items": [{
-                    "part_code": part.part_code,
-                    "part_name": part.part_name,
-                    "quantity": receipt.quantity,
-                    "unit_cost": float(receipt.unit_cost) if receipt.unit_cost else 0
-                }]
-            })
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(RECEIPT_CSV_COLUMNS)
+        for row in query:
+            writer.writerow([
+                row.id,
+                row.received_date.isoformat(),
+                row.supplier,
+                row.reference_number,
+                row.location_name or "Unknown",
+                row.received_by or "Unknown",
+                row.part_code,
+                row.part_name,
+                row.quantity,
+                row.unit_cost if row.unit_cost is not None else ""
+            ])
+            if buffer.tell() >= 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    finally:
+        db.close()
+
+@router.get("/receipts")
+def get_receipt_history(
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor / X-Prev-Cursor of another page"),
+    date_from: Optional[datetime] = Query(None, description="Earliest received date"),
+    date_to: Optional[datetime] = Query(None, description="Latest received date"),
+    supplier: Optional[str] = Query(None, description="Filter by supplier name"),
+    location_id: Optional[int] = Query(None, description="Filter by receiving location"),
+    spare_part_id: Optional[int] = Query(None, description="Filter by part"),
+    output: str = Query("json", pattern="^(json|ndjson|csv)$", description="json pages, or stream every match as ndjson/csv"),
+    db: Session = Depends(get_db)
+):
+    """Get receipt history by received date, newest first, paged as JSON or streamed as NDJSON/CSV"""
+    filters = {
+        "date_from": date_from,
+        "date_to": date_to,
+        "supplier": supplier,
+        "location_id": location_id,
+        "spare_part_id": spare_part_id
+    }
     
-    return results
+    if output == "ndjson":
+        return StreamingResponse(_stream_receipts(output, filters), media_type="application/x-ndjson")
+    
+    if output == "csv":
+        return StreamingResponse(
+            _stream_receipts(output, filters),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=receipts.csv"}
+        )
+    
+    page = paginate(
+        _receipt_query(db, **filters),
+        (InventoryInflow.received_date, InventoryInflow.id),
+        lambda row: [row.received_date, row.id],
+        cursor,
+        limit,
+        descending=True
+    )
+    set_page_headers(response, request, page)
+    return [_receipt_row(row) for row in page.rows]
+
+@router.get("/reorder-suggestions")
+def get_reorder_suggestions(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    location_id: Optional[int] = Query(None),
+    spare_part_id: Optional[int] = Query(None),
+    only_reorder: bool = Query(True, description="Only pairs at or below their reorder point"),
+    lead_time_days: int = Query(14, ge=0, le=365),
+    review_days: int = Query(30, ge=0, le=365),
+    service_z: float = Query(1.65, ge=0, le=4),
+    alpha: float = Query(0.1, gt=0, le=1, description="Exponential smoothing factor per day"),
+    history_days: int = Query(180, ge=7, le=1095),
+    db: Session = Depends(get_db)
+):
+    """Get low-stock parts per location with demand forecast and suggested order quantity, most urgent first"""
+    params = ReorderParameters(
+        lead_time_days=lead_time_days,
+        review_days=review_days,
+        service_z=service_z,
+        alpha=alpha,
+        history_days=history_days
+    )
+    result = get_reorder_result(db, params)
+    matches = select_suggestions(result, location_id, spare_part_id, only_reorder)
+    
+    return {
+        "total": int(len(matches)),
+        "skip": skip,
+        "limit": limit,
+        "items": suggestion_rows(db, result, matches[skip:skip + limit])
+    }
+
+@router.get("/search")
+def search_inventory_items(
+    q: str = Query(..., min_length=1, max_length=100, description="Text typed into a part picker"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    """Typeahead search over part code, name, category and description, best matches first"""
+    part_search.index.ensure_current(db)
+    return part_search.index.search(q, limit)
+
+@router.get("/catalogue")
+def get_part_catalogue(
+    request: Request,
+    since: Optional[str] = Query(None, description="version from a previous catalogue response"),
+    db: Session = Depends(get_db)
+):
+    """
+    Compact part catalogue as parallel arrays (ids, codes, names, categories, units, prices),
+    gzip-compressed for clients that accept it. With `since`, only parts created or edited
+    since that version are returned (`full` is false) for the client to merge by id.
+    """
+    payload = catalogue.get_catalogue(db, since)
+    return cached_json_response(request, payload.body, payload.etag, gzip_body=payload.gzip_body)
 
 @router.get("/{item_id}", response_model=Inventory)
 def read_inventory_item(item_id: int, db: Session = Depends(get_db)):
@@ -157,155 +389,216 @@ def read_inventory_item(item_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Inventory item not found")
     return item
 
+@router.put("/{item_id}", response_model=Inventory)
+def update_inventory_item(item_id: int, item: InventoryMasterUpdate, db: Session = Depends(get_db)):
+    db_item = db.query(InventoryMaster).filter(InventoryMaster.id == item_id).first()
+    if db_item is None:
+        raise HTTPException(status_code=404, detail="Inventory item not found")
+    
+    for field, value in item.dict(exclude_unset=True).items():
+        setattr(db_item, field, value)
+    
+    db.commit()
+    db.refresh(db_item)
+    cache.parts.invalidate([item_id])
+    filter_options.changed("parts")
+    part_search.index.add_parts([db_item])
+    return db_item
+
 @router.get("/{item_id}/details")
-def read_inventory_item_details(item_id: int, db: Session = Depends(get_db)):
-    """Get inventory item details with work orders and inflows"""
+def read_inventory_item_details(
+    item_id: int,
+    work_orders_limit: int = Query(50, ge=1, le=500),
+    work_orders_cursor: Optional[str] = Query(None, description="next_cursor or prev_cursor of the work_orders section"),
+    inflows_limit: int = Query(50, ge=1, le=500),
+    inflows_cursor: Optional[str] = Query(None, description="next_cursor or prev_cursor of the inflows section"),
+    db: Session = Depends(get_db)
+):
+    """Get inventory item details with balances, consuming work orders, inflows and totals"""
     item = db.query(InventoryMaster).filter(InventoryMaster.id == item_id).first()
     
     if not item:
         raise HTTPException(status_code=404, detail="Inventory item not found")
     
-    # Get inventory balances across locations
-    balances = db.query(InventoryBalance).filter(InventoryBalance.spare_part_id == item_id).all()
-    
-    balance_details = []
-    for balance in balances:
-        location = db.query(Location).filter(Location.id == balance.location_id).first()
-        if location:
-            balance_details.append({
-                "id": balance.id,
-                "spare_part_id": balance.spare_part_id,
-                "location_id": balance.location_id,
-                "location_name": location.name,
-                "in_stock": balance.in_stock,
-                "total_received": balance.total_received,
-                "total_consumption": balance.total_consumption
-            })
-    
-    # Get work orders that consumed this part
-    work_order_parts = db.query(WorkOrderPart).filter(WorkOrderPart.spare_part_id == item_id).all()
-    
-    work_order_details = []
-    for part in work_order_parts:
-        work_order = db.query(WorkOrder).filter(WorkOrder.id == part.work_order_id).first()
-        location = db.query(Location).filter(Location.id == part.location_id).first()
-        
-        if work_order:
-            work_order_details.append({
-                "id": part.id,
-                "work_order_number": work_order.work_order_number,
-                "work_order_title": work_order.title,
-                "work_order_status": work_order.status,
-                "quantity_used": part.quantity_used,
-                "location_name": location.name if location else "Unknown",
-                "consumption_date": part.created_at.isoformat() if part.created_at else None,
-                "work_order_scheduled_date": work_order.scheduled_date.isoformat() if work_order.scheduled_date else None
-            })
-    
-    # Sort work orders by consumption date (most recent first)
-    work_order_details.sort(key=lambda x: x["consumption_date"] or "", reverse=True)
-    
-    # Get inventory inflows
-    inflows = db.query(InventoryInflow).filter(InventoryInflow.spare_part_id == item_id).all()
-    
-    inflow_details = []
-    for inflow in inflows:
-        location = db.query(Location).filter(Location.id == inflow.location_id).first()
-        receiver = db.query(User).filter(User.id == inflow.received_by).first()
-        
-        inflow_details.append({
-            "id": inflow.id,
-            "quantity": inflow.quantity,
-            "location_name": location.name if location else "Unknown",
-            "received_by": receiver.username if receiver else "Unknown",
-            "received_date": inflow.received_date.isoformat(),
-            "supplier": inflow.supplier,
-            "reference_number": inflow.reference_number,
-            "unit_cost": float(inflow.unit_cost) if inflow.unit_cost else 0,
-            "total_cost": float(inflow.quantity * inflow.unit_cost) if inflow.unit_cost and inflow.quantity else 0
-        })
+    # Inventory balances across locations
+    balances = db.query(
+        InventoryBalance, Location.name.label("location_name")
+    ).join(
+        Location, Location.id == InventoryBalance.location_id
+    ).filter(
+        InventoryBalance.spare_part_id == item_id
+    ).order_by(Location.name).all()
+    
+    balance_details = [
+        {
+            "id": balance.id,
+            "spare_part_id": balance.spare_part_id,
+            "location_id": balance.location_id,
+            "location_name": location_name,
+            "in_stock": balance.in_stock,
+            "total_received": balance.total_received,
+            "total_consumption": balance.total_consumption
+        }
+        for balance, location_name in balances
+    ]
+    
+    # Work orders that consumed this part, most recent first
+    consumption_query = db.query(
+        WorkOrderPart.id,
+        WorkOrderPart.quantity_used,
+        WorkOrderPart.created_at,
+        WorkOrder.work_order_number,
+        WorkOrder.title,
+        WorkOrder.status,
+        WorkOrder.scheduled_date,
+        Location.name.label("location_name")
+    ).join(
+        WorkOrder, WorkOrder.id == WorkOrderPart.work_order_id
+    ).outerjoin(
+        Location, Location.id == WorkOrderPart.location_id
+    ).filter(WorkOrderPart.spare_part_id == item_id)
+    
+    work_orders_page = paginate(
+        consumption_query,
+        (WorkOrderPart.created_at, WorkOrderPart.id),
+        lambda row: [row.created_at, row.id],
+        work_orders_cursor,
+        work_orders_limit,
+        descending=True
+    )
+    
+    work_order_details = [
+        {
+            "id": row.id,
+            "work_order_number": row.work_order_number,
+            "work_order_title": row.title,
+            "work_order_status": row.status,
+            "quantity_used": row.quantity_used,
+            "location_name": row.location_name or "Unknown",
+            "consumption_date": row.created_at.isoformat() if row.created_at else None,
+            "work_order_scheduled_date": row.scheduled_date.isoformat() if row.scheduled_date else None
+        }
+        for row in work_orders_page.rows
+    ]
+    
+    # Inventory inflows, most recent first
+    inflow_query = db.query(
+        InventoryInflow.id,
+        InventoryInflow.quantity,
+        InventoryInflow.received_date,
+        InventoryInflow.supplier,
+        InventoryInflow.reference_number,
+        InventoryInflow.unit_cost,
+        Location.name.label("location_name"),
+        User.username.label("received_by")
+    ).outerjoin(
+        Location, Location.id == InventoryInflow.location_id
+    ).outerjoin(
+        User, User.id == InventoryInflow.received_by
+    ).filter(InventoryInflow.spare_part_id == item_id)
+    
+    inflows_page = paginate(
+        inflow_query,
+        (InventoryInflow.received_date, InventoryInflow.id),
+        lambda row: [row.received_date, row.id],
+        inflows_cursor,
+        inflows_limit,
+        descending=True
+    )
     
-    # Sort inflows by received date (most recent first)
-    inflow_details.sort(key=lambda x: x["received_date"], reverse=True)
+    inflow_details = [
+        {
+            "id": row.id,
+            "quantity": row.quantity,
+            "location_name": row.location_name or "Unknown",
+            "received_by": row.received_by or "Unknown",
+            "received_date": row.received_date.isoformat(),
+            "supplier": row.supplier,
+            "reference_number": row.reference_number,
+            "unit_cost": float(row.unit_cost) if row.unit_cost else 0,
+            "total_cost": float(row.quantity * row.unit_cost) if row.unit_cost and row.quantity else 0
+        }
+        for row in inflows_page.rows
+    ]
+    
+    # Section totals in a single round trip
+    consumption_totals = db.query(
+        func.count(WorkOrderPart.id),
+        func.coalesce(func.sum(WorkOrderPart.quantity_used), 0)
+    ).filter(WorkOrderPart.spare_part_id == item_id).subquery()
+    
+    inflow_totals = db.query(
+        func.count(InventoryInflow.id),
+        func.coalesce(func.sum(InventoryInflow.quantity), 0),
+        func.coalesce(func.sum(InventoryInflow.quantity * InventoryInflow.unit_cost), 0)
+    ).filter(InventoryInflow.spare_part_id == item_id).subquery()
+    
+    consumption_count, total_consumed, inflow_count, total_received, value_received = db.query(
+        consumption_totals, inflow_totals
+    ).one()
     
     return {
-        "inventory_item": item,
+        "inventory_item": Inventory.model_validate(item),
         "balances": balance_details,
         "work_orders": work_order_details,
-        "inflows": inflow_details
+        "inflows": inflow_details,
+        "pagination": {
+            "work_orders": {
+                "total": consumption_count,
+                "limit": work_orders_limit,
+                "next_cursor": work_orders_page.next_cursor,
+                "prev_cursor": work_orders_page.prev_cursor
+            },
+            "inflows": {
+                "total": inflow_count,
+                "limit": inflows_limit,
+                "next_cursor": inflows_page.next_cursor,
+                "prev_cursor": inflows_page.prev_cursor
+            }
+        },
+        "summary": {
+            "total_in_stock": sum(balance["in_stock"] for balance in balance_details),
+            "total_consumed": int(total_consumed),
+            "total_received": int(total_received),
+            "value_received": float(value_received)
+        }
     }
 
-@router.post("/transfer")
+@router.post("/transfer", responses=STOCK_CONFLICT_RESPONSES)
 def create_transfer(transfer_request: TransferRequest, db: Session = Depends(get_db)):
     """Create a new transfer between locations"""
     try:
-        # Create transfer header
-        transfer_header = TransferHeader(
-            transfer_date=transfer_request.transfer_date,
-            from_location_id=transfer_request.from_location_id,
-            to_location_id=transfer_request.to_location_id,
-            transferred_by=transfer_request.transferred_by,
-            status='completed',
-            notes=transfer_request.notes,
-            created_at=datetime.now()
+        result = run_stock_transaction(
+            db, "transfer", lambda: execute_transfers(db, [transfer_request], atomic=True)[0]
         )
-        db.add(transfer_header)
-        db.flush()  # Get the ID
-        
-        # Create transfer items and update inventory balances
-        for item in transfer_request.items:
-            # Create transfer item
-            transfer_item = TransferItem(
-                transfer_id=transfer_header.id,
-                spare_part_id=item.spare_part_id,
-                quantity=item.quantity,
-                created_at=datetime.now()
-            )
-            db.add(transfer_item)
-            
-            # Update source location balance (decrease)
-            source_balance = db.query(InventoryBalance).filter(
-                InventoryBalance.spare_part_id == item.spare_part_id,
-                InventoryBalance.location_id == transfer_request.from_location_id
-            ).first()
-            
-            if source_balance:
-                if source_balance.in_stock < item.quantity:
-                    raise HTTPException(status_code=400, detail=f"Insufficient stock for part {item.spare_part_id}")
-                source_balance.in_stock -= item.quantity
-            else:
-                raise HTTPException(status_code=400, detail=f"No stock found for part {item.spare_part_id} at source location")
-            
-            # Update destination location balance (increase)
-            dest_balance = db.query(InventoryBalance).filter(
-                InventoryBalance.spare_part_id == item.spare_part_id,
-                InventoryBalance.location_id == transfer_request.to_location_id
-            ).first()
-            
-            if dest_balance:
-                dest_balance.in_stock += item.quantity
-            else:
-                # Create new balance record for destination
-                new_balance = InventoryBalance(
-                    spare_part_id=item.spare_part_id,
-                    location_id=transfer_request.to_location_id,
-                    in_stock=item.quantity,
-                    total_received=item.quantity,
-                    total_consumption=0
-                )
-                db.add(new_balance)
-        
-        db.commit()
-        return {"message": "Transfer created successfully", "transfer_id": transfer_header.id}
-        
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+    except StockConflict as e:
+        raise stock_conflict(e)
+    
+    if result["status"] != "completed":
+        raise HTTPException(status_code=400, detail=result["error"])
+    return {"message": "Transfer created successfully", "transfer_id": result["transfer_id"]}
 
-@router.post("/receive")
+@router.post("/transfers/batch", responses=STOCK_CONFLICT_RESPONSES)
+def create_transfers_batch(batch_request: BatchTransferRequest, db: Session = Depends(get_db)):
+    """Create many transfers in one transaction, returning a result per transfer"""
+    try:
+        results = run_stock_transaction(
+            db, "transfer_batch", lambda: execute_transfers(db, batch_request.transfers, atomic=batch_request.atomic)
+        )
+    except StockConflict as e:
+        raise stock_conflict(e)
+    
+    completed = sum(1 for result in results if result["status"] == "completed")
+    return {
+        "completed": completed,
+        "rejected": len(results) - completed,
+        "results": results
+    }
+
+@router.post("/receive", responses=STOCK_CONFLICT_RESPONSES)
 def receive_parts(receive_request: ReceivePartRequest, db: Session = Depends(get_db)):
     """Receive parts into inventory"""
-    try:
+    def post_receipt():
         # Create inventory inflow record
         inventory_inflow = InventoryInflow(
             spare_part_id=receive_request.spare_part_id,
@@ -319,60 +612,208 @@ def receive_parts(receive_request: ReceivePartRequest, db: Session = Depends(get
             created_at=datetime.now()
         )
         db.add(inventory_inflow)
+        db.flush()  # Get the ID
         
-        # Update or create inventory balance
-        balance = db.query(InventoryBalance).filter(
-            InventoryBalance.spare_part_id == receive_request.spare_part_id,
-            InventoryBalance.location_id == receive_request.location_id
-        ).first()
-        
-        if balance:
-            balance.in_stock += receive_request.quantity
-            balance.total_received += receive_request.quantity
-        else:
-            # Create new balance record
-            new_balance = InventoryBalance(
-                spare_part_id=receive_request.spare_part_id,
-                location_id=receive_request.location_id,
-                in_stock=receive_request.quantity,
-                total_received=receive_request.quantity,
-                total_consumption=0
-            )
-            db.add(new_balance)
-        
-        db.commit()
-        return {"message": "Parts received successfully", "inflow_id": inventory_inflow.id}
-        
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+        locked = lock_balances(db, [(receive_request.spare_part_id, receive_request.location_id)])
+        record_movements(db, [{
+            "spare_part_id": receive_request.spare_part_id,
+            "location_id": receive_request.location_id,
+            "quantity": receive_request.quantity,
+            "movement_type": "receipt",
+            "reference_type": "inflow",
+            "reference_id": inventory_inflow.id,
+            "occurred_at": receive_request.received_date
+        }], locked)
+        return inventory_inflow.id
+    
+    try:
+        inflow_id = run_stock_transaction(db, "receive", post_receipt)
+    except StockConflict as e:
+        raise stock_conflict(e)
+    return {"message": "Parts received successfully", "inflow_id": inflow_id}
+
+@router.post("/receipts/bulk", responses=STOCK_CONFLICT_RESPONSES)
+def receive_parts_bulk(
+    file: UploadFile = File(..., description="Delivery note as CSV (with header) or NDJSON"),
+    location_id: Optional[int] = Form(None, description="Default location for lines without one"),
+    received_by: Optional[int] = Form(None),
+    supplier: Optional[str] = Form(None),
+    reference_number: Optional[str] = Form(None),
+    received_date: Optional[datetime] = Form(None),
+    atomic: bool = Form(False, description="Post nothing if any line is rejected"),
+    db: Session = Depends(get_db)
+):
+    """Receive a whole delivery note in one transaction, returning an error report of rejected lines"""
+    filename = (file.filename or "").lower()
+    file_format = "ndjson" if filename.endswith((".ndjson", ".jsonl")) or file.content_type == "application/x-ndjson" else "csv"
+    defaults = {
+        "location_id": location_id,
+        "received_by": received_by,
+        "supplier": supplier,
+        "reference_number": reference_number,
+        "received_date": received_date
+    }
+    
+    def post_receipts():
+        file.file.seek(0)  # a retry re-reads the upload from the start
+        return import_receipts(db, file.file, file_format, defaults, atomic=atomic)
+    
+    try:
+        return run_stock_transaction(db, "receipts_bulk", post_receipts)
+    except StockConflict as e:
+        raise stock_conflict(e)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable delivery note: {e}")
+
+BALANCE_SORTS = {
+    "part_code": InventoryMaster.part_code,
+    "part_name": InventoryMaster.part_name,
+    "in_stock": InventoryBalance.in_stock,
+    "extended_value": InventoryBalance.in_stock * func.coalesce(InventoryMaster.unit_price, 0)
+}
 
 @router.get("/balances/{location_id}")
-def get_inventory_balances(location_id: int, db: Session = Depends(get_db)):
-    balances = db.query(InventoryBalance).filter(
-        InventoryBalance.location_id == location_id
-    ).all()
+def get_inventory_balances(
+    location_id: int,
+    as_of: Optional[datetime] = Query(None, description="Return balances as they stood at this time"),
+    category: Optional[str] = Query(None),
+    criticality: Optional[str] = Query(None),
+    sort: str = Query("part_code", pattern="^(part_code|part_name|in_stock|extended_value)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = Query(None, description="next_cursor or prev_cursor of another page"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """
+    Balances held at one location with part details and extended value (in_stock x unit_price),
+    plus a summary of the filtered set: SKU count, total value and SKUs below minimum quantity.
+    """
+    location = cache.locations.get(db, location_id)
+    if location is None:
+        raise HTTPException(status_code=404, detail="Location not found")
     
-    results = []
-    for balance in balances:
-        part = db.query(InventoryMaster).filter(
-            InventoryMaster.id == balance.spare_part_id
-        ).first()
-        
-        results.append({
-            "id": balance.id,
-            "part_code": part.part_code,
-            "part_name": part.part_name,
-            "in_stock": balance.in_stock,
-            "total_received": balance.total_received,
-            "total_consumption": balance.total_consumption
-        })
+    if as_of:
+        items = _balances_as_of(db, location_id, as_of, category, criticality)
+        return {
+            "location_id": location_id,
+            "location_name": location["name"],
+            "as_of": as_of.isoformat(),
+            "items": items,
+            "next_cursor": None,
+            "prev_cursor": None,
+            "summary": {
+                "total_skus": len(items),
+                "total_value": round(sum(item["extended_value"] for item in items), 2),
+                "below_minimum": sum(1 for item in items if item["below_minimum"])
+            }
+        }
     
-    return results
+    extended_value = BALANCE_SORTS["extended_value"]
+    below_minimum = InventoryBalance.in_stock < func.coalesce(InventoryMaster.minimum_quantity, 0)
+    
+    filters = [InventoryBalance.location_id == location_id]
+    if category:
+        filters.append(InventoryMaster.category == category)
+    if criticality:
+        filters.append(InventoryMaster.criticality == criticality)
+    
+    query = db.query(
+        InventoryBalance.id,
+        InventoryBalance.spare_part_id,
+        InventoryMaster.part_code,
+        InventoryMaster.part_name,
+        InventoryMaster.category,
+        InventoryMaster.criticality,
+        InventoryMaster.unit_of_issue,
+        InventoryMaster.unit_price,
+        InventoryMaster.minimum_quantity,
+        InventoryBalance.in_stock,
+        InventoryBalance.total_received,
+        InventoryBalance.total_consumption,
+        extended_value.label("extended_value"),
+        below_minimum.label("below_minimum")
+    ).join(InventoryMaster, InventoryMaster.id == InventoryBalance.spare_part_id).filter(*filters)
+    
+    page = paginate(
+        query,
+        (BALANCE_SORTS[sort], InventoryBalance.id),
+        lambda row: [row.extended_value if sort == "extended_value" else getattr(row, sort), row.id],
+        cursor,
+        limit,
+        descending=order == "desc"
+    )
+    
+    summary = db.query(
+        func.count(InventoryBalance.id),
+        func.coalesce(func.sum(extended_value), 0),
+        func.coalesce(func.sum(case((below_minimum, 1), else_=0)), 0)
+    ).join(InventoryMaster, InventoryMaster.id == InventoryBalance.spare_part_id).filter(*filters).one()
+    
+    return {
+        "location_id": location_id,
+        "location_name": location["name"],
+        "items": [
+            {
+                "id": row.id,
+                "spare_part_id": row.spare_part_id,
+                "part_code": row.part_code,
+                "part_name": row.part_name,
+                "category": row.category,
+                "criticality": row.criticality,
+                "unit_of_issue": row.unit_of_issue,
+                "unit_price": float(row.unit_price) if row.unit_price is not None else None,
+                "minimum_quantity": row.minimum_quantity,
+                "in_stock": row.in_stock,
+                "total_received": row.total_received,
+                "total_consumption": row.total_consumption,
+                "extended_value": float(row.extended_value),
+                "below_minimum": bool(row.below_minimum)
+            }
+            for row in page.rows
+        ],
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor,
+        "summary": {
+            "total_skus": summary[0],
+            "total_value": float(summary[1]),
+            "below_minimum": int(summary[2])
+        }
+    }
+
+def _balances_as_of(db: Session, location_id: int, as_of: datetime, category: Optional[str], criticality: Optional[str]):
+    """Historical balances for a location, answered from the stock movement ledger"""
+    balances = balances_as_of(db, as_of, location_id)
+    parts = cache.parts.get_many(db, [part_id for part_id, _ in balances])
+    
+    items = []
+    for (part_id, _), balance in sorted(balances.items()):
+        part = parts.get(part_id)
+        if not part:
+            continue
+        if (category and part["category"] != category) or (criticality and part["criticality"] != criticality):
+            continue
+        unit_price = float(part["unit_price"]) if part["unit_price"] is not None else None
+        items.append({
+            "id": None,
+            "spare_part_id": part_id,
+            "part_code": part["part_code"],
+            "part_name": part["part_name"],
+            "category": part["category"],
+            "criticality": part["criticality"],
+            "unit_of_issue": part["unit_of_issue"],
+            "unit_price": unit_price,
+            "minimum_quantity": part["minimum_quantity"],
+            "in_stock": balance["in_stock"],
+            "total_received": balance["total_received"],
+            "total_consumption": balance["total_consumption"],
+            "extended_value": round(balance["in_stock"] * (unit_price or 0), 2),
+            "below_minimum": balance["in_stock"] < (part["minimum_quantity"] or 0)
+        })
+    return items
 
 @router.get("/items/")
 def get_inventory_items(db: Session = Depends(get_db)):
-    """Get all inventory items for dropdowns"""
+    """Get all inventory items for dropdowns (prefer /inventory/search or /inventory/catalogue)"""
     items = db.query(InventoryMaster).all()
     return [
         {
@@ -380,7 +821,7 @@ def get_inventory_items(db: Session = Depends(get_db)):
             "part_name": item.part_name,
             "part_code": item.part_code,
             "category": item.category,
-            "unit_price": item.unit_price
+            "unit_price": float(item.unit_price) if item.unit_price is not None else None
         }
         for item in items
     ]
\ No newline at end of file
@@ -1,17 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
+from app.core import cache
+from app.core.pagination import approximate_count, paginate, set_page_headers
 from app.db.session import get_db
 from app.models.location import Location as LocationModel
 from app.schemas.location import Location, LocationCreate, LocationUpdate
+from app.services import filter_options
 
 router = APIRouter(prefix="/locations", tags=["locations"])
 
 @router.get("/", response_model=List[Location])
-def read_locations(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    locations = db.query(LocationModel).offset(skip).limit(limit).all()
-    return locations
+def read_locations(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor / X-Prev-Cursor of another page"),
+    limit: int = Query(100, ge=1, le=1000),
+    skip: int = Query(0, ge=0, deprecated=True, description="Offset; use cursor instead"),
+    include_total: bool = Query(False, description="Send X-Total-Count (estimated on large tables)"),
+    db: Session = Depends(get_db)
+):
+    query = db.query(LocationModel)
+    page = paginate(query, (LocationModel.id,), lambda location: [location.id], cursor, limit, skip)
+    set_page_headers(response, request, page, approximate_count(query) if include_total else None)
+    return page.rows
 
 @router.post("/", response_model=Location, status_code=status.HTTP_201_CREATED)
 def create_location(location: LocationCreate, db: Session = Depends(get_db)):
@@ -24,6 +37,8 @@ def create_location(location: LocationCreate, db: Session = Depends(get_db)):
     db.add(db_location)
     db.commit()
     db.refresh(db_location)
+    cache.locations.invalidate([db_location.id])
+    filter_options.changed("locations")
     return db_location
 
 @router.get("/unique-addresses")
@@ -51,4 +66,6 @@ def update_location(location_id: int, location: LocationUpdate, db: Session = De
     
     db.commit()
     db.refresh(db_location)
+    cache.locations.invalidate([location_id])
+    filter_options.changed("locations")
     return db_location
\ No newline at end of file
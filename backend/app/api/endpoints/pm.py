@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
+from datetime import date
+
+from app.core import cache
+from app.db.session import get_db
+from app.models.pm_plan import PMPlan as PMPlanModel, PMPlanTask as PMPlanTaskModel
+from app.schemas.pm import PMPlan, PMPlanCreate, PMPlanUpdate
+from app.services import filter_options, pm_scheduler
+
+router = APIRouter(prefix="/pm", tags=["preventive maintenance"])
+
+def _check_plan(plan: PMPlanModel):
+    """A plan needs exactly one scope and exactly one trigger"""
+    if (plan.asset_id is None) == (plan.asset_category_id is None):
+        raise HTTPException(status_code=400, detail="Set exactly one of asset_id and asset_category_id")
+    if (plan.interval_days is None) == (plan.interval_running_hours is None):
+        raise HTTPException(status_code=400, detail="Set exactly one of interval_days and interval_running_hours")
+
+def _tasks(tasks) -> List[PMPlanTaskModel]:
+    return [PMPlanTaskModel(sequence=sequence, **task.dict()) for sequence, task in enumerate(tasks)]
+
+@router.get("/plans", response_model=List[PMPlan])
+def read_pm_plans(
+    active: Optional[bool] = Query(None),
+    asset_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db)
+):
+    query = db.query(PMPlanModel).options(selectinload(PMPlanModel.tasks))
+    if active is not None:
+        query = query.filter(PMPlanModel.active.is_(active))
+    if asset_id is not None:
+        query = query.filter(PMPlanModel.asset_id == asset_id)
+    return query.order_by(PMPlanModel.id).all()
+
+@router.post("/plans", response_model=PMPlan, status_code=status.HTTP_201_CREATED)
+def create_pm_plan(plan: PMPlanCreate, db: Session = Depends(get_db)):
+    db_plan = PMPlanModel(**plan.dict(exclude={"tasks"}), tasks=_tasks(plan.tasks))
+    _check_plan(db_plan)
+    db.add(db_plan)
+    db.commit()
+    db.refresh(db_plan)
+    return db_plan
+
+@router.get("/plans/{plan_id}", response_model=PMPlan)
+def read_pm_plan(plan_id: int, db: Session = Depends(get_db)):
+    plan = db.query(PMPlanModel).filter(PMPlanModel.id == plan_id).first()
+    if plan is None:
+        raise HTTPException(status_code=404, detail="PM plan not found")
+    return plan
+
+@router.put("/plans/{plan_id}", response_model=PMPlan)
+def update_pm_plan(plan_id: int, plan: PMPlanUpdate, db: Session = Depends(get_db)):
+    db_plan = db.query(PMPlanModel).filter(PMPlanModel.id == plan_id).first()
+    if db_plan is None:
+        raise HTTPException(status_code=404, detail="PM plan not found")
+    
+    update_data = plan.dict(exclude_unset=True)
+    tasks = update_data.pop("tasks", None)
+    for key, value in update_data.items():
+        setattr(db_plan, key, value)
+    if tasks is not None:
+        db_plan.tasks = _tasks(plan.tasks)
+    _check_plan(db_plan)
+    
+    db.commit()
+    db.refresh(db_plan)
+    return db_plan
+
+@router.post("/run")
+def run_pm_scheduler(
+    as_of: Optional[date] = Query(None, description="Run as if on this date (default today)"),
+    dry_run: bool = Query(False, description="Report due plan/asset pairs without creating work orders"),
+    db: Session = Depends(get_db)
+):
+    """Create the work orders of every due plan/asset pair; running again for the same window creates nothing"""
+    result = pm_scheduler.generate(db, as_of, dry_run)
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+        if result["created"]:
+            filter_options.changed("work_orders")
+            cache.work_order_facets.clear()
+    return result
+
+@router.get("/forecast")
+def forecast_pm_work_orders(
+    months: int = Query(6, ge=1, le=36),
+    as_of: Optional[date] = Query(None),
+    running_hours_per_day: Optional[float] = Query(None, gt=0, le=24, description="Usage assumed for meter-based plans"),
+    db: Session = Depends(get_db)
+):
+    """Work orders the PM plans will generate per month over the next `months` months"""
+    return pm_scheduler.forecast(db, months, as_of, running_hours_per_day)
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
+from app.core.pagination import approximate_count, paginate, set_page_headers
 from app.db.session import get_db
 from app.models.user import User
 from app.models.role import Role
@@ -11,9 +12,19 @@ from app.schemas.user import User as UserSchema, Role as RoleSchema
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/", response_model=List[UserSchema])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = db.query(User).offset(skip).limit(limit).all()
-    return users
+def read_users(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor / X-Prev-Cursor of another page"),
+    limit: int = Query(100, ge=1, le=1000),
+    skip: int = Query(0, ge=0, deprecated=True, description="Offset; use cursor instead"),
+    include_total: bool = Query(False, description="Send X-Total-Count (estimated on large tables)"),
+    db: Session = Depends(get_db)
+):
+    query = db.query(User)
+    page = paginate(query, (User.id,), lambda user: [user.id], cursor, limit, skip)
+    set_page_headers(response, request, page, approximate_count(query) if include_total else None)
+    return page.rows
 
 @router.get("/{user_id}", response_model=UserSchema)
 def read_user(user_id: int, db: Session = Depends(get_db)):
@@ -23,6 +34,16 @@ def read_user(user_id: int, db: Session = Depends(get_db)):
     return user
 
 @router.get("/roles/", response_model=List[RoleSchema])
-def read_roles(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    roles = db.query(Role).offset(skip).limit(limit).all()
-    return roles
\ No newline at end of file
+def read_roles(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor / X-Prev-Cursor of another page"),
+    limit: int = Query(100, ge=1, le=1000),
+    skip: int = Query(0, ge=0, deprecated=True, description="Offset; use cursor instead"),
+    include_total: bool = Query(False, description="Send X-Total-Count (estimated on large tables)"),
+    db: Session = Depends(get_db)
+):
+    query = db.query(Role)
+    page = paginate(query, (Role.id,), lambda role: [role.id], cursor, limit, skip)
+    set_page_headers(response, request, page, approximate_count(query) if include_total else None)
+    return page.rows
\ No newline at end of file
@@ -1,12 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import func, null
+from sqlalchemy.orm import Session, aliased
+from typing import List, Optional
 from datetime import datetime
 
+from app.api.errors import STOCK_CONFLICT_RESPONSES, insufficient_stock, stock_conflict
+from app.core import cache
+from app.core.http_cache import cached_json_response
+from app.core.pagination import approximate_count, paginate, set_page_headers
 from app.db.session import get_db
 from app.models.work_order import WorkOrder as WorkOrderModel, WorkOrderType, WorkOrderTask, WorkOrderPart
-from app.models.inventory import InventoryMaster
-from app.schemas.work_order import WorkOrder, WorkOrderCreate, WorkOrderUpdate
+from app.schemas.work_order import (
+    WorkOrder, WorkOrderCreate, WorkOrderUpdate, WorkOrderPartsConsume, WorkOrderBulkCreate, WorkOrderBulkUpdate,
+    WorkOrderDetails, AssignmentProposalRequest, AssignmentApply
+)
+from app.services import assignment, filter_options, reliability, work_order_bulk, work_order_facets, work_order_numbers, work_order_search
+from app.services.stock import InsufficientStock, StockConflict, consume_parts, run_stock_transaction
 
 router = APIRouter(prefix="/work-orders", tags=["work orders"])
 
@@ -48,211 +58,356 @@ def test_work_orders_simple(db: Session = Depends(get_db)):
     except Exception as e:
         return {"error": str(e)}
 
+class WorkOrderFilters:
+    """Filter parameters shared by the work order list and its facet counts"""
+
+    def __init__(
+        self,
+        plant: str = None,
+        asset: str = None,
+        type: str = None,
+        status: str = None,
+        scheduled_date_start: str = None,
+        scheduled_date_end: str = None,
+        start_date_start: str = None,
+        start_date_end: str = None,
+        end_date_start: str = None,
+        end_date_end: str = None,
+        estimated_hours_min: float = None,
+        estimated_hours_max: float = None,
+        actual_hours_min: float = None,
+        actual_hours_max: float = None,
+        search: str = None
+    ):
+        self.plant = plant
+        self.asset = asset
+        self.type = type
+        self.status = status
+        self.scheduled_date_start = scheduled_date_start
+        self.scheduled_date_end = scheduled_date_end
+        self.start_date_start = start_date_start
+        self.start_date_end = start_date_end
+        self.end_date_start = end_date_start
+        self.end_date_end = end_date_end
+        self.estimated_hours_min = estimated_hours_min
+        self.estimated_hours_max = estimated_hours_max
+        self.actual_hours_min = actual_hours_min
+        self.actual_hours_max = actual_hours_max
+        self.search = search
+        # Surrounding blanks never match, and a blank filter means no filter
+        for name, value in vars(self).items():
+            if isinstance(value, str):
+                setattr(self, name, value.strip() or None)
+
+    def key(self) -> tuple:
+        """The filters that are set, normalised so equivalent requests share a cache entry"""
+        case_insensitive = ("plant", "asset", "type")  # matched with ILIKE
+        return tuple(
+            (name, value.lower() if name in case_insensitive else value)
+            for name, value in sorted(vars(self).items()) if value is not None
+        )
+
+    def apply(self, query, db: Session, location_joined: bool = False, highlight: bool = False):
+        """
+        Filter a query already outer-joined to Asset and WorkOrderType (and Location if
+        `location_joined`). Returns (query, search rank or None).
+        """
+        from app.models import Asset, Location, AssetCategory
+        
+        if self.plant:
+            if not location_joined:
+                query = query.outerjoin(Location, Location.id == Asset.location_id)
+            query = query.filter(Location.address.ilike(f"%{self.plant}%"))
+        
+        if self.asset:
+            query = query.join(AssetCategory, Asset.asset_category_id == AssetCategory.id)
+            query = query.filter(AssetCategory.name.ilike(f"%{self.asset}%"))
+        
+        if self.type:
+            query = query.filter(WorkOrderType.name.ilike(f"%{self.type}%"))
+        
+        if self.status:
+            query = query.filter(WorkOrderModel.status == self.status)
+        
+        rank = None
+        if self.search:
+            query, rank = work_order_search.apply(query, db, self.search, highlight)
+        
+        if self.scheduled_date_start:
+            query = query.filter(WorkOrderModel.scheduled_date >= self.scheduled_date_start)
+        
+        if self.scheduled_date_end:
+            query = query.filter(WorkOrderModel.scheduled_date <= self.scheduled_date_end)
+        
+        if self.start_date_start:
+            query = query.filter(WorkOrderModel.start_date >= self.start_date_start)
+        
+        if self.start_date_end:
+            query = query.filter(WorkOrderModel.start_date <= self.start_date_end)
+        
+        if self.end_date_start:
+            query = query.filter(WorkOrderModel.end_date >= self.end_date_start)
+        
+        if self.end_date_end:
+            query = query.filter(WorkOrderModel.end_date <= self.end_date_end)
+        
+        if self.estimated_hours_min is not None:
+            query = query.filter(WorkOrderModel.estimated_hours >= self.estimated_hours_min)
+        
+        if self.estimated_hours_max is not None:
+            query = query.filter(WorkOrderModel.estimated_hours <= self.estimated_hours_max)
+        
+        if self.actual_hours_min is not None:
+            query = query.filter(WorkOrderModel.actual_hours >= self.actual_hours_min)
+        
+        if self.actual_hours_max is not None:
+            query = query.filter(WorkOrderModel.actual_hours <= self.actual_hours_max)
+        
+        return query, rank
+
 @router.get("/", response_model=List[WorkOrder])
 def read_work_orders(
-    skip: int = 0, 
-    limit: int = 100, 
-    plant: str = None,
-    asset: str = None,
-    type: str = None,
-    status: str = None,
-    scheduled_date_start: str = None,
-    scheduled_date_end: str = None,
-    start_date_start: str = None,
-    start_date_end: str = None,
-    end_date_start: str = None,
-    end_date_end: str = None,
-    estimated_hours_min: float = None,
-    estimated_hours_max: float = None,
-    actual_hours_min: float = None,
-    actual_hours_max: float = None,
-    search: str = None,
+    request: Request,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor / X-Prev-Cursor of another page"),
+    limit: int = Query(100, ge=1, le=1000),
+    skip: int = Query(0, ge=0, deprecated=True, description="Offset; use cursor instead"),
+    include_total: bool = Query(False, description="Send X-Total-Count (estimated on large tables)"),
+    filters: WorkOrderFilters = Depends(),
+    highlight: bool = Query(False, description="Add a `snippet` with search matches in <mark> tags"),
     db: Session = Depends(get_db)
 ):
-    from app.models import Asset, Location, AssetCategory, WorkOrderType
-    
-    # Start with base query
-    query = db.query(WorkOrderModel)
-    
-    # Apply filters
-    if plant:
-        query = query.join(Asset, isouter=True).join(Location, isouter=True)
-        query = query.filter(Location.address.ilike(f"%{plant}%"))
-    elif asset or search:
-        query = query.join(Asset, isouter=True)
-    
-    if asset:
-        query = query.join(AssetCategory, Asset.asset_category_id == AssetCategory.id)
-        query = query.filter(AssetCategory.name.ilike(f"%{asset}%"))
-    
-    if type:
-        query = query.join(WorkOrderType, WorkOrderModel.type_id == WorkOrderType.id)
-        query = query.filter(WorkOrderType.name.ilike(f"%{type}%"))
+    """
+    List work orders with their asset, type, requester and assignee.
+    One query per page: related rows are outer-joined and only the returned columns are selected;
+    rows are serialized once, straight from the result tuples. Paged by id cursor (Link / X-Next-Cursor headers);
+    with `search`, matches are full-text ranked and paged by (rank, id) instead.
+    """
+    query, rank = filters.apply(_work_order_row_query(db), db, highlight=highlight)
     
-    if status:
-        query = query.filter(WorkOrderModel.status == status)
-    
-    if search:
-        query = query.filter(
-            (WorkOrderModel.title.ilike(f"%{search}%")) |
-            (WorkOrderModel.description.ilike(f"%{search}%")) |
-            (WorkOrderModel.work_order_number.ilike(f"%{search}%"))
+    if rank is None:
+        page = paginate(query, (WorkOrderModel.id,), lambda row: [row.id], cursor, limit, skip)
+    else:
+        query = query.add_columns(rank.label("search_rank"))
+        page = paginate(
+            query, (rank, WorkOrderModel.id), lambda row: [row.search_rank, row.id], cursor, limit, skip, descending=True
         )
     
-    if scheduled_date_start:
-        query = query.filter(WorkOrderModel.scheduled_date >= scheduled_date_start)
-    
-    if scheduled_date_end:
-        query = query.filter(WorkOrderModel.scheduled_date <= scheduled_date_end)
-    
-    if start_date_start:
-        query = query.filter(WorkOrderModel.start_date >= start_date_start)
-    
-    if start_date_end:
-        query = query.filter(WorkOrderModel.start_date <= start_date_end)
-    
-    if end_date_start:
-        query = query.filter(WorkOrderModel.end_date >= end_date_start)
-    
-    if end_date_end:
-        query = query.filter(WorkOrderModel.end_date <= end_date_end)
-    
-    if estimated_hours_min is not None:
-        query = query.filter(WorkOrderModel.estimated_hours >= estimated_hours_min)
-    
-    if estimated_hours_max is not None:
-        query = query.filter(WorkOrderModel.estimated_hours <= estimated_hours_max)
-    
-    if actual_hours_min is not None:
-        query = query.filter(WorkOrderModel.actual_hours >= actual_hours_min)
-    
-    if actual_hours_max is not None:
-        query = query.filter(WorkOrderModel.actual_hours <= actual_hours_max)
-    
-    work_orders = query.offset(skip).limit(limit).all()
-    
-    # Convert to dict to handle related data properly
-    result = []
-    for wo in work_orders:
-        wo_dict = {
-            "id": wo.id,
-            "work_order_number": wo.work_order_number,
-            "title": wo.title,
-            "description": wo.description,
-            "asset_id": wo.asset_id,
-            "type_id": wo.type_id,
-            "priority": wo.priority,
-            "status": wo.status,
-            "requested_by": wo.requested_by,
-            "assigned_to": wo.assigned_to,
-            "requested_date": wo.requested_date,
-            "scheduled_date": wo.scheduled_date,
-            "start_date": wo.start_date,
-            "end_date": wo.end_date,
-            "estimated_hours": float(wo.estimated_hours) if wo.estimated_hours else None,
-            "actual_hours": float(wo.actual_hours) if wo.actual_hours else None,
-            "created_at": wo.created_at,
-            "updated_at": wo.updated_at,
-            "asset": {
-                "id": wo.asset.id,
-                "name": wo.asset.name,
-                "asset_code": wo.asset.asset_code if hasattr(wo.asset, 'asset_code') else None
-            } if wo.asset else None,
-            "work_order_type": {
-                "id": wo.work_order_type.id,
-                "name": wo.work_order_type.name
-            } if wo.work_order_type else None,
-            "requester": {
-                "id": wo.requester.id,
-                "username": wo.requester.username
-            } if wo.requester else None,
-            "assignee": {
-                "id": wo.assignee.id,
-                "username": wo.assignee.username
-            } if wo.assignee else None
-        }
-        result.append(wo_dict)
-    
-    return result
+    # Already JSON-ready, so skip response_model validation and jsonable_encoder
+    items = [_work_order_list_row(row) for row in page.rows]
+    if highlight and filters.search:
+        for item, row in zip(items, page.rows):
+            item["snippet"] = row.snippet
+    response = JSONResponse(items)
+    set_page_headers(response, request, page, approximate_count(query) if include_total else None)
+    return response
+
+WORK_ORDER_LIST_COLUMNS = (
+    "id", "work_order_number", "title", "description", "asset_id", "type_id", "priority", "status",
+    "requested_by", "assigned_to", "requested_date", "scheduled_date", "start_date", "end_date",
+    "estimated_hours", "actual_hours", "created_at", "updated_at"
+)
+
+def _work_order_row_query(db: Session):
+    """Work order columns with the asset name and code, type, requester and assignee names outer-joined"""
+    from app.models import Asset, User
+
+    requester = aliased(User)
+    assignee = aliased(User)
+    # Not every schema has asset codes; without the column the list sends null, as it always has
+    asset_code = Asset.asset_code if hasattr(Asset, "asset_code") else null()
+    return db.query(
+        *[getattr(WorkOrderModel, column) for column in WORK_ORDER_LIST_COLUMNS],
+        Asset.name.label("asset_name"),
+        asset_code.label("asset_code"),
+        WorkOrderType.name.label("type_name"),
+        requester.username.label("requester_username"),
+        assignee.username.label("assignee_username")
+    ).outerjoin(
+        Asset, Asset.id == WorkOrderModel.asset_id
+    ).outerjoin(
+        WorkOrderType, WorkOrderType.id == WorkOrderModel.type_id
+    ).outerjoin(
+        requester, requester.id == WorkOrderModel.requested_by
+    ).outerjoin(
+        assignee, assignee.id == WorkOrderModel.assigned_to
+    )
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+def _work_order_list_row(row) -> dict:
+    """One list row in the WorkOrder schema shape, from a read_work_orders result tuple"""
+    return {
+        "id": row.id,
+        "work_order_number": row.work_order_number,
+        "title": row.title,
+        "description": row.description,
+        "asset_id": row.asset_id,
+        "type_id": row.type_id,
+        "priority": row.priority,
+        "status": row.status,
+        "requested_by": row.requested_by,
+        "assigned_to": row.assigned_to,
+        "requested_date": _isoformat(row.requested_date),
+        "scheduled_date": _isoformat(row.scheduled_date),
+        "start_date": _isoformat(row.start_date),
+        "end_date": _isoformat(row.end_date),
+        "estimated_hours": float(row.estimated_hours) if row.estimated_hours else None,
+        "actual_hours": float(row.actual_hours) if row.actual_hours else None,
+        "created_at": _isoformat(row.created_at),
+        "updated_at": _isoformat(row.updated_at),
+        "asset": {
+            "id": row.asset_id,
+            "name": row.asset_name,
+            "asset_code": row.asset_code
+        } if row.asset_name is not None else None,
+        "work_order_type": {
+            "id": row.type_id,
+            "name": row.type_name
+        } if row.type_name is not None else None,
+        "requester": {
+            "id": row.requested_by,
+            "username": row.requester_username
+        } if row.requester_username is not None else None,
+        "assignee": {
+            "id": row.assigned_to,
+            "username": row.assignee_username
+        } if row.assignee_username is not None else None
+    }
 
 @router.get("/filters")
-def get_work_order_filters(db: Session = Depends(get_db)):
-    """Get unique values for filter dropdowns"""
-    from app.models import Location, AssetCategory, WorkOrderType
-    
-    # Get unique plants (location addresses)
-    plants = db.query(Location.address).distinct().all()
-    plants = [plant[0] for plant in plants if plant[0]]
-    
-    # Get unique asset categories
-    asset_categories = db.query(AssetCategory.name).distinct().all()
-    asset_categories = [cat[0] for cat in asset_categories if cat[0]]
-    
-    # Get unique work order types
-    work_order_types = db.query(WorkOrderType.name).distinct().all()
-    work_order_types = [type[0] for type in work_order_types if type[0]]
+def get_work_order_filters(request: Request, db: Session = Depends(get_db)):
+    """Get unique values for filter dropdowns (cached; honours If-None-Match)"""
+    _, body, etag = filter_options.work_orders.get(db)
+    return cached_json_response(request, body, etag)
+
+@router.get("/facets")
+def get_work_order_facets(filters: WorkOrderFilters = Depends(), db: Session = Depends(get_db)):
+    """
+    Work order counts per status, type, priority and plant under the list filters, from one
+    grouped query; cached briefly per normalised filter set.
+    """
+    from app.models import Asset, Location
     
-    # Get unique statuses
-    statuses = db.query(WorkOrderModel.status).distinct().all()
-    statuses = [status[0] for status in statuses if status[0]]
+    def load():
+        query = db.query(
+            WorkOrderModel.status.label("status"),
+            WorkOrderType.name.label("type"),
+            WorkOrderModel.priority.label("priority"),
+            Location.address.label("plant")
+        ).outerjoin(
+            Asset, Asset.id == WorkOrderModel.asset_id
+        ).outerjoin(
+            WorkOrderType, WorkOrderType.id == WorkOrderModel.type_id
+        ).outerjoin(
+            Location, Location.id == Asset.location_id
+        )
+        query, _ = filters.apply(query, db, location_joined=True)
+        return work_order_facets.count_facets(db, query.subquery())
     
-    return {
-        "plants": plants,
-        "asset_categories": asset_categories,
-        "work_order_types": work_order_types,
-        "statuses": statuses
-    }
+    return cache.work_order_facets.get_or_load(filters.key(), load)
 
-@router.get("/{work_order_id}")
+@router.get("/{work_order_id}", response_model=WorkOrderDetails)
 def read_work_order_details(work_order_id: int, db: Session = Depends(get_db)):
-    """Get work order details with parts consumed"""
-    work_order = db.query(WorkOrderModel).filter(WorkOrderModel.id == work_order_id).first()
-    
-    if not work_order:
+    """
+    Get a work order with its tasks and the parts consumed on it.
+    Three queries: the work order with its related names, the tasks, and the parts joined to
+    their inventory item and location, with line costs and the total computed in SQL.
+    """
+    from app.models import InventoryMaster, Location, User
+
+    row = _work_order_row_query(db).filter(WorkOrderModel.id == work_order_id).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Work order not found")
-    
-    # Get work order parts with inventory details
-    parts = db.query(WorkOrderPart).filter(WorkOrderPart.work_order_id == work_order_id).all()
-    
-    parts_details = []
-    for part in parts:
-        # Get inventory item details
-        inventory_item = db.query(InventoryMaster).filter(
-            InventoryMaster.id == part.spare_part_id
-        ).first()
-        
-        if inventory_item:
-            parts_details.append({
+
+    tasks = db.query(
+        WorkOrderTask.id, WorkOrderTask.task_name, WorkOrderTask.description, WorkOrderTask.status,
+        WorkOrderTask.assigned_user_id, User.username.label("assigned_username"),
+        WorkOrderTask.estimated_hours, WorkOrderTask.actual_hours, WorkOrderTask.start_date, WorkOrderTask.end_date
+    ).outerjoin(
+        User, User.id == WorkOrderTask.assigned_user_id
+    ).filter(WorkOrderTask.work_order_id == work_order_id).order_by(WorkOrderTask.id).all()
+
+    # Lines whose part was deleted have no item to show and are left out, as before
+    unit_price = func.coalesce(InventoryMaster.unit_price, 0)
+    line_cost = WorkOrderPart.quantity_used * unit_price
+    parts = db.query(
+        WorkOrderPart.id, WorkOrderPart.spare_part_id, WorkOrderPart.quantity_used, WorkOrderPart.location_id,
+        WorkOrderPart.created_at, Location.name.label("location_name"),
+        InventoryMaster.part_code, InventoryMaster.part_name, InventoryMaster.unit_of_issue,
+        unit_price.label("unit_price"), line_cost.label("line_cost"),
+        func.sum(line_cost).over().label("total_cost")
+    ).join(
+        InventoryMaster, InventoryMaster.id == WorkOrderPart.spare_part_id
+    ).outerjoin(
+        Location, Location.id == WorkOrderPart.location_id
+    ).filter(WorkOrderPart.work_order_id == work_order_id).order_by(WorkOrderPart.id).all()
+
+    return {
+        "work_order": _work_order_list_row(row),
+        "tasks": [task._asdict() for task in tasks],
+        "parts_consumed": [
+            {
                 "id": part.id,
                 "spare_part_id": part.spare_part_id,
                 "quantity_used": part.quantity_used,
                 "location_id": part.location_id,
+                "location_name": part.location_name,
+                "created_at": part.created_at,
+                "line_cost": part.line_cost,
                 "inventory_item": {
-                    "part_code": inventory_item.part_code,
-                    "part_name": inventory_item.part_name,
-                    "unit_of_issue": inventory_item.unit_of_issue,
-                    "unit_price": float(inventory_item.unit_price) if inventory_item.unit_price else 0
+                    "part_code": part.part_code,
+                    "part_name": part.part_name,
+                    "unit_of_issue": part.unit_of_issue,
+                    "unit_price": part.unit_price
                 }
-            })
-    
-    return {
-        "work_order": work_order,
-        "parts_consumed": parts_details
+            }
+            for part in parts
+        ],
+        "total_parts_cost": parts[0].total_cost if parts else 0
     }
 
-@router.post("/", response_model=WorkOrder, status_code=status.HTTP_201_CREATED)
-def create_work_order(work_order: WorkOrderCreate, db: Session = Depends(get_db)):
-    # Generate a work order number
-    current_year = datetime.now().year
-    last_wo = db.query(WorkOrderModel).order_by(WorkOrderModel.id.desc()).first()
+@router.post("/{work_order_id}/parts", status_code=status.HTTP_201_CREATED, responses=STOCK_CONFLICT_RESPONSES)
+def consume_work_order_parts(work_order_id: int, request: WorkOrderPartsConsume, db: Session = Depends(get_db)):
+    """
+    Record parts consumed by a work order and take them out of stock, all lines or none.
+    Returns the recorded lines and the balances after the decrement.
+    """
+    if db.query(WorkOrderModel.id).filter(WorkOrderModel.id == work_order_id).first() is None:
+        raise HTTPException(status_code=404, detail="Work order not found")
     
-    if last_wo:
-        wo_number = f"WO-{current_year}-{last_wo.id + 1:04d}"
-    else:
-        wo_number = f"WO-{current_year}-0001"
+    errors = []
+    parts = cache.parts.get_many(db, [line.spare_part_id for line in request.lines])
+    locations = cache.locations.get_many(db, [line.location_id for line in request.lines])
+    for index, line in enumerate(request.lines):
+        if line.quantity_used <= 0:
+            errors.append(f"Line {index}: quantity_used must be positive")
+        if line.spare_part_id not in parts:
+            errors.append(f"Line {index}: part {line.spare_part_id} not found")
+        if line.location_id not in locations:
+            errors.append(f"Line {index}: location {line.location_id} not found")
+    if errors:
+        raise HTTPException(status_code=400, detail=errors)
+    
+    try:
+        result = run_stock_transaction(
+            db, "work_order_parts", lambda: consume_parts(db, work_order_id, request.lines, request.consumed_at)
+        )
+    except InsufficientStock as e:
+        raise insufficient_stock(e)
+    except StockConflict as e:
+        raise stock_conflict(e)
     
+    for balance in result["balances"]:
+        part = parts[balance["spare_part_id"]]
+        balance.update(part_code=part["part_code"], part_name=part["part_name"])
+    return {"work_order_id": work_order_id, **result}
+
+@router.post("/", response_model=WorkOrder, status_code=status.HTTP_201_CREATED)
+def create_work_order(work_order: WorkOrderCreate, db: Session = Depends(get_db)):
+    # Numbers come from a block reserved in advance, so no query is spent on them
     db_work_order = WorkOrderModel(
-        work_order_number=wo_number,
+        work_order_number=work_order_numbers.allocator.allocate()[0],
         title=work_order.title,
         description=work_order.description,
         asset_id=work_order.asset_id,
@@ -264,10 +419,129 @@ def create_work_order(work_order: WorkOrderCreate, db: Session = Depends(get_db)
     )
     
     db.add(db_work_order)
+    db.flush()
+    reliability.record(db, [db_work_order.id])
+    work_order_bulk.stage_created_events(db, [{
+        "id": db_work_order.id,
+        "work_order_number": db_work_order.work_order_number,
+        "priority": db_work_order.priority,
+        "asset_id": db_work_order.asset_id
+    }])
     db.commit()
     db.refresh(db_work_order)
+    filter_options.changed("work_orders")
+    cache.work_order_facets.clear()
     return db_work_order
 
+@router.post("/bulk", status_code=status.HTTP_201_CREATED)
+def create_work_orders_bulk(payload: WorkOrderBulkCreate, db: Session = Depends(get_db)):
+    """
+    Create up to 5000 work orders in one transaction, with a result per record.
+    All records are validated first; `all_or_nothing` writes nothing if any is invalid,
+    `best_effort` writes the valid ones.
+    """
+    records = [record.dict() for record in payload.records]
+    errors = work_order_bulk.validate_creates(db, records)
+    if errors and (payload.mode == work_order_bulk.ALL_OR_NOTHING or len(errors) == len(records)):
+        raise HTTPException(
+            status_code=400,
+            detail={"message": f"{len(errors)} of {len(records)} records are invalid",
+                    "results": work_order_bulk.results(errors, len(records))}
+        )
+    
+    valid = [index for index in range(len(records)) if index not in errors]
+    # End the read-only validation transaction so number reservation is not blocked by it on SQLite
+    db.rollback()
+    created = work_order_bulk.insert_work_orders(db, [records[index] for index in valid])
+    db.commit()
+    filter_options.changed("work_orders")
+    cache.work_order_facets.clear()
+    
+    written = {
+        index: {"status": "created", "id": work_order_id, "work_order_number": number}
+        for index, (work_order_id, number) in zip(valid, created)
+    }
+    return {
+        "mode": payload.mode,
+        "created": len(created),
+        "failed": len(errors),
+        "results": work_order_bulk.results(errors, len(records), written)
+    }
+
+@router.patch("/bulk")
+def update_work_orders_bulk(payload: WorkOrderBulkUpdate, db: Session = Depends(get_db)):
+    """
+    Update up to 5000 work orders in one transaction; each record has the work order `id` and
+    the fields to change. Modes as for POST /work-orders/bulk.
+    """
+    records = [record.dict(exclude_unset=True) for record in payload.records]
+    errors = work_order_bulk.validate_updates(db, records)
+    if errors and (payload.mode == work_order_bulk.ALL_OR_NOTHING or len(errors) == len(records)):
+        raise HTTPException(
+            status_code=400,
+            detail={"message": f"{len(errors)} of {len(records)} records are invalid",
+                    "results": work_order_bulk.results(errors, len(records))}
+        )
+    
+    valid = [index for index in range(len(records)) if index not in errors]
+    work_order_bulk.update_work_orders(db, [records[index] for index in valid])
+    db.commit()
+    filter_options.changed("work_orders")
+    cache.work_order_facets.clear()
+    
+    written = {index: {"status": "updated", "id": records[index]["id"]} for index in valid}
+    return {
+        "mode": payload.mode,
+        "updated": len(valid),
+        "failed": len(errors),
+        "results": work_order_bulk.results(errors, len(records), written)
+    }
+
+@router.post("/assignments/propose")
+def propose_assignments(request: AssignmentProposalRequest, db: Session = Depends(get_db)):
+    """
+    Propose technicians for the open work orders scheduled between start_date and end_date,
+    balancing estimated hours per technician per day under the daily capacity. Writes nothing;
+    send the chosen assignments to /work-orders/assignments/apply.
+    """
+    if request.end_date < request.start_date:
+        raise HTTPException(status_code=400, detail="end_date is before start_date")
+    if (request.end_date - request.start_date).days > 366:
+        raise HTTPException(status_code=400, detail="Date range is limited to one year")
+    users = assignment.technicians(db, request.user_ids, request.role)
+    if not users:
+        raise HTTPException(status_code=400, detail="No active technicians match user_ids/role")
+    
+    params = assignment.AssignmentParameters(
+        start_date=request.start_date,
+        end_date=request.end_date,
+        daily_capacity_hours=request.daily_capacity_hours,
+        default_hours=request.default_hours,
+        spill_days=request.spill_days,
+        reassign=request.reassign
+    )
+    return assignment.propose(db, params, users)
+
+@router.post("/assignments/apply")
+def apply_assignments(payload: AssignmentApply, db: Session = Depends(get_db)):
+    """Write assignments (e.g. from a proposal) in one transaction; unassigned tasks follow their work order"""
+    records = [
+        {"id": a.work_order_id, "assigned_to": a.assigned_to, "scheduled_date": a.scheduled_date}
+        for a in payload.assignments
+    ]
+    errors = work_order_bulk.validate_updates(db, records)
+    if errors:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": f"{len(errors)} of {len(records)} assignments are invalid",
+                    "results": work_order_bulk.results(errors, len(records))}
+        )
+    
+    applied = assignment.apply(db, [a.dict() for a in payload.assignments], payload.reassign)
+    db.commit()
+    cache.work_order_facets.clear()
+    return {"submitted": len(records), "applied": applied, "skipped": len(records) - applied}
+
 @router.get("/types/")
 def read_work_order_types(db: Session = Depends(get_db)):
     return db.query(WorkOrderType).all()
\ No newline at end of file
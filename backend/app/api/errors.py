@@ -0,0 +1,24 @@
+# app/api/errors.py
+"""
+HTTP mappings for service-layer errors shared by several routers.
+"""
+from fastapi import HTTPException
+
+from app.services.stock import InsufficientStock, StockConflict
+
+# Documented on every endpoint that changes stock
+STOCK_CONFLICT_RESPONSES = {
+    409: {
+        "description": "Stock at an affected location changed concurrently and retries ran out; "
+                       "nothing was posted. Retry after the Retry-After delay.",
+        "content": {"application/json": {"example": {"detail": "Stock changed concurrently for 1 balance(s); retry the request"}}}
+    }
+}
+
+
+def stock_conflict(error: StockConflict) -> HTTPException:
+    return HTTPException(status_code=409, detail=str(error), headers={"Retry-After": "1"})
+
+
+def insufficient_stock(error: InsufficientStock) -> HTTPException:
+    return HTTPException(status_code=400, detail={"message": str(error), "shortages": error.shortages})
@@ -0,0 +1,162 @@
+# app/cli.py
+"""
+Command-line entry points for batch jobs.
+Run from the backend directory, e.g. `python -m app.cli receive delivery.csv --location-id 3`.
+"""
+import argparse
+import json
+import sys
+from datetime import datetime
+
+from app.db.session import SessionLocal
+
+
+def receive(args) -> int:
+    """Post a delivery note file as goods receipts"""
+    from app.services.receipts import import_receipts
+
+    file_format = args.format or ("ndjson" if args.file.endswith((".ndjson", ".jsonl")) else "csv")
+    defaults = {
+        "location_id": args.location_id,
+        "received_by": args.received_by,
+        "supplier": args.supplier,
+        "reference_number": args.reference_number,
+        "received_date": datetime.fromisoformat(args.received_date) if args.received_date else None
+    }
+
+    db = SessionLocal()
+    try:
+        with open(args.file, "rb") as stream:
+            result = import_receipts(db, stream, file_format, defaults, atomic=args.atomic)
+        if args.dry_run:
+            db.rollback()
+        else:
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    json.dump(result, sys.stdout, indent=2, default=str)
+    sys.stdout.write("\n")
+    return 1 if result["rejected_lines"] else 0
+
+
+def ledger(args) -> int:
+    """Verify, rebuild, open or snapshot the stock movement ledger"""
+    from app.services import ledger as stock_ledger
+
+    at = datetime.fromisoformat(args.at) if args.at else None
+    db = SessionLocal()
+    try:
+        if args.action == "verify":
+            result = {"differences": stock_ledger.projection_differences(db)}
+        elif args.action == "rebuild":
+            result = {"corrected": stock_ledger.rebuild_projection(db)}
+        elif args.action == "open":
+            result = {"opening_movements": stock_ledger.open_ledger(db, at)}
+        else:
+            result = {"snapshot_rows": stock_ledger.take_snapshot(db, at)}
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    json.dump(result, sys.stdout, indent=2, default=str)
+    sys.stdout.write("\n")
+    return 1 if result.get("differences") else 0
+
+
+def pm(args) -> int:
+    """Generate the work orders of due preventive maintenance plans"""
+    from app.services import pm_scheduler
+
+    as_of = datetime.fromisoformat(args.as_of).date() if args.as_of else None
+    db = SessionLocal()
+    try:
+        result = pm_scheduler.generate(db, as_of, dry_run=args.dry_run)
+        if args.dry_run:
+            db.rollback()
+        else:
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    json.dump(result, sys.stdout, indent=2, default=str)
+    sys.stdout.write("\n")
+    return 0
+
+
+def reliability(args) -> int:
+    """Verify or rebuild the reliability KPI rollups"""
+    from app.services import reliability as kpis
+
+    db = SessionLocal()
+    try:
+        if args.action == "verify":
+            result = {"differences": kpis.differences(db)}
+        else:
+            result = {"rollup_rows": kpis.rebuild(db)}
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    json.dump(result, sys.stdout, indent=2, default=str)
+    sys.stdout.write("\n")
+    return 1 if result.get("differences") else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="CMMS batch commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    receive_parser = commands.add_parser("receive", help="Bulk-receive a delivery note (CSV or NDJSON)")
+    receive_parser.add_argument("file")
+    receive_parser.add_argument("--format", choices=["csv", "ndjson"])
+    receive_parser.add_argument("--location-id", type=int)
+    receive_parser.add_argument("--received-by", type=int)
+    receive_parser.add_argument("--supplier")
+    receive_parser.add_argument("--reference-number")
+    receive_parser.add_argument("--received-date", help="ISO date applied to lines without one")
+    receive_parser.add_argument("--atomic", action="store_true", help="Post nothing if any line is rejected")
+    receive_parser.add_argument("--dry-run", action="store_true", help="Validate and report without committing")
+    receive_parser.set_defaults(handler=receive)
+
+    ledger_parser = commands.add_parser("ledger", help="Maintain the stock movement ledger")
+    ledger_parser.add_argument(
+        "action",
+        choices=["verify", "rebuild", "open", "snapshot"],
+        help="verify: compare balances with the ledger; rebuild: reset balances from the ledger; "
+             "open: write opening movements for balances that predate the ledger; snapshot: store balances for as-of queries"
+    )
+    ledger_parser.add_argument("--at", help="ISO timestamp for open/snapshot (default now)")
+    ledger_parser.set_defaults(handler=ledger)
+
+    pm_parser = commands.add_parser("pm", help="Generate preventive maintenance work orders that are due")
+    pm_parser.add_argument("--as-of", help="ISO date to run for (default today)")
+    pm_parser.add_argument("--dry-run", action="store_true", help="Report due plans without creating work orders")
+    pm_parser.set_defaults(handler=pm)
+
+    reliability_parser = commands.add_parser("reliability", help="Maintain the reliability KPI rollups")
+    reliability_parser.add_argument(
+        "action",
+        choices=["verify", "rebuild"],
+        help="verify: compare the rollups with a full recompute; rebuild: date undated closes, then replace them with one"
+    )
+    reliability_parser.set_defaults(handler=reliability)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
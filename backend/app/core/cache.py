@@ -0,0 +1,171 @@
+# app/core/cache.py
+"""
+Process-wide caches for small, rarely changing data.
+Endpoints resolve display names (location, user, part, category, work order type) through
+the dimension caches instead of querying the table for every row, and serve derived payloads
+such as filter options from versioned caches. Create/update endpoints invalidate entries;
+a max age bounds staleness from writes made by other processes.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.asset_category import AssetCategory
+from app.models.inventory import InventoryMaster
+from app.models.location import Location
+from app.models.user import User
+from app.models.work_order import WorkOrderType
+
+
+class DimensionCache:
+    """Bounded LRU cache of selected columns of one model, keyed by id"""
+
+    def __init__(self, model, columns: List[str], max_entries: int = 10000, max_age_seconds: float = 300):
+        self.model = model
+        self.columns = columns
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()  # id -> (loaded_at, row dict)
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, row_id: Optional[int]) -> Optional[dict]:
+        """Return the cached row for `row_id`, loading it on a miss; None if it does not exist"""
+        if row_id is None:
+            return None
+        return self.get_many(db, [row_id]).get(row_id)
+
+    def get_many(self, db: Session, ids: Iterable[Optional[int]]) -> Dict[int, dict]:
+        """Return {id: row} for every existing id, loading all misses with one query"""
+        wanted = {row_id for row_id in ids if row_id is not None}
+        found: Dict[int, dict] = {}
+        now = time.monotonic()
+
+        with self._lock:
+            for row_id in wanted:
+                entry = self._entries.get(row_id)
+                if entry and now - entry[0] < self.max_age_seconds:
+                    self._entries.move_to_end(row_id)
+                    found[row_id] = entry[1]
+
+        missing = wanted - found.keys()
+        if missing:
+            columns = [getattr(self.model, column) for column in self.columns]
+            rows = db.query(*columns).filter(self.model.id.in_(missing)).all()
+            loaded = {row.id: dict(zip(self.columns, row)) for row in rows}
+            found.update(loaded)
+
+            with self._lock:
+                for row_id, row in loaded.items():
+                    self._entries[row_id] = (now, row)
+                    self._entries.move_to_end(row_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return found
+
+    def name(self, db: Session, row_id: Optional[int], field: str = "name", default: str = "Unknown") -> str:
+        """Convenience lookup of one display column"""
+        row = self.get(db, row_id)
+        return row[field] if row else default
+
+    def invalidate(self, ids: Optional[Iterable[int]] = None):
+        """Drop the given ids, or everything when ids is None"""
+        with self._lock:
+            if ids is None:
+                self._entries.clear()
+                return
+            for row_id in ids:
+                self._entries.pop(row_id, None)
+
+
+locations = DimensionCache(Location, ["id", "name", "address"], max_entries=5000)
+users = DimensionCache(User, ["id", "username", "email"], max_entries=5000)
+parts = DimensionCache(
+    InventoryMaster,
+    ["id", "part_code", "part_name", "unit_of_issue", "unit_price", "minimum_quantity", "category", "criticality"],
+    max_entries=20000
+)
+asset_categories = DimensionCache(AssetCategory, ["id", "name"], max_entries=1000)
+work_order_types = DimensionCache(WorkOrderType, ["id", "name"], max_entries=1000)
+
+
+class VersionedCache:
+    """
+    One computed value (e.g. a filter payload) cached until its version is bumped by a write.
+    The JSON body and a content-hash ETag are computed once per fill, so serving a hit
+    or a 304 costs no database work and no re-encoding.
+    """
+
+    def __init__(self, loader, max_age_seconds: float = 300):
+        self.loader = loader
+        self.max_age_seconds = max_age_seconds
+        self.version = 0
+        self._entry = None  # (version, loaded_at, value, body, etag)
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> tuple:
+        """Return (value, body bytes, etag), reloading if bumped or expired"""
+        with self._lock:
+            entry, version = self._entry, self.version
+        if entry and entry[0] == version and time.monotonic() - entry[1] < self.max_age_seconds:
+            return entry[2], entry[3], entry[4]
+
+        value = self.loader(db)
+        body = json.dumps(value, separators=(",", ":"), default=str).encode()
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:20]
+        with self._lock:
+            # A bump during the load leaves the entry stale so the next request reloads
+            self._entry = (version, time.monotonic(), value, body, etag)
+        return value, body, etag
+
+    def bump(self):
+        with self._lock:
+            self.version += 1
+
+
+class KeyedCache:
+    """
+    Short-lived results keyed by request parameters (e.g. a normalised filter set).
+    Entries expire after max_age_seconds and are all dropped by clear() after a write;
+    the least recently used entry is evicted beyond max_entries.
+    """
+
+    def __init__(self, max_entries: int = 256, max_age_seconds: float = 15):
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (loaded_at, value)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key: tuple, load):
+        """Return the cached value for `key`, or call `load()` and cache its result"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.max_age_seconds:
+                self._entries.move_to_end(key)
+                return entry[1]
+            generation = self._generation
+
+        value = load()
+        with self._lock:
+            # A clear() during the load means the value may predate the write
+            if generation == self._generation:
+                self._entries[key] = (now, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+
+work_order_facets = KeyedCache(max_entries=256, max_age_seconds=15)
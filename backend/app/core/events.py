@@ -0,0 +1,120 @@
+# app/core/events.py
+"""
+In-process feed of change events for the /events stream.
+Write paths stage events on their session; they are published when the session commits and
+dropped when it rolls back, so a retried or failed transaction announces nothing. Published
+events are kept in a bounded ring buffer, from which a reconnecting client resumes after its
+Last-Event-ID. Event ids start from the process start time in milliseconds, so ids from before
+a restart are older than every id in the new buffer and are answered with a reset.
+The feed is per process: with several workers, a client sees the writes of the worker it is
+connected to.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from itertools import islice
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+BUFFER_SIZE = 10000
+_STAGED = "change_events"  # key in Session.info
+
+
+class ChangeEvent:
+    """One published change; `location_id` is what subscriptions filter on"""
+    __slots__ = ("id", "type", "location_id", "data")
+
+    def __init__(self, event_id: int, event_type: str, location_id: Optional[int], data: dict):
+        self.id = event_id
+        self.type = event_type
+        self.location_id = location_id
+        self.data = data
+
+    def encode(self) -> str:
+        """The event in the text/event-stream format"""
+        payload = json.dumps({**self.data, "location_id": self.location_id}, separators=(",", ":"), default=str)
+        return f"id: {self.id}\nevent: {self.type}\ndata: {payload}\n\n"
+
+
+class ChangeFeed:
+    """Ring buffer of the latest events, with async waiting for new ones"""
+
+    def __init__(self, size: int = BUFFER_SIZE):
+        self._events: "deque[ChangeEvent]" = deque(maxlen=size)
+        self._next_id = int(time.time() * 1000)
+        self._lock = threading.Lock()
+        self._waiters = set()  # (event loop, asyncio.Event) of waiting streams
+
+    @property
+    def last_id(self) -> int:
+        with self._lock:
+            return self._next_id - 1
+
+    def publish(self, staged: Iterable[Tuple[str, Optional[int], dict]]) -> List[ChangeEvent]:
+        """Append (type, location_id, data) events and wake every waiting stream"""
+        with self._lock:
+            published = []
+            for event_type, location_id, data in staged:
+                published.append(ChangeEvent(self._next_id, event_type, location_id, data))
+                self._next_id += 1
+            self._events.extend(published)
+            waiters = list(self._waiters)
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(waiter.set)
+        return published
+
+    def since(self, last_id: int) -> Tuple[List[ChangeEvent], bool]:
+        """
+        Events after `last_id`, and whether some were missed: the id is older than the buffer
+        or does not come from this process.
+        """
+        with self._lock:
+            if last_id >= self._next_id:
+                return [], True
+            if not self._events:
+                return [], last_id < self._next_id - 1
+            first = self._events[0].id
+            if last_id < first - 1:
+                return list(self._events), True
+            # Ids are consecutive, so the position of last_id in the buffer is known
+            return list(islice(self._events, last_id - first + 1, None)), False
+
+    async def wait(self, last_id: int, timeout: float) -> bool:
+        """Wait until an event after `last_id` is published; False on timeout"""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            if self._next_id - 1 > last_id:
+                return True
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+feed = ChangeFeed()
+
+
+def stage(db: Session, event_type: str, location_id: Optional[int], data: dict):
+    """Queue an event to publish when `db` commits"""
+    db.info.setdefault(_STAGED, []).append((event_type, location_id, data))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_staged(session: Session):
+    staged = session.info.pop(_STAGED, None)
+    if staged:
+        feed.publish(staged)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_staged(session: Session):
+    session.info.pop(_STAGED, None)
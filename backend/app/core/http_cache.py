@@ -0,0 +1,49 @@
+# app/core/http_cache.py
+"""
+Conditional-request helpers: ETag / If-None-Match handling for cached JSON payloads.
+"""
+from fastapi import Request, Response
+
+# Clients may keep the payload but must revalidate; a matching ETag costs a 304 with no body
+DEFAULT_CACHE_CONTROL = "no-cache"
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match lists `etag` (or *)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    # Weak comparison: W/"x" matches "x", as proxies may weaken tags after compressing
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def accepts_gzip(request: Request) -> bool:
+    return "gzip" in request.headers.get("accept-encoding", "").lower()
+
+
+def cached_json_response(
+    request: Request,
+    body: bytes,
+    etag: str,
+    cache_control: str = DEFAULT_CACHE_CONTROL,
+    headers: dict = None,
+    gzip_body: bytes = None
+) -> Response:
+    """
+    Serve pre-encoded JSON with validators, or 304 if the client already has this version.
+    With `gzip_body` (the same JSON, pre-compressed) clients accepting gzip get it instead,
+    under a distinct ETag as it is a different representation.
+    """
+    response_headers = {"Cache-Control": cache_control, **(headers or {})}
+    if gzip_body is not None:
+        response_headers["Vary"] = "Accept-Encoding"
+        if accepts_gzip(request):
+            body, etag = gzip_body, etag[:-1] + '-gzip"'
+            response_headers["Content-Encoding"] = "gzip"
+    response_headers["ETag"] = etag
+
+    if etag_matches(request, etag):
+        response_headers.pop("Content-Encoding", None)
+        return Response(status_code=304, headers=response_headers)
+    return Response(content=body, media_type="application/json", headers=response_headers)
@@ -0,0 +1,65 @@
+# app/core/metrics.py
+"""
+Process-local counters exposed in the Prometheus text format at /metrics.
+"""
+import threading
+from typing import Dict, List, Tuple
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names"""
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[label]) for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[Tuple[Dict[str, str], float]]:
+        with self._lock:
+            return [(dict(zip(self.labels, key)), value) for key, value in sorted(self._values.items())]
+
+
+registry: List[Counter] = []
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def render() -> str:
+    """All registered counters in the Prometheus text exposition format"""
+    lines = []
+    for counter in registry:
+        lines.append(f"# HELP {counter.name} {counter.description}")
+        lines.append(f"# TYPE {counter.name} counter")
+        for labels, value in counter.samples():
+            lines.append(f"{counter.name}{_format_labels(labels)} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+stock_retries = Counter(
+    "cmms_stock_retries_total",
+    "Stock transactions retried after a transient database error or version conflict",
+    ("operation", "reason")
+)
+stock_conflicts = Counter(
+    "cmms_stock_version_conflicts_total",
+    "Balance rows whose version changed between read and write",
+    ("operation", "location_id")
+)
+stock_retries_exhausted = Counter(
+    "cmms_stock_conflict_responses_total",
+    "Stock transactions abandoned after the last retry (answered with 409)",
+    ("operation",)
+)
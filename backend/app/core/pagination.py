@@ -0,0 +1,149 @@
+# app/core/pagination.py
+"""
+Keyset (cursor) pagination helpers.
+A cursor is an opaque, URL-safe string encoding the sort key of the last row on a page.
+"""
+import base64
+import json
+from datetime import datetime, date
+from decimal import Decimal
+from typing import Any, List, Optional
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import and_, or_
+
+
+def _encode_value(value: Any):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"n": str(value)}
+    return value
+
+
+def _decode_value(value: Any):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "n" in value:
+            return Decimal(value["n"])
+    return value
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encode the sort key of a row into an opaque cursor"""
+    payload = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list):
+            raise ValueError("cursor must encode a list")
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_after(columns, values, descending: bool = True):
+    """
+    Build a predicate selecting rows strictly after `values` in the ordering given by `columns`.
+    Expanded into OR/AND form so it works on databases without row-value comparison.
+    """
+    if len(columns) != len(values):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        step = column < value if descending else column > value
+        clauses.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], step))
+    return or_(*clauses)
+
+
+# Direction marker leading the values of a paginate() cursor
+_FORWARD, _BACKWARD = "n", "p"
+
+
+class Page:
+    """One page of rows plus the cursors of its neighbours (None at either end)"""
+
+    def __init__(self, rows: list, next_cursor: Optional[str], prev_cursor: Optional[str]):
+        self.rows = rows
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+
+def paginate(query, sort_columns, key, cursor: Optional[str], limit: int, skip: int = 0, descending: bool = False) -> Page:
+    """
+    Fetch one keyset page of `query` in either direction.
+    `sort_columns` must end with a unique column (the id) so the ordering is total; `key` maps a row
+    to its values. `skip` is the legacy offset and is only honoured when no cursor is given.
+    """
+    backward = False
+    if cursor:
+        values = decode_cursor(cursor)
+        if not values or values[0] not in (_FORWARD, _BACKWARD):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        backward = values[0] == _BACKWARD
+        # A backward page walks the ordering in reverse from the first row of the current page
+        query = query.filter(keyset_after(sort_columns, values[1:], descending != backward))
+
+    order_by = [col.desc() if descending != backward else col.asc() for col in sort_columns]
+    query = query.order_by(*order_by)
+    if skip and not cursor:
+        query = query.offset(skip)
+    rows = query.limit(limit + 1).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if backward:
+        rows.reverse()
+
+    has_next = more if not backward else True
+    has_prev = more if backward else bool(cursor or skip)
+    return Page(
+        rows,
+        encode_cursor([_FORWARD, *key(rows[-1])]) if rows and has_next else None,
+        encode_cursor([_BACKWARD, *key(rows[0])]) if rows and has_prev else None
+    )
+
+
+def approximate_count(query) -> int:
+    """
+    Row count of `query`. On PostgreSQL this is the planner's estimate (no scan); elsewhere an exact count.
+    """
+    session = query.session
+    bind = session.get_bind()
+    if bind.dialect.name != "postgresql":
+        return query.order_by(None).count()
+
+    compiled = query.order_by(None).statement.compile(dialect=bind.dialect)
+    plan = session.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def set_page_headers(response: Response, request: Request, page: Page, total: Optional[int] = None):
+    """Expose a page's cursors as RFC 8288 `Link` headers (and X- headers) beside a plain list body"""
+    links = []
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+        links.append('<%s>; rel="next"' % _page_url(request, page.next_cursor))
+    if page.prev_cursor:
+        response.headers["X-Prev-Cursor"] = page.prev_cursor
+        links.append('<%s>; rel="prev"' % _page_url(request, page.prev_cursor))
+    if links:
+        response.headers["Link"] = ", ".join(links)
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+
+
+def _page_url(request: Request, cursor: str) -> str:
+    return str(request.url.remove_query_params("skip").include_query_params(cursor=cursor))
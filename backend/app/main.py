@@ -2,11 +2,16 @@ from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
+import logging
 import os
 
 from app.core.config import settings
+from app.db.session import SessionLocal
 from app.middleware.security import SecurityMiddleware
-from app.api.endpoints import auth, users, assets, work_orders, inventory, locations, health, simple_auth
+from app.api.endpoints import auth, users, assets, work_orders, inventory, locations, health, simple_auth, filters, pm, analytics, events
+from app.services import part_search, work_order_search
+
+logger = logging.getLogger(__name__)
 
 # Create FastAPI app
 app = FastAPI(
@@ -22,6 +27,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Link", "X-Next-Cursor", "X-Prev-Cursor", "X-Total-Count"],
 )
 
 # Add security middleware
@@ -36,10 +42,35 @@ app.include_router(inventory.router, prefix=settings.api_v1_prefix)
 app.include_router(locations.router, prefix=settings.api_v1_prefix)
 app.include_router(health.router, prefix=settings.api_v1_prefix)
 app.include_router(simple_auth.router, prefix=settings.api_v1_prefix)
+app.include_router(filters.router, prefix=settings.api_v1_prefix)
+app.include_router(pm.router, prefix=settings.api_v1_prefix)
+app.include_router(analytics.router, prefix=settings.api_v1_prefix)
+app.include_router(events.router, prefix=settings.api_v1_prefix)
 
 # Mount static files (commented out for development)
 # app.mount("/static", StaticFiles(directory="app/static/static"), name="static")
 
+@app.on_event("startup")
+def build_search_index():
+    """Build the part typeahead index before serving; searches build it lazily if this fails"""
+    db = SessionLocal()
+    try:
+        part_search.index.build(db)
+        logger.info(f"Part search index built with {len(part_search.index)} parts")
+    except Exception as e:
+        logger.warning(f"Part search index not built at startup: {e}")
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def install_work_order_search():
+    """Create the work order full-text search column/table before the first search needs it"""
+    db = SessionLocal()
+    try:
+        work_order_search.available(db)
+    finally:
+        db.close()
+
 @app.get("/")
 async def root():
     """Root endpoint - API info"""
@@ -13,7 +13,10 @@ from app.models.asset_category import AssetCategory
 from app.models.asset import Asset
 from app.models.inventory import InventoryMaster, InventoryBalance, InventoryInflow
 from app.models.transfer import TransferHeader, TransferItem
-from app.models.work_order import WorkOrderType, WorkOrder, WorkOrderTask, WorkOrderPart
+from app.models.stock_movement import StockMovement, StockSnapshot
+from app.models.work_order import WorkOrderType, WorkOrderCounter, WorkOrder, WorkOrderTask, WorkOrderPart
+from app.models.pm_plan import PMPlan, PMPlanTask, PMOccurrence
+from app.models.reliability import ReliabilityRollup
 from app.models.document import Document
 
 # Define all models for easy importing
@@ -32,9 +35,16 @@ __all__ = [
     'InventoryInflow',
     'TransferHeader',
     'TransferItem',
+    'StockMovement',
+    'StockSnapshot',
     'WorkOrderType',
+    'WorkOrderCounter',
     'WorkOrder',
     'WorkOrderTask',
     'WorkOrderPart',
+    'PMPlan',
+    'PMPlanTask',
+    'PMOccurrence',
+    'ReliabilityRollup',
     'Document'
 ]
\ No newline at end of file
@@ -1,10 +1,13 @@
-from sqlalchemy import Column, String, Text, Integer, ForeignKey, Numeric, UniqueConstraint, TIMESTAMP
+from sqlalchemy import Column, String, Text, Integer, ForeignKey, Numeric, UniqueConstraint, TIMESTAMP, Index
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel, TimestampMixin
 
 class InventoryMaster(BaseModel, TimestampMixin):
     __tablename__ = "inventory_master"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index('ix_inventory_master_updated_at', 'updated_at'),
+        {'extend_existing': True}
+    )
 
     part_code = Column(String(50), unique=True, nullable=False)
     part_name = Column(String(100), nullable=False)
@@ -25,6 +28,7 @@ class InventoryBalance(BaseModel):
     __tablename__ = "inventory_balances"
     __table_args__ = (
         UniqueConstraint('spare_part_id', 'location_id', name='uix_inventory_balance_part_location'),
+        Index('ix_inventory_balances_location_part', 'location_id', 'spare_part_id'),
         {'extend_existing': True}
     )
 
@@ -33,6 +37,10 @@ class InventoryBalance(BaseModel):
     in_stock = Column(Integer, default=0, nullable=False)
     total_received = Column(Integer, default=0, nullable=False)
     total_consumption = Column(Integer, default=0, nullable=False)
+    version = Column(Integer, default=1, server_default="1", nullable=False)  # bumped on every write
+    
+    # ORM updates are compared-and-swapped against version as well
+    __mapper_args__ = {"version_id_col": version}
     
     # Relationships
     inventory_master = relationship("InventoryMaster", back_populates="balances")
@@ -40,7 +48,11 @@ class InventoryBalance(BaseModel):
 
 class InventoryInflow(BaseModel):
     __tablename__ = "inventory_inflow"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index('ix_inventory_inflow_received_date_id', 'received_date', 'id'),
+        Index('ix_inventory_inflow_part_received', 'spare_part_id', 'received_date'),
+        {'extend_existing': True}
+    )
     
     spare_part_id = Column(Integer, ForeignKey('inventory_master.id', ondelete='SET NULL'))
     location_id = Column(Integer, ForeignKey('locations.id', ondelete='SET NULL'))
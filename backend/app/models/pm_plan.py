@@ -0,0 +1,61 @@
+from sqlalchemy import Column, String, Text, Integer, ForeignKey, Numeric, Date, Boolean, TIMESTAMP, UniqueConstraint
+from sqlalchemy.orm import relationship
+from datetime import datetime
+
+from app.models.base import BaseModel, TimestampMixin
+
+class PMPlan(BaseModel, TimestampMixin):
+    """Recurring preventive maintenance for one asset or every asset of a category"""
+    __tablename__ = "pm_plans"
+    __table_args__ = {'extend_existing': True}
+
+    name = Column(String(100), nullable=False)
+    description = Column(Text)
+    # Scope: exactly one of the two
+    asset_id = Column(Integer, ForeignKey('assets.id', ondelete='CASCADE'))
+    asset_category_id = Column(Integer, ForeignKey('asset_categories.id', ondelete='CASCADE'))
+    type_id = Column(Integer, ForeignKey('work_order_types.id', ondelete='SET NULL'))
+    # Trigger: exactly one of the two
+    interval_days = Column(Integer)
+    interval_running_hours = Column(Numeric(10, 2))
+    start_date = Column(Date, nullable=False)  # first due date of calendar plans
+    lead_days = Column(Integer, nullable=False, default=7)  # calendar work orders are created this early
+    priority = Column(String(20), default='medium')
+    estimated_hours = Column(Numeric(8, 2))
+    active = Column(Boolean, nullable=False, default=True)
+
+    # Relationships
+    tasks = relationship("PMPlanTask", back_populates="plan", order_by="PMPlanTask.sequence", cascade="all, delete-orphan")
+
+class PMPlanTask(BaseModel):
+    """Task template copied into a WorkOrderTask of every generated work order"""
+    __tablename__ = "pm_plan_tasks"
+    __table_args__ = {'extend_existing': True}
+
+    plan_id = Column(Integer, ForeignKey('pm_plans.id', ondelete='CASCADE'), nullable=False)
+    sequence = Column(Integer, nullable=False, default=0)
+    task_name = Column(String(100), nullable=False)
+    description = Column(Text)
+    estimated_hours = Column(Numeric(8, 2))
+
+    # Relationships
+    plan = relationship("PMPlan", back_populates="tasks")
+
+class PMOccurrence(BaseModel):
+    """
+    One due window of a plan for an asset that has been generated. Windows are numbered per plan
+    (calendar intervals since start_date, or completed running-hour intervals), and the unique key
+    makes generation idempotent.
+    """
+    __tablename__ = "pm_occurrences"
+    __table_args__ = (
+        UniqueConstraint('plan_id', 'asset_id', 'due_window', name='uix_pm_occurrence_plan_asset_window'),
+        {'extend_existing': True}
+    )
+
+    plan_id = Column(Integer, ForeignKey('pm_plans.id', ondelete='CASCADE'), nullable=False)
+    asset_id = Column(Integer, ForeignKey('assets.id', ondelete='CASCADE'), nullable=False)
+    due_window = Column(Integer, nullable=False)
+    due_date = Column(Date, nullable=False)
+    work_order_id = Column(Integer, ForeignKey('work_orders.id', ondelete='SET NULL'))
+    created_at = Column(TIMESTAMP, nullable=False, default=lambda: datetime.utcnow())
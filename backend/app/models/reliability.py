@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, ForeignKey, Numeric, Date, UniqueConstraint
+
+from app.models.base import BaseModel
+
+class ReliabilityRollup(BaseModel):
+    """
+    Work order counts and hours of one asset in one calendar month, the source of the reliability KPIs.
+    Kept up to date by the work order write paths and rebuilt in full by `python -m app.cli reliability`.
+    """
+    __tablename__ = "reliability_rollups"
+    __table_args__ = (
+        UniqueConstraint('asset_id', 'period', name='uix_reliability_rollup_asset_period'),
+        {'extend_existing': True}
+    )
+
+    asset_id = Column(Integer, ForeignKey('assets.id', ondelete='CASCADE'), nullable=False)
+    period = Column(Date, nullable=False)  # first day of the month
+    opened = Column(Integer, nullable=False, default=0)  # by requested_date
+    closed = Column(Integer, nullable=False, default=0)  # completed or cancelled, by end_date
+    opened_hours = Column(Numeric(12, 2), nullable=False, default=0)  # estimated hours
+    closed_hours = Column(Numeric(12, 2), nullable=False, default=0)
+    failures = Column(Integer, nullable=False, default=0)  # completed corrective repairs, by end_date
+    repair_hours = Column(Numeric(12, 2), nullable=False, default=0)  # their start_date to end_date
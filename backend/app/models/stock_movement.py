@@ -0,0 +1,37 @@
+from sqlalchemy import Column, String, Integer, ForeignKey, TIMESTAMP, Index
+from datetime import datetime
+
+from app.models.base import BaseModel
+
+class StockMovement(BaseModel):
+    """Append-only ledger of signed stock quantities; inventory_balances is a projection of it"""
+    __tablename__ = "stock_movements"
+    __table_args__ = (
+        Index('ix_stock_movements_location_occurred', 'location_id', 'occurred_at'),
+        Index('ix_stock_movements_part_location_occurred', 'spare_part_id', 'location_id', 'occurred_at'),
+        {'extend_existing': True}
+    )
+
+    spare_part_id = Column(Integer, ForeignKey('inventory_master.id', ondelete='CASCADE'), nullable=False)
+    location_id = Column(Integer, ForeignKey('locations.id', ondelete='CASCADE'), nullable=False)
+    quantity = Column(Integer, nullable=False)  # positive into the location, negative out of it
+    movement_type = Column(String(20), nullable=False)  # receipt, transfer_in, transfer_out, consumption, adjustment
+    reference_type = Column(String(20))  # inflow, transfer, work_order
+    reference_id = Column(Integer)
+    occurred_at = Column(TIMESTAMP, nullable=False)
+    created_at = Column(TIMESTAMP, nullable=False, default=lambda: datetime.utcnow())
+
+class StockSnapshot(BaseModel):
+    """Balance of one part at one location as of snapshot_at, used as a starting point for as-of queries"""
+    __tablename__ = "stock_snapshots"
+    __table_args__ = (
+        Index('ix_stock_snapshots_location_part_at', 'location_id', 'spare_part_id', 'snapshot_at'),
+        {'extend_existing': True}
+    )
+
+    snapshot_at = Column(TIMESTAMP, nullable=False)
+    spare_part_id = Column(Integer, ForeignKey('inventory_master.id', ondelete='CASCADE'), nullable=False)
+    location_id = Column(Integer, ForeignKey('locations.id', ondelete='CASCADE'), nullable=False)
+    in_stock = Column(Integer, nullable=False)
+    total_received = Column(Integer, nullable=False)
+    total_consumption = Column(Integer, nullable=False)
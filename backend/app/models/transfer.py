@@ -1,10 +1,13 @@
-from sqlalchemy import Column, String, Text, Integer, ForeignKey, TIMESTAMP, Numeric
+from sqlalchemy import Column, String, Text, Integer, ForeignKey, TIMESTAMP, Numeric, Index
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
 class TransferHeader(BaseModel):
     __tablename__ = "transfer_header"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index('ix_transfer_header_transfer_date_id', 'transfer_date', 'id'),
+        {'extend_existing': True}
+    )
 
     transfer_date = Column(TIMESTAMP, nullable=False)
     from_location_id = Column(Integer, ForeignKey('locations.id', ondelete='SET NULL'))
@@ -16,15 +19,15 @@ class TransferHeader(BaseModel):
     
     # Relationships
     from_location = relationship("Location", foreign_keys=[from_location_id], back_populates="transfers_from")
-    to_location = relationship("Location", foreign_keys=[to_location_id])
+    to_location = relationship("Location", foreign_keys=[to_location_id], back_populates="transfers_to")
     transfer_items = relationship("TransferItem", back_populates="transfer_header")
 
 class TransferItem(BaseModel):
     __tablename__ = "transfer_item"
     __table_args__ = {'extend_existing': True}
 
-    transfer_id = Column(Integer, ForeignKey('transfer_header.id', ondelete='CASCADE'))
-    spare_part_id = Column(Integer, ForeignKey('inventory_master.id', ondelete='CASCADE'))
+    transfer_id = Column(Integer, ForeignKey('transfer_header.id', ondelete='CASCADE'), index=True)
+    spare_part_id = Column(Integer, ForeignKey('inventory_master.id', ondelete='CASCADE'), index=True)
     quantity = Column(Integer, nullable=False)
     created_at = Column(TIMESTAMP, nullable=False)
     
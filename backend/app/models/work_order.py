@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Integer, ForeignKey, Numeric, Date, TIMESTAMP
+from sqlalchemy import Column, String, Text, Integer, ForeignKey, Numeric, Date, TIMESTAMP, Index
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel, TimestampMixin
 from datetime import datetime
@@ -13,6 +13,14 @@ class WorkOrderType(BaseModel, TimestampMixin):
     # Relationships
     work_orders = relationship("WorkOrder", back_populates="work_order_type")
 
+class WorkOrderCounter(BaseModel):
+    """Last work order number handed out per year; advanced a block at a time by the number allocator"""
+    __tablename__ = "work_order_counters"
+    __table_args__ = {'extend_existing': True}
+
+    year = Column(Integer, unique=True, nullable=False)
+    next_number = Column(Integer, nullable=False)
+
 class WorkOrder(BaseModel, TimestampMixin):
     __tablename__ = "work_orders"
     __table_args__ = {'extend_existing': True}
@@ -61,7 +69,10 @@ class WorkOrderTask(BaseModel, TimestampMixin):
 
 class WorkOrderPart(BaseModel):
     __tablename__ = "work_order_parts"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index('ix_work_order_parts_part_created', 'spare_part_id', 'created_at'),
+        {'extend_existing': True}
+    )
 
     work_order_id = Column(Integer, ForeignKey('work_orders.id', ondelete='CASCADE'))
     spare_part_id = Column(Integer, ForeignKey('inventory_master.id', ondelete='SET NULL'))
@@ -0,0 +1,59 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime, date
+
+class PMPlanTaskBase(BaseModel):
+    task_name: str = Field(..., max_length=100)
+    description: Optional[str] = None
+    estimated_hours: Optional[float] = None
+
+class PMPlanTaskCreate(PMPlanTaskBase):
+    pass
+
+class PMPlanTask(PMPlanTaskBase):
+    id: int
+    sequence: int
+
+    class Config:
+        orm_mode = True
+
+class PMPlanBase(BaseModel):
+    name: str = Field(..., max_length=100)
+    description: Optional[str] = None
+    asset_id: Optional[int] = None
+    asset_category_id: Optional[int] = None
+    type_id: Optional[int] = None
+    interval_days: Optional[int] = Field(None, gt=0)
+    interval_running_hours: Optional[float] = Field(None, gt=0)
+    start_date: date
+    lead_days: int = Field(7, ge=0)
+    priority: str = "medium"
+    estimated_hours: Optional[float] = None
+    active: bool = True
+
+class PMPlanCreate(PMPlanBase):
+    tasks: List[PMPlanTaskCreate] = []
+
+class PMPlanUpdate(BaseModel):
+    name: Optional[str] = Field(None, max_length=100)
+    description: Optional[str] = None
+    asset_id: Optional[int] = None
+    asset_category_id: Optional[int] = None
+    type_id: Optional[int] = None
+    interval_days: Optional[int] = Field(None, gt=0)
+    interval_running_hours: Optional[float] = Field(None, gt=0)
+    start_date: Optional[date] = None
+    lead_days: Optional[int] = Field(None, ge=0)
+    priority: Optional[str] = None
+    estimated_hours: Optional[float] = None
+    active: Optional[bool] = None
+    tasks: Optional[List[PMPlanTaskCreate]] = None  # replaces the task list when given
+
+class PMPlan(PMPlanBase):
+    id: int
+    tasks: List[PMPlanTask] = []
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        orm_mode = True
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Optional, List, Literal
 from datetime import datetime, date
 
 class WorkOrderTaskBase(BaseModel):
@@ -29,6 +29,10 @@ class WorkOrderPartBase(BaseModel):
 class WorkOrderPartCreate(WorkOrderPartBase):
     pass
 
+class WorkOrderPartsConsume(BaseModel):
+    lines: List[WorkOrderPartCreate] = Field(..., min_length=1, max_length=500)
+    consumed_at: Optional[datetime] = None  # defaults to now
+
 class WorkOrderPart(WorkOrderPartBase):
     id: int
     work_order_id: int
@@ -63,6 +67,36 @@ class WorkOrderUpdate(BaseModel):
     estimated_hours: Optional[float] = None
     actual_hours: Optional[float] = None
 
+class WorkOrderBulkCreate(BaseModel):
+    records: List[WorkOrderCreate] = Field(..., min_length=1, max_length=5000)
+    mode: Literal["all_or_nothing", "best_effort"] = "all_or_nothing"
+
+class WorkOrderBulkUpdateRecord(WorkOrderUpdate):
+    id: int
+
+class WorkOrderBulkUpdate(BaseModel):
+    records: List[WorkOrderBulkUpdateRecord] = Field(..., min_length=1, max_length=5000)
+    mode: Literal["all_or_nothing", "best_effort"] = "all_or_nothing"
+
+class AssignmentProposalRequest(BaseModel):
+    start_date: date
+    end_date: date
+    user_ids: Optional[List[int]] = None  # default: active users with `role`
+    role: Optional[str] = "technician"
+    daily_capacity_hours: float = Field(8.0, gt=0, le=24)
+    default_hours: float = Field(2.0, gt=0, le=24)  # for work orders without estimated_hours
+    spill_days: int = Field(0, ge=0, le=14)  # how many days later a work order may move
+    reassign: bool = False
+
+class Assignment(BaseModel):
+    work_order_id: int
+    assigned_to: int
+    scheduled_date: date
+
+class AssignmentApply(BaseModel):
+    assignments: List[Assignment] = Field(..., min_length=1, max_length=20000)
+    reassign: bool = False  # overwrite assignees set since the proposal
+
 class WorkOrder(WorkOrderBase):
     id: int
     work_order_number: str
@@ -85,6 +119,40 @@ class WorkOrder(WorkOrderBase):
     class Config:
         orm_mode = True
 
+class WorkOrderDetailTask(BaseModel):
+    id: int
+    task_name: str
+    description: Optional[str] = None
+    status: Optional[str] = None
+    assigned_user_id: Optional[int] = None
+    assigned_username: Optional[str] = None
+    estimated_hours: Optional[float] = None
+    actual_hours: Optional[float] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
+class WorkOrderDetailInventoryItem(BaseModel):
+    part_code: str
+    part_name: str
+    unit_of_issue: str
+    unit_price: float
+
+class WorkOrderDetailPart(BaseModel):
+    id: int
+    spare_part_id: int
+    quantity_used: int
+    location_id: Optional[int] = None
+    location_name: Optional[str] = None
+    created_at: Optional[datetime] = None
+    line_cost: float
+    inventory_item: WorkOrderDetailInventoryItem
+
+class WorkOrderDetails(BaseModel):
+    work_order: WorkOrder
+    tasks: List[WorkOrderDetailTask]
+    parts_consumed: List[WorkOrderDetailPart]
+    total_parts_cost: float
+
 class WorkOrderTypeBase(BaseModel):
     name: str
     description: Optional[str] = None
@@ -0,0 +1,180 @@
+# app/services/assignment.py
+"""
+Technician assignment optimizer.
+Open work orders scheduled in a date range are spread over technicians so that no one's summed
+estimated_hours on a day exceeds the daily capacity. Hours already assigned in the range count
+against capacity. The load is a (technician x day) NumPy matrix. Work orders are placed greedily,
+most urgent and then longest first (longest-processing-time order balances well), each going to
+the technician with the lowest load that day who still has room. Work orders that do not fit may
+move up to `spill_days` later; any still left over are reported as unassigned.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.associations import user_roles
+from app.models.role import Role
+from app.models.user import User
+from app.models.work_order import WorkOrder, WorkOrderTask
+from app.services import reliability
+
+PRIORITY_RANK = {"critical": 0, "urgent": 0, "high": 1, "medium": 2, "low": 3}
+
+# Statuses whose hours occupy a technician
+ACTIVE_STATUSES = ("open", "in_progress")
+
+
+@dataclass
+class AssignmentParameters:
+    start_date: date
+    end_date: date
+    daily_capacity_hours: float = 8.0
+    default_hours: float = 2.0  # for work orders without estimated_hours
+    spill_days: int = 0
+    reassign: bool = False  # also redistribute work orders that already have an assignee
+
+
+def technicians(db: Session, user_ids: Optional[List[int]], role: Optional[str]) -> List[tuple]:
+    """(id, username) of active users: the given ids, or everyone with `role`"""
+    query = db.query(User.id, User.username).filter(User.is_active.isnot(False))
+    if user_ids:
+        query = query.filter(User.id.in_(user_ids))
+    elif role:
+        query = query.join(user_roles, user_roles.c.user_id == User.id).join(
+            Role, Role.id == user_roles.c.role_id
+        ).filter(func.lower(Role.name) == role.lower())
+    return [tuple(row) for row in query.order_by(User.id).distinct().all()]
+
+
+def propose(db: Session, params: AssignmentParameters, users: List[tuple]) -> dict:
+    """Proposed assignee and day for every open work order in the range"""
+    days = (params.end_date - params.start_date).days + 1
+    user_ids = np.array([user[0] for user in users], dtype=np.int64)
+    hours_of = func.coalesce(WorkOrder.estimated_hours, params.default_hours)
+    in_range = (
+        WorkOrder.scheduled_date >= params.start_date,
+        WorkOrder.scheduled_date <= params.end_date,
+        WorkOrder.status.in_(ACTIVE_STATUSES)
+    )
+
+    pending_query = select(
+        WorkOrder.id, WorkOrder.work_order_number, WorkOrder.scheduled_date, WorkOrder.priority, hours_of
+    ).where(*in_range)
+    if not params.reassign:
+        pending_query = pending_query.where(WorkOrder.assigned_to.is_(None))
+    pending = db.execute(pending_query.order_by(WorkOrder.id)).all()
+
+    # Hours that stay where they are: everything already assigned unless it is being redistributed
+    load = np.zeros((len(user_ids), days), dtype=np.float64)
+    if not params.reassign and len(user_ids):
+        booked = db.execute(
+            select(WorkOrder.assigned_to, WorkOrder.scheduled_date, func.sum(hours_of))
+            .where(*in_range, WorkOrder.assigned_to.in_(user_ids.tolist()))
+            .group_by(WorkOrder.assigned_to, WorkOrder.scheduled_date)
+        ).all()
+        if booked:
+            row_of = {int(user_id): row for row, user_id in enumerate(user_ids)}
+            rows = np.array([row_of[row[0]] for row in booked], dtype=np.int64)
+            columns = np.array([(row[1] - params.start_date).days for row in booked], dtype=np.int64)
+            np.add.at(load, (rows, columns), np.array([float(row[2]) for row in booked]))
+    booked_hours = load.sum()
+
+    count = len(pending)
+    hours = np.array([float(row[4]) for row in pending], dtype=np.float64)
+    day = np.array([(row[2] - params.start_date).days for row in pending], dtype=np.int64)
+    rank = np.array([PRIORITY_RANK.get((row[3] or "").lower(), 2) for row in pending], dtype=np.int64)
+    assignee = np.full(count, -1, dtype=np.int64)  # row in `load`
+    assigned_day = day.copy()
+
+    capacity = params.daily_capacity_hours
+    for k in np.lexsort((-hours, day, rank)).tolist():
+        h = hours[k]
+        for d in range(day[k], min(day[k] + params.spill_days + 1, days)):
+            column = load[:, d]
+            room = column + h <= capacity
+            if room.any():
+                user = int(np.argmin(np.where(room, column, np.inf)))
+                load[user, d] += h
+                assignee[k], assigned_day[k] = user, d
+                break
+
+    placed = assignee >= 0
+    return {
+        "start_date": params.start_date,
+        "end_date": params.end_date,
+        "work_orders": count,
+        "assigned": int(placed.sum()),
+        "unassigned": int(count - placed.sum()),
+        "assignments": [
+            {
+                "work_order_id": pending[k][0],
+                "work_order_number": pending[k][1],
+                "assigned_to": int(user_ids[assignee[k]]),
+                "scheduled_date": params.start_date + timedelta(days=int(assigned_day[k])),
+                "moved": bool(assigned_day[k] != day[k]),
+                "hours": float(hours[k])
+            }
+            for k in np.flatnonzero(placed).tolist()
+        ],
+        "unassigned_work_orders": [pending[k][0] for k in np.flatnonzero(~placed).tolist()],
+        "technicians": [
+            {
+                "user_id": user_id,
+                "username": username,
+                "hours": round(float(load[row].sum()), 2),
+                "peak_day_hours": round(float(load[row].max(initial=0)), 2),
+                "utilisation": round(float(load[row].sum()) / (capacity * days), 3)
+            }
+            for row, (user_id, username) in enumerate(users)
+        ],
+        "booked_hours": round(float(booked_hours), 2)
+    }
+
+
+def apply(db: Session, assignments: List[dict], reassign: bool = False) -> int:
+    """
+    Write proposed assignments with one executemany per table; work orders whose task rows have no
+    assignee get the same one. Unless `reassign`, work orders assigned meanwhile are left alone.
+    Returns the number of assignments written. The caller commits.
+    """
+    if not assignments:
+        return 0
+    table = WorkOrder.__table__
+    condition = table.c.id == bindparam("target_id")
+    if not reassign:
+        condition = condition & table.c.assigned_to.is_(None)
+    params = [
+        {
+            "target_id": a["work_order_id"],
+            "new_assignee": a["assigned_to"],
+            "new_date": a["scheduled_date"],
+            "now": datetime.utcnow()
+        }
+        for a in assignments
+    ]
+    # updated_at is the closing time of work orders without an end_date, so the rollups move with it
+    ids = [a["work_order_id"] for a in assignments]
+    before = reliability.snapshot(db, ids)
+    result = db.execute(
+        update(table).where(condition).values(
+            assigned_to=bindparam("new_assignee"), scheduled_date=bindparam("new_date"), updated_at=bindparam("now")
+        ),
+        params
+    )
+    tasks = WorkOrderTask.__table__
+    # Only where the work order now has this assignee, i.e. was not skipped above
+    assigned_here = select(table.c.id).where(
+        table.c.id == bindparam("target_id"), table.c.assigned_to == bindparam("new_assignee")
+    ).exists()
+    db.execute(
+        update(tasks).where(
+            tasks.c.work_order_id == bindparam("target_id"), tasks.c.assigned_user_id.is_(None), assigned_here
+        ).values(assigned_user_id=bindparam("new_assignee")),
+        params
+    )
+    reliability.record(db, ids, before)
+    return result.rowcount if result.rowcount >= 0 else len(assignments)
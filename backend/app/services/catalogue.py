@@ -0,0 +1,83 @@
+# app/services/catalogue.py
+"""
+Compact part catalogue for dropdowns and offline clients.
+Parts are sent as parallel arrays (ids, codes, names, ...) rather than one object per part.
+The full catalogue is encoded and gzip-compressed once per catalogue version; clients holding
+a copy ask for `since=<version>` and receive only parts created or edited after it.
+"""
+import gzip
+import hashlib
+import json
+import threading
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.inventory import InventoryMaster
+
+_cache: dict = {}  # {"key": catalogue_state, "payload": CataloguePayload}
+_cache_lock = threading.Lock()
+
+
+class CataloguePayload:
+    """One encoded catalogue response"""
+
+    def __init__(self, document: dict):
+        self.body = json.dumps(document, separators=(",", ":")).encode()
+        self.gzip_body = gzip.compress(self.body, compresslevel=6, mtime=0)
+        self.etag = '"%s"' % hashlib.sha1(self.body).hexdigest()[:20]
+        self.version = document["version"]
+
+
+def catalogue_state(db: Session) -> Tuple:
+    """Changes whenever a part is created or edited"""
+    return db.query(func.max(InventoryMaster.updated_at), func.count(InventoryMaster.id)).one()._tuple()
+
+
+def build_catalogue(db: Session, since=None) -> dict:
+    """Parts (all, or edited at/after `since`) as parallel arrays plus the version to ask from next"""
+    query = db.query(
+        InventoryMaster.id, InventoryMaster.part_code, InventoryMaster.part_name,
+        InventoryMaster.category, InventoryMaster.unit_of_issue, InventoryMaster.unit_price,
+        InventoryMaster.updated_at
+    )
+    if since is not None:
+        # Inclusive, so parts sharing the version timestamp are resent rather than missed
+        query = query.filter(InventoryMaster.updated_at >= since)
+    rows = query.order_by(InventoryMaster.id).all()
+
+    latest = max((row.updated_at for row in rows), default=since)
+    return {
+        "version": encode_cursor([latest]) if latest else None,
+        "full": since is None,
+        "count": len(rows),
+        "ids": [row.id for row in rows],
+        "codes": [row.part_code for row in rows],
+        "names": [row.part_name for row in rows],
+        "categories": [row.category for row in rows],
+        "units": [row.unit_of_issue for row in rows],
+        "prices": [float(row.unit_price) if row.unit_price is not None else None for row in rows]
+    }
+
+
+def get_catalogue(db: Session, since: Optional[str] = None) -> CataloguePayload:
+    """The full catalogue (cached per catalogue state) or the delta after a client's version"""
+    if since:
+        values = decode_cursor(since)
+        if len(values) != 1 or not isinstance(values[0], datetime):
+            raise HTTPException(status_code=400, detail="Invalid catalogue version")
+        return CataloguePayload(build_catalogue(db, values[0]))
+
+    state = catalogue_state(db)
+    with _cache_lock:
+        if _cache.get("key") == state:
+            return _cache["payload"]
+
+    payload = CataloguePayload(build_catalogue(db))
+    with _cache_lock:
+        _cache.update(key=state, payload=payload)
+    return payload
@@ -0,0 +1,76 @@
+# app/services/filter_options.py
+"""
+Filter dropdown options for the inventory, work order and asset list views.
+Each option set is cached (see VersionedCache) and rebuilt only after a write to one of the
+tables it reads; write endpoints report those writes through changed().
+"""
+from sqlalchemy.orm import Session
+
+from app.core.cache import VersionedCache
+from app.models.asset import Asset
+from app.models.asset_category import AssetCategory
+from app.models.inventory import InventoryMaster
+from app.models.location import Location
+from app.models.work_order import WorkOrder, WorkOrderType
+
+
+def _distinct(db: Session, column) -> list:
+    """Non-empty distinct values of one column"""
+    return [row[0] for row in db.query(column).distinct().all() if row[0]]
+
+
+def load_inventory_filters(db: Session) -> dict:
+    return {
+        "locations": [row[0] for row in db.query(Location.name).all()],
+        "asset_categories": [row[0] for row in db.query(AssetCategory.name).all()],
+        "categories": _distinct(db, InventoryMaster.category),
+        "criticalities": _distinct(db, InventoryMaster.criticality)
+    }
+
+
+def load_work_order_filters(db: Session) -> dict:
+    return {
+        "plants": _distinct(db, Location.address),
+        "asset_categories": _distinct(db, AssetCategory.name),
+        "work_order_types": _distinct(db, WorkOrderType.name),
+        "statuses": _distinct(db, WorkOrder.status)
+    }
+
+
+def load_asset_filters(db: Session) -> dict:
+    return {
+        "plants": _distinct(db, Location.address),
+        "asset_categories": _distinct(db, AssetCategory.name),
+        "statuses": _distinct(db, Asset.status)
+    }
+
+
+inventory = VersionedCache(load_inventory_filters)
+work_orders = VersionedCache(load_work_order_filters)
+assets = VersionedCache(load_asset_filters)
+
+# Which option sets read each table
+_DEPENDENTS = {
+    "locations": (inventory, work_orders, assets),
+    "asset_categories": (inventory, work_orders, assets),
+    "parts": (inventory,),
+    "work_orders": (work_orders,),
+    "work_order_types": (work_orders,),
+    "assets": (assets,)
+}
+
+
+def changed(*tables: str):
+    """Bump every option set that reads one of `tables` (keys of _DEPENDENTS)"""
+    for table in tables:
+        for options in _DEPENDENTS[table]:
+            options.bump()
+
+
+def combined(db: Session) -> tuple:
+    """Return (body bytes, etag) for all three option sets in one payload"""
+    parts = {"inventory": inventory.get(db), "work_orders": work_orders.get(db), "assets": assets.get(db)}
+    body = b"{" + b",".join(b'"%s":%s' % (name.encode(), part[1]) for name, part in parts.items()) + b"}"
+    # The individual tags are content hashes, so joining them identifies the combined body
+    etag = '"%s"' % "-".join(part[2].strip('"')[:12] for part in parts.values())
+    return body, etag
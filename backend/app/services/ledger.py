@@ -0,0 +1,171 @@
+# app/services/ledger.py
+"""
+Queries over the stock_movements ledger.
+Historical balances start from the nearest snapshot per part/location and add the
+movements recorded after it, so an as-of query never replays the whole ledger.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, case, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.inventory import InventoryBalance
+from app.models.stock_movement import StockMovement, StockSnapshot
+from app.services.stock import BALANCE_COLUMNS, BalanceKey, apply_balance_deltas, lock_balances, record_movements
+
+_received = func.coalesce(func.sum(case((StockMovement.movement_type == "receipt", StockMovement.quantity), else_=0)), 0)
+_consumed = func.coalesce(func.sum(case((StockMovement.movement_type == "consumption", -StockMovement.quantity), else_=0)), 0)
+
+
+def balances_as_of(db: Session, as_of: datetime, location_id: Optional[int] = None) -> Dict[BalanceKey, Dict[str, int]]:
+    """Balances at `as_of` for one location (or all), from the nearest snapshot plus a delta scan"""
+    nearest = select(
+        StockSnapshot.spare_part_id,
+        StockSnapshot.location_id,
+        func.max(StockSnapshot.snapshot_at).label("snapshot_at")
+    ).where(StockSnapshot.snapshot_at <= as_of)
+    if location_id is not None:
+        nearest = nearest.where(StockSnapshot.location_id == location_id)
+    nearest = nearest.group_by(StockSnapshot.spare_part_id, StockSnapshot.location_id).subquery()
+
+    balances: Dict[BalanceKey, Dict[str, int]] = {}
+    snapshots = db.execute(
+        select(
+            StockSnapshot.spare_part_id, StockSnapshot.location_id,
+            StockSnapshot.in_stock, StockSnapshot.total_received, StockSnapshot.total_consumption
+        ).join(nearest, and_(
+            StockSnapshot.spare_part_id == nearest.c.spare_part_id,
+            StockSnapshot.location_id == nearest.c.location_id,
+            StockSnapshot.snapshot_at == nearest.c.snapshot_at
+        ))
+    ).all()
+    for row in snapshots:
+        balances[(row.spare_part_id, row.location_id)] = {
+            "in_stock": row.in_stock,
+            "total_received": row.total_received,
+            "total_consumption": row.total_consumption
+        }
+
+    deltas = select(
+        StockMovement.spare_part_id,
+        StockMovement.location_id,
+        func.sum(StockMovement.quantity).label("in_stock"),
+        _received.label("total_received"),
+        _consumed.label("total_consumption")
+    ).outerjoin(nearest, and_(
+        StockMovement.spare_part_id == nearest.c.spare_part_id,
+        StockMovement.location_id == nearest.c.location_id
+    )).where(
+        StockMovement.occurred_at <= as_of,
+        or_(nearest.c.snapshot_at.is_(None), StockMovement.occurred_at > nearest.c.snapshot_at)
+    )
+    if location_id is not None:
+        deltas = deltas.where(StockMovement.location_id == location_id)
+    deltas = deltas.group_by(StockMovement.spare_part_id, StockMovement.location_id)
+
+    for row in db.execute(deltas).all():
+        balance = balances.setdefault((row.spare_part_id, row.location_id), dict.fromkeys(BALANCE_COLUMNS, 0))
+        for column in BALANCE_COLUMNS:
+            balance[column] += int(getattr(row, column))
+
+    return balances
+
+
+def take_snapshot(db: Session, snapshot_at: Optional[datetime] = None) -> int:
+    """Store balances of every part/location as of `snapshot_at` (default now); returns rows written"""
+    snapshot_at = snapshot_at or datetime.now()
+    balances = balances_as_of(db, snapshot_at)
+    rows = [
+        {"snapshot_at": snapshot_at, "spare_part_id": part_id, "location_id": location_id, **balance}
+        for (part_id, location_id), balance in sorted(balances.items())
+    ]
+    if rows:
+        db.execute(insert(StockSnapshot), rows)
+    return len(rows)
+
+
+def ledger_totals(db: Session) -> Dict[BalanceKey, Dict[str, int]]:
+    """Current balances computed from the full ledger"""
+    rows = db.execute(
+        select(
+            StockMovement.spare_part_id,
+            StockMovement.location_id,
+            func.sum(StockMovement.quantity).label("in_stock"),
+            _received.label("total_received"),
+            _consumed.label("total_consumption")
+        ).group_by(StockMovement.spare_part_id, StockMovement.location_id)
+    ).all()
+    return {
+        (row.spare_part_id, row.location_id): {column: int(getattr(row, column)) for column in BALANCE_COLUMNS}
+        for row in rows
+    }
+
+
+def projection_differences(db: Session) -> List[dict]:
+    """Compare inventory_balances with the ledger; returns one entry per mismatching part/location"""
+    expected = ledger_totals(db)
+    actual = {
+        (row.spare_part_id, row.location_id): {column: getattr(row, column) for column in BALANCE_COLUMNS}
+        for row in db.query(
+            InventoryBalance.spare_part_id, InventoryBalance.location_id,
+            InventoryBalance.in_stock, InventoryBalance.total_received, InventoryBalance.total_consumption
+        ).all()
+    }
+
+    differences = []
+    zero = dict.fromkeys(BALANCE_COLUMNS, 0)
+    for key in sorted(set(expected) | set(actual)):
+        ledger, projection = expected.get(key, zero), actual.get(key, zero)
+        if ledger != projection:
+            differences.append({
+                "spare_part_id": key[0],
+                "location_id": key[1],
+                "ledger": ledger,
+                "projection": projection
+            })
+    return differences
+
+
+def rebuild_projection(db: Session) -> List[dict]:
+    """Overwrite inventory_balances with the ledger totals; returns the rows that were corrected"""
+    differences = projection_differences(db)
+    locked = lock_balances(db, [(d["spare_part_id"], d["location_id"]) for d in differences])
+    apply_balance_deltas(db, {
+        (d["spare_part_id"], d["location_id"]): {
+            column: d["ledger"][column] - d["projection"][column] for column in BALANCE_COLUMNS
+        }
+        for d in differences
+    }, locked)
+    return differences
+
+
+def open_ledger(db: Session, occurred_at: Optional[datetime] = None) -> int:
+    """
+    Record opening movements so the ledger reproduces balances that predate it.
+    Each differing part/location gets a receipt, a consumption and an adjustment as needed,
+    so in_stock, total_received and total_consumption all match. Returns movements written.
+    """
+    occurred_at = occurred_at or datetime.now()
+    movements = []
+    for d in projection_differences(db):
+        received = d["projection"]["total_received"] - d["ledger"]["total_received"]
+        consumed = d["projection"]["total_consumption"] - d["ledger"]["total_consumption"]
+        adjustment = d["projection"]["in_stock"] - d["ledger"]["in_stock"] - received + consumed
+        for movement_type, quantity in (("receipt", received), ("consumption", -consumed), ("adjustment", adjustment)):
+            if quantity:
+                movements.append({
+                    "spare_part_id": d["spare_part_id"],
+                    "location_id": d["location_id"],
+                    "quantity": quantity,
+                    "movement_type": movement_type,
+                    "reference_type": "opening",
+                    "occurred_at": occurred_at
+                })
+    if not movements:
+        return 0
+
+    lock_balances(db, [(m["spare_part_id"], m["location_id"]) for m in movements])
+    # The balances already hold these quantities, so only the ledger side is written
+    record_movements(db, movements, project=False)
+    return len(movements)
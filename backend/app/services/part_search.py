@@ -0,0 +1,279 @@
+# app/services/part_search.py
+"""
+In-memory typeahead index over spare parts.
+Text fields are split into lowercase tokens. At build time every (token, part) posting is laid
+out in one array sorted by token, so all parts matching a typed prefix are one contiguous slice
+found by bisecting the sorted token list, and scoring is a single NumPy scatter. Part codes and
+names are also indexed by trigram to catch matches inside a token (e.g. "6205" in "BRG6205ZZ").
+Parts created or edited after the build go to a small delta scanned directly, and the index is
+rebuilt once the delta grows past DELTA_MAX_PARTS.
+Every query term must match; parts are ranked by the best field each term hit.
+"""
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.inventory import InventoryMaster
+
+# Score of a query term by where it matched
+CODE_EXACT, CODE_PREFIX, NAME_PREFIX, CATEGORY_PREFIX, DESCRIPTION_PREFIX, INFIX = 100, 60, 40, 20, 10, 5
+FIELD_SCORES = (DESCRIPTION_PREFIX, CATEGORY_PREFIX, NAME_PREFIX, CODE_PREFIX)
+
+# How often to pick up parts created or edited by other processes
+REFRESH_SECONDS = 30
+
+# Parts indexed since the last build before the next search rebuilds
+DELTA_MAX_PARTS = 500
+
+_TOKEN = re.compile(r"[0-9a-z]+")
+
+
+def tokens(text: Optional[str]) -> List[str]:
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+def _part_terms(part) -> tuple:
+    """(token -> best field score, normalised code, normalised code + name) for one part"""
+    fields = (
+        (part.part_code, CODE_PREFIX),
+        (part.part_name, NAME_PREFIX),
+        (part.category, CATEGORY_PREFIX),
+        (part.description, DESCRIPTION_PREFIX)
+    )
+    part_tokens: Dict[str, int] = {}
+    for text, score in fields:
+        for token in tokens(text):
+            if score > part_tokens.get(token, 0):
+                part_tokens[token] = score
+    code = "".join(tokens(part.part_code))
+    return part_tokens, code, code + " " + "".join(tokens(part.part_name))
+
+
+def _trigrams(text: str) -> set:
+    return {gram for word in text.split(" ") for gram in (word[i:i + 3] for i in range(len(word) - 2))}
+
+
+def _document(part) -> dict:
+    return {
+        "id": part.id,
+        "part_code": part.part_code,
+        "part_name": part.part_name,
+        "category": part.category,
+        "unit_of_issue": part.unit_of_issue,
+        "unit_price": float(part.unit_price) if part.unit_price is not None else None
+    }
+
+
+def _rank_key(document: dict, score: int) -> tuple:
+    """Higher score first, then shorter name, then code"""
+    return (-score, len(document["part_name"] or ""), document["part_code"])
+
+
+class PartSearchIndex:
+    """Prefix and trigram index over every part; searches and updates may run concurrently"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.built_at: Optional[float] = None
+        self._refreshed_at = 0.0
+        self._watermark: Optional[datetime] = None
+        self._documents: Dict[int, dict] = {}  # part id -> search result fields
+        self._codes: Dict[str, int] = {}  # normalised part code -> part id
+
+        # Built part of the index; positions index the arrays below
+        self._ids = np.empty(0, dtype=np.int64)  # position -> part id
+        self._positions: Dict[int, int] = {}
+        self._live = np.empty(0, dtype=bool)  # False once a part moves to the delta
+        self._tiebreak = np.empty(0, dtype=np.int64)  # position -> rank by (name length, code)
+        self._tokens: List[str] = []  # sorted
+        self._token_starts = np.zeros(1, dtype=np.int64)  # postings of token i: [starts[i], starts[i + 1])
+        self._posting_positions = np.empty(0, dtype=np.int32)
+        self._posting_scores = np.empty(0, dtype=np.int16)
+        self._grams: Dict[str, np.ndarray] = {}  # trigram -> sorted positions
+        self._texts: List[str] = []
+
+        # Parts indexed since the build: part id -> (token scores, code + name text)
+        self._delta: Dict[int, tuple] = {}
+
+    def build(self, db: Session):
+        """Index every part, replacing the current contents"""
+        self._swap(self._built(db.query(*self._columns()).all()))
+
+    def refresh(self, db: Session):
+        """Index parts created or edited since the last build/refresh"""
+        with self._lock:
+            watermark = self._watermark
+            self._refreshed_at = time.monotonic()
+        query = db.query(*self._columns())
+        if watermark is not None:
+            query = query.filter(InventoryMaster.updated_at >= watermark)
+        self.add_parts(query.all())
+
+    def ensure_current(self, db: Session):
+        """Build on first use, rebuild after many additions, and pick up other processes' writes"""
+        if self.built_at is None or len(self._delta) > DELTA_MAX_PARTS:
+            self.build(db)
+        elif time.monotonic() - self._refreshed_at > REFRESH_SECONDS:
+            self.refresh(db)
+
+    def add_parts(self, parts):
+        """Index (or re-index) parts; each is a row or model with the indexed columns"""
+        with self._lock:
+            for part in parts:
+                part_tokens, code, text = _part_terms(part)
+                position = self._positions.get(part.id)
+                if position is not None:
+                    self._live[position] = False
+                self._delta[part.id] = (part_tokens, text)
+                self._documents[part.id] = _document(part)
+                self._codes[code] = part.id
+                self._advance_watermark(part)
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """Top `limit` parts matching every term of `query`, best first"""
+        terms = tokens(query)
+        if not terms:
+            return []
+
+        with self._lock:
+            built = None
+            delta: Optional[Dict[int, int]] = None
+            for term in terms:
+                term_built = self._match_built(term)
+                built = term_built if built is None else np.where(term_built > 0, built + term_built, 0)
+
+                term_delta = self._match_delta(term)
+                delta = term_delta if delta is None else {
+                    pid: score + term_delta[pid] for pid, score in delta.items() if pid in term_delta
+                }
+            built = np.where(self._live, built, 0)
+
+            exact = self._codes.get("".join(terms))
+            if exact is not None:
+                if exact in delta:
+                    delta[exact] += CODE_EXACT
+                elif exact in self._positions and built[self._positions[exact]] > 0:
+                    built[self._positions[exact]] += CODE_EXACT
+
+            # Best `limit` built positions by (score, tiebreak), merged with the delta matches
+            count = len(self._ids)
+            key = built.astype(np.int64) * (count + 1) + (count - self._tiebreak)
+            matched = np.flatnonzero(built)
+            if len(matched) > limit:
+                matched = matched[np.argpartition(-key[matched], limit - 1)[:limit]]
+            candidates = [(int(self._ids[position]), int(built[position])) for position in matched]
+            candidates.extend(delta.items())
+
+            documents = self._documents
+            best = heapq.nsmallest(limit, candidates, key=lambda item: _rank_key(documents[item[0]], item[1]))
+            return [{**documents[pid], "score": score} for pid, score in best]
+
+    def __len__(self):
+        return len(self._documents)
+
+    @staticmethod
+    def _columns():
+        return [
+            InventoryMaster.id, InventoryMaster.part_code, InventoryMaster.part_name, InventoryMaster.category,
+            InventoryMaster.description, InventoryMaster.unit_of_issue, InventoryMaster.unit_price,
+            InventoryMaster.updated_at
+        ]
+
+    def _match_built(self, term: str) -> np.ndarray:
+        """Score per built position for one term: best token-prefix hit, else a trigram-confirmed infix hit"""
+        scores = np.zeros(len(self._ids), dtype=np.int32)
+        # Tokens are [0-9a-z]+, so "{" sorts after every token starting with `term`
+        low = bisect_left(self._tokens, term)
+        high = bisect_left(self._tokens, term + "{", low)
+        start, end = self._token_starts[low], self._token_starts[high]
+        if end > start:
+            positions, field_scores = self._posting_positions[start:end], self._posting_scores[start:end]
+            # Assigning each field score in ascending order leaves every part with its best one
+            for field_score in FIELD_SCORES:
+                scores[positions[field_scores == field_score]] = field_score
+
+        if len(term) >= 3:
+            postings = [self._grams.get(gram) for gram in {term[i:i + 3] for i in range(len(term) - 2)}]
+            if all(p is not None for p in postings):
+                hits = np.zeros(len(self._ids), dtype=np.int16)
+                for positions in postings:
+                    hits[positions] += 1
+                # Only parts the prefix scan missed need the infix check
+                candidates = np.flatnonzero((hits == len(postings)) & (scores == 0))
+                if len(term) > 3:
+                    # Sharing all trigrams does not guarantee the substring itself
+                    candidates = [p for p in candidates.tolist() if term in self._texts[p]]
+                scores[candidates] = INFIX
+        return scores
+
+    def _match_delta(self, term: str) -> Dict[int, int]:
+        matched = {}
+        for pid, (part_tokens, text) in self._delta.items():
+            score = max((s for token, s in part_tokens.items() if token.startswith(term)), default=0)
+            if not score and len(term) >= 3 and term in text:
+                score = INFIX
+            if score:
+                matched[pid] = score
+        return matched
+
+    def _built(self, parts) -> "PartSearchIndex":
+        """A new index holding `parts` in the built (array) form"""
+        fresh = PartSearchIndex()
+        token_ids: Dict[str, int] = {}
+        posting_tokens, posting_positions, posting_scores = [], [], []
+        grams: Dict[str, list] = {}
+
+        for position, part in enumerate(parts):
+            part_tokens, code, text = _part_terms(part)
+            for token, score in part_tokens.items():
+                posting_tokens.append(token_ids.setdefault(token, len(token_ids)))
+                posting_positions.append(position)
+                posting_scores.append(score)
+            for gram in _trigrams(text):
+                grams.setdefault(gram, []).append(position)
+            fresh._positions[part.id] = position
+            fresh._texts.append(text)
+            fresh._documents[part.id] = _document(part)
+            fresh._codes[code] = part.id
+            fresh._advance_watermark(part)
+
+        fresh._ids = np.fromiter(fresh._positions, dtype=np.int64, count=len(fresh._positions))
+        fresh._live = np.ones(len(fresh._ids), dtype=bool)
+        documents = [fresh._documents[pid] for pid in fresh._ids.tolist()]
+        order = sorted(range(len(documents)), key=lambda i: _rank_key(documents[i], 0))
+        fresh._tiebreak = np.empty(len(documents), dtype=np.int64)
+        fresh._tiebreak[order] = np.arange(len(documents))
+
+        # Renumber tokens in sorted order and group postings by token
+        fresh._tokens = sorted(token_ids)
+        rank = np.empty(len(token_ids), dtype=np.int64)
+        rank[[token_ids[token] for token in fresh._tokens]] = np.arange(len(token_ids))
+        posting_ranks = rank[np.array(posting_tokens, dtype=np.int64)]
+        grouping = np.argsort(posting_ranks, kind="stable")
+        fresh._posting_positions = np.array(posting_positions, dtype=np.int32)[grouping]
+        fresh._posting_scores = np.array(posting_scores, dtype=np.int16)[grouping]
+        fresh._token_starts = np.searchsorted(posting_ranks[grouping], np.arange(len(token_ids) + 1))
+        fresh._grams = {gram: np.array(positions, dtype=np.int64) for gram, positions in grams.items()}
+
+        fresh.built_at = fresh._refreshed_at = time.monotonic()
+        return fresh
+
+    def _swap(self, fresh: "PartSearchIndex"):
+        with self._lock:
+            # Searches already running keep using the old arrays
+            self.__dict__.update({name: value for name, value in vars(fresh).items() if name != "_lock"})
+
+    def _advance_watermark(self, part):
+        updated_at = getattr(part, "updated_at", None)
+        if updated_at and (self._watermark is None or updated_at > self._watermark):
+            self._watermark = updated_at
+
+
+index = PartSearchIndex()
@@ -0,0 +1,263 @@
+# app/services/pm_scheduler.py
+"""
+Preventive maintenance scheduler.
+Every active plan is paired with the assets in its scope by one query (which also brings the last
+generated window of each pair), and the due window of every pair is computed in one vectorized pass:
+
+* calendar plans - window n falls due on start_date + n * interval_days and is generated lead_days early
+* meter plans    - window n is reached at n * interval_running_hours of Asset.running_hours
+
+A pair is generated when its due window is past the last one generated for it. Windows missed while
+the scheduler was not running are not back-filled; the latest one stands for them. Occurrences are
+claimed with INSERT ... ON CONFLICT DO NOTHING, so repeated or concurrent runs for the same window
+create one work order.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import and_, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.asset import Asset
+from app.models.pm_plan import PMOccurrence, PMPlan
+from app.models.work_order import WorkOrderTask
+from app.services import reliability, work_order_bulk, work_order_numbers
+
+# Assets in these states get no preventive maintenance
+RETIRED_STATUSES = ("inactive", "retired", "decommissioned", "disposed")
+
+
+@dataclass
+class PlanPairs:
+    """Column arrays, one entry per (active plan, in-scope asset) pair"""
+    plan_id: np.ndarray
+    asset_id: np.ndarray
+    interval_days: np.ndarray  # NaN for meter plans
+    interval_hours: np.ndarray  # NaN for calendar plans
+    start: np.ndarray  # datetime64[D]
+    lead_days: np.ndarray
+    running_hours: np.ndarray  # NaN if unknown
+    estimated_hours: np.ndarray
+    last_window: np.ndarray  # -1 if never generated
+
+    def __len__(self):
+        return len(self.plan_id)
+
+    @property
+    def calendar(self) -> np.ndarray:
+        return ~np.isnan(self.interval_days)
+
+
+def load_pairs(db: Session) -> PlanPairs:
+    last = select(
+        PMOccurrence.plan_id, PMOccurrence.asset_id, func.max(PMOccurrence.due_window).label("last_window")
+    ).group_by(PMOccurrence.plan_id, PMOccurrence.asset_id).subquery()
+
+    rows = db.execute(
+        select(
+            PMPlan.id, Asset.id, PMPlan.interval_days, PMPlan.interval_running_hours, PMPlan.start_date,
+            PMPlan.lead_days, Asset.running_hours, PMPlan.estimated_hours, last.c.last_window
+        ).select_from(PMPlan).join(
+            Asset,
+            or_(Asset.id == PMPlan.asset_id, and_(PMPlan.asset_id.is_(None), Asset.asset_category_id == PMPlan.asset_category_id))
+        ).outerjoin(
+            last, and_(last.c.plan_id == PMPlan.id, last.c.asset_id == Asset.id)
+        ).where(
+            PMPlan.active.is_(True),
+            or_(Asset.status.is_(None), Asset.status.notin_(RETIRED_STATUSES))
+        ).order_by(PMPlan.id, Asset.id)
+    ).all()
+
+    def floats(position):
+        return np.array([float(row[position]) if row[position] is not None else np.nan for row in rows], dtype=np.float64)
+
+    return PlanPairs(
+        plan_id=np.array([row[0] for row in rows], dtype=np.int64),
+        asset_id=np.array([row[1] for row in rows], dtype=np.int64),
+        interval_days=floats(2),
+        interval_hours=floats(3),
+        start=np.array([row[4] for row in rows], dtype="datetime64[D]"),
+        lead_days=np.array([row[5] or 0 for row in rows], dtype=np.int64),
+        running_hours=floats(6),
+        estimated_hours=np.nan_to_num(floats(7)),
+        last_window=np.array([row[8] if row[8] is not None else -1 for row in rows], dtype=np.int64)
+    )
+
+
+def _calendar_day(pairs: PlanPairs, index: np.ndarray, window: np.ndarray) -> np.ndarray:
+    """Due date of calendar `window` for the pairs at `index`"""
+    days = window * np.nan_to_num(pairs.interval_days[index]).astype(np.int64)
+    return pairs.start[index] + days.astype("timedelta64[D]")
+
+
+def due_windows(pairs: PlanPairs, as_of: date):
+    """(pair indexes, due windows, due dates) of pairs to generate on `as_of`"""
+    today = np.datetime64(as_of, "D")
+    calendar = pairs.calendar
+    with np.errstate(invalid="ignore", divide="ignore"):
+        horizon = (today + pairs.lead_days.astype("timedelta64[D]") - pairs.start).astype(np.float64)
+        window = np.where(calendar, np.floor(horizon / pairs.interval_days), np.floor(pairs.running_hours / pairs.interval_hours))
+    # Meter window 0 is a new asset, not a completed interval
+    reached = np.isfinite(window) & (window >= np.where(calendar, 0, 1))
+    window = np.where(reached, window, -1).astype(np.int64)
+
+    index = np.flatnonzero(reached & (window > pairs.last_window))
+    window = window[index]
+    due = np.where(calendar[index], _calendar_day(pairs, index, window), today)
+    return index, window, due
+
+
+def generate(db: Session, as_of: Optional[date] = None, dry_run: bool = False) -> dict:
+    """
+    Create the work orders (with their tasks) of every due plan/asset pair.
+    Commits nothing; the caller commits or, for a dry run, nothing is written.
+    """
+    as_of = as_of or date.today()
+    pairs = load_pairs(db)
+    index, window, due = due_windows(pairs, as_of)
+    occurrences = [
+        {
+            "plan_id": int(pairs.plan_id[i]),
+            "asset_id": int(pairs.asset_id[i]),
+            "due_window": int(w),
+            "due_date": d.item()
+        }
+        for i, w, d in zip(index.tolist(), window.tolist(), due)
+    ]
+    if dry_run or not occurrences:
+        return {"as_of": as_of, "dry_run": dry_run, "due": len(occurrences), "created": 0, "occurrences": occurrences}
+
+    # Reserved before this transaction writes (see work_order_numbers); a lost claim leaves a gap
+    numbers = work_order_numbers.allocator.allocate(len(occurrences))
+
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    claimed = db.execute(
+        dialect.insert(PMOccurrence).on_conflict_do_nothing(
+            index_elements=[PMOccurrence.plan_id, PMOccurrence.asset_id, PMOccurrence.due_window]
+        ).returning(PMOccurrence.id, PMOccurrence.plan_id, PMOccurrence.asset_id, PMOccurrence.due_window),
+        occurrences
+    ).all()
+    claimed_keys = {(row.plan_id, row.asset_id, row.due_window): row.id for row in claimed}
+    occurrences = [o for o in occurrences if (o["plan_id"], o["asset_id"], o["due_window"]) in claimed_keys]
+    if not occurrences:
+        return {"as_of": as_of, "dry_run": False, "due": 0, "created": 0, "occurrences": []}
+
+    plans = {
+        plan.id: plan
+        for plan in db.query(PMPlan).options(selectinload(PMPlan.tasks)).filter(
+            PMPlan.id.in_({o["plan_id"] for o in occurrences})
+        )
+    }
+    asset_names = dict(db.query(Asset.id, Asset.name).filter(Asset.id.in_({o["asset_id"] for o in occurrences})).all())
+
+    records = []
+    for occurrence in occurrences:
+        plan = plans[occurrence["plan_id"]]
+        records.append({
+            "title": f"{plan.name} - {asset_names.get(occurrence['asset_id'], '')}"[:100],
+            "description": plan.description,
+            "asset_id": occurrence["asset_id"],
+            "type_id": plan.type_id,
+            "priority": plan.priority,
+            "scheduled_date": occurrence["due_date"],
+            "estimated_hours": plan.estimated_hours
+        })
+    created = work_order_bulk.insert_work_orders(db, records, numbers=numbers[:len(records)], record_rollups=False)
+
+    db.execute(update(PMOccurrence), [
+        {"id": claimed_keys[(o["plan_id"], o["asset_id"], o["due_window"])], "work_order_id": work_order_id}
+        for o, (work_order_id, _) in zip(occurrences, created)
+    ])
+    # Only now are the work orders linked to their occurrences, i.e. counted as preventive
+    reliability.record(db, [work_order_id for work_order_id, _ in created])
+    now = datetime.utcnow()
+    tasks = [
+        {
+            "work_order_id": work_order_id,
+            "task_name": task.task_name,
+            "description": task.description,
+            "estimated_hours": task.estimated_hours,
+            "status": "pending",
+            "created_at": now,
+            "updated_at": now
+        }
+        for o, (work_order_id, _) in zip(occurrences, created)
+        for task in plans[o["plan_id"]].tasks
+    ]
+    if tasks:
+        db.execute(insert(WorkOrderTask.__table__), tasks)
+
+    for occurrence, (work_order_id, number) in zip(occurrences, created):
+        occurrence.update(work_order_id=work_order_id, work_order_number=number)
+    return {"as_of": as_of, "dry_run": False, "due": len(occurrences), "created": len(created), "occurrences": occurrences}
+
+
+def _expand(first: np.ndarray, count: np.ndarray):
+    """For pairs with windows first..first+count-1: (pair position per window, window numbers)"""
+    position = np.repeat(np.arange(len(first)), count)
+    offset = np.arange(int(count.sum())) - np.repeat(np.cumsum(count) - count, count)
+    return position, first[position] + offset
+
+
+def forecast(db: Session, months: int, as_of: Optional[date] = None, running_hours_per_day: Optional[float] = None) -> dict:
+    """
+    Work orders the plans will generate in the next `months` calendar months, per month and per plan.
+    Meter plans are projected only when `running_hours_per_day` is given.
+    """
+    as_of = as_of or date.today()
+    pairs = load_pairs(db)
+    today = np.datetime64(as_of, "D")
+    first_month = np.datetime64(as_of, "M")
+    end = (first_month + months).astype("datetime64[D]")  # exclusive
+
+    calendar = np.flatnonzero(pairs.calendar)
+    interval = pairs.interval_days[calendar]
+    since_start = (today - pairs.start[calendar]).astype(np.float64)
+    until_end = (end - 1 - pairs.start[calendar]).astype(np.float64)
+    # An ungenerated window already reached is generated at the next run, so it counts from today
+    first = np.maximum.reduce([pairs.last_window[calendar] + 1, np.floor(since_start / interval).astype(np.int64), np.zeros(len(calendar), dtype=np.int64)])
+    count = np.clip(np.floor(until_end / interval).astype(np.int64) - first + 1, 0, None)
+    position, window = _expand(first, count)
+    index = calendar[position]
+    days = np.maximum(_calendar_day(pairs, index, window), today)
+
+    meter = np.flatnonzero(~pairs.calendar & ~np.isnan(pairs.running_hours))
+    meter_excluded = int((~pairs.calendar).sum())
+    if running_hours_per_day and len(meter):
+        meter_excluded -= len(meter)
+        hours, interval = pairs.running_hours[meter], pairs.interval_hours[meter]
+        horizon_hours = hours + running_hours_per_day * (end - today).astype(np.float64)
+        first = np.maximum.reduce([pairs.last_window[meter] + 1, np.floor(hours / interval).astype(np.int64), np.ones(len(meter), dtype=np.int64)])
+        # The window reached at the end of the last day still falls inside the horizon
+        count = np.clip(np.floor(horizon_hours / interval).astype(np.int64) - first + 1, 0, None)
+        position, window = _expand(first, count)
+        meter_days = np.ceil(np.maximum(window * interval[position] - hours[position], 0) / running_hours_per_day)
+        meter_days = np.minimum(today + meter_days.astype("timedelta64[D]"), end - 1)
+        index = np.concatenate([index, meter[position]])
+        days = np.concatenate([days, meter_days])
+
+    month = (days.astype("datetime64[M]") - first_month).astype(np.int64)
+    per_month = np.bincount(month, minlength=months)[:months]
+    hours_per_month = np.bincount(month, weights=pairs.estimated_hours[index], minlength=months)[:months]
+    plan_ids, per_plan = np.unique(pairs.plan_id[index], return_counts=True)
+    names = dict(db.query(PMPlan.id, PMPlan.name).filter(PMPlan.id.in_(plan_ids.tolist())).all()) if len(plan_ids) else {}
+
+    return {
+        "as_of": as_of,
+        "months": [
+            {
+                "month": str(first_month + m),
+                "work_orders": int(per_month[m]),
+                "estimated_hours": round(float(hours_per_month[m]), 2)
+            }
+            for m in range(months)
+        ],
+        "plans": sorted(
+            ({"plan_id": int(p), "name": names.get(int(p)), "work_orders": int(c)} for p, c in zip(plan_ids, per_plan)),
+            key=lambda row: -row["work_orders"]
+        ),
+        "meter_pairs_not_projected": meter_excluded
+    }
@@ -0,0 +1,268 @@
+# app/services/receipts.py
+"""
+Bulk goods receipts.
+Delivery-note lines are streamed into a temporary staging table (COPY on PostgreSQL),
+validated against inventory_master/locations/users in one set-based pass, then posted
+with one INSERT ... SELECT into inventory_inflow, the matching ledger rows and one balance upsert.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import IO, Iterator, List, Optional
+
+from sqlalchemy import (
+    Column, Integer, MetaData, Numeric, String, Table, TIMESTAMP,
+    delete, func, insert, literal, or_, select, and_
+)
+from sqlalchemy.orm import Session
+
+from app.models.inventory import InventoryMaster, InventoryInflow
+from app.models.location import Location
+from app.models.user import User
+from app.services.stock import lock_balances, record_movements
+
+# Lines sent per executemany when COPY is not available
+STAGING_BATCH_SIZE = 5000
+
+staging_metadata = MetaData()
+
+receipt_staging = Table(
+    "receipt_staging",
+    staging_metadata,
+    Column("line_no", Integer, nullable=False),
+    Column("part_code", String(50), nullable=False),
+    Column("location_id", Integer, nullable=False),
+    Column("quantity", Integer, nullable=False),
+    Column("unit_cost", Numeric(15, 2)),
+    Column("supplier", String(100)),
+    Column("reference_number", String(100)),
+    Column("received_date", TIMESTAMP, nullable=False),
+    Column("received_by", Integer),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP"
+)
+
+STAGING_COLUMNS = [column.name for column in receipt_staging.columns]
+
+
+def read_lines(stream: IO[bytes], file_format: str) -> Iterator[tuple]:
+    """Yield (line_no, dict) pairs from a CSV (with header) or NDJSON byte stream; `stream` is left open"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        if file_format == "ndjson":
+            for line_no, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                yield line_no, record
+            return
+
+        reader = csv.DictReader(text)
+        for record in reader:
+            # Header is line 1, so data lines start at 2
+            yield reader.line_num, record
+    finally:
+        # A collected wrapper closes the stream it wraps, and a retried import re-reads the upload
+        text.detach()
+
+
+def parse_line(record: Optional[dict], defaults: dict) -> tuple:
+    """Convert one raw line into a staging row, applying delivery-note defaults; raises ValueError"""
+    if not isinstance(record, dict):
+        raise ValueError("Line is not a valid record")
+
+    def value(name):
+        raw = record.get(name)
+        if raw is None or (isinstance(raw, str) and not raw.strip()):
+            return defaults.get(name)
+        return raw.strip() if isinstance(raw, str) else raw
+
+    part_code = value("part_code")
+    if not part_code:
+        raise ValueError("part_code is required")
+
+    quantity = value("quantity")
+    try:
+        # int() would truncate an NDJSON 2.7 to 2 (and take true as 1)
+        if isinstance(quantity, bool) or (isinstance(quantity, float) and not quantity.is_integer()):
+            raise ValueError
+        quantity = int(quantity)
+    except (TypeError, ValueError):
+        raise ValueError("quantity must be an integer")
+
+    try:
+        location_id = int(value("location_id"))
+    except (TypeError, ValueError):
+        raise ValueError("location_id is required")
+
+    received_by = value("received_by")
+    try:
+        received_by = int(received_by) if received_by is not None else None
+    except (TypeError, ValueError):
+        raise ValueError("received_by must be a user id")
+
+    unit_cost = value("unit_cost")
+    try:
+        unit_cost = Decimal(str(unit_cost)) if unit_cost is not None else None
+    except InvalidOperation:
+        raise ValueError("unit_cost must be a number")
+
+    received_date = value("received_date") or datetime.now()
+    if isinstance(received_date, str):
+        try:
+            received_date = datetime.fromisoformat(received_date)
+        except ValueError:
+            raise ValueError("received_date must be an ISO date")
+
+    return (
+        str(part_code), location_id, quantity, unit_cost,
+        value("supplier"), value("reference_number"), received_date, received_by
+    )
+
+
+def _stage_rows(db: Session, rows: Iterator[tuple]):
+    """Load staging rows with COPY on PostgreSQL, batched executemany elsewhere"""
+    connection = db.connection()
+    if connection.dialect.name == "postgresql":
+        raw = connection.connection.driver_connection
+        with raw.cursor() as cursor:
+            with cursor.copy(f"COPY receipt_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+        return
+
+    batch = []
+    for row in rows:
+        batch.append(dict(zip(STAGING_COLUMNS, row)))
+        if len(batch) >= STAGING_BATCH_SIZE:
+            db.execute(insert(receipt_staging), batch)
+            batch = []
+    if batch:
+        db.execute(insert(receipt_staging), batch)
+
+
+def import_receipts(
+    db: Session,
+    stream: IO[bytes],
+    file_format: str = "csv",
+    defaults: Optional[dict] = None,
+    atomic: bool = False
+) -> dict:
+    """
+    Post every valid line of a delivery note in the caller's transaction.
+    Returns counts and an error report of rejected lines; with `atomic`, any
+    rejected line means nothing is posted.
+    """
+    defaults = defaults or {}
+    errors: List[dict] = []
+
+    receipt_staging.create(db.connection(), checkfirst=True)
+    db.execute(delete(receipt_staging))
+
+    def staged_rows():
+        for line_no, record in read_lines(stream, file_format):
+            try:
+                yield (line_no, *parse_line(record, defaults))
+            except ValueError as e:
+                errors.append({
+                    "line": line_no,
+                    "part_code": record.get("part_code") if isinstance(record, dict) else None,
+                    "error": str(e)
+                })
+
+    _stage_rows(db, staged_rows())
+    s = receipt_staging.c
+
+    total_lines = db.execute(select(func.count()).select_from(receipt_staging)).scalar() + len(errors)
+
+    # One set-based pass for unknown parts, locations and users
+    invalid = db.execute(
+        select(
+            s.line_no, s.part_code, s.location_id, s.quantity, s.received_by,
+            InventoryMaster.id.label("part_id"),
+            Location.id.label("known_location"),
+            User.id.label("known_user")
+        ).select_from(receipt_staging).outerjoin(
+            InventoryMaster, InventoryMaster.part_code == s.part_code
+        ).outerjoin(
+            Location, Location.id == s.location_id
+        ).outerjoin(
+            User, User.id == s.received_by
+        ).where(or_(
+            InventoryMaster.id.is_(None),
+            Location.id.is_(None),
+            and_(s.received_by.isnot(None), User.id.is_(None)),
+            s.quantity <= 0
+        ))
+    ).all()
+
+    for row in invalid:
+        if row.part_id is None:
+            error = f"Unknown part code {row.part_code}"
+        elif row.known_location is None:
+            error = f"Location {row.location_id} not found"
+        elif row.known_user is None and row.received_by is not None:
+            error = f"User {row.received_by} not found"
+        else:
+            error = "quantity must be positive"
+        errors.append({"line": row.line_no, "part_code": row.part_code, "error": error})
+    errors.sort(key=lambda e: e["line"])
+
+    result = {"total_lines": total_lines, "rejected_lines": len(errors), "errors": errors}
+    if atomic and errors:
+        return {**result, "posted_lines": 0}
+
+    valid = and_(
+        InventoryMaster.part_code == s.part_code,
+        s.quantity > 0,
+        or_(s.received_by.is_(None), s.received_by.in_(select(User.id)))
+    )
+    valid_lines = select(
+        InventoryMaster.id.label("spare_part_id"), s.location_id, s.quantity, s.unit_cost,
+        s.supplier, s.reference_number, s.received_date, s.received_by
+    ).select_from(receipt_staging).join(
+        InventoryMaster, valid
+    ).join(
+        Location, Location.id == s.location_id
+    ).subquery()
+
+    keys = db.execute(
+        select(valid_lines.c.spare_part_id, valid_lines.c.location_id).distinct()
+    ).all()
+    locked = lock_balances(db, [tuple(key) for key in keys])
+
+    inflows = db.execute(
+        insert(InventoryInflow).from_select(
+            ["spare_part_id", "location_id", "quantity", "unit_cost", "supplier",
+             "reference_number", "received_date", "received_by", "created_at"],
+            select(
+                valid_lines.c.spare_part_id, valid_lines.c.location_id, valid_lines.c.quantity,
+                valid_lines.c.unit_cost, valid_lines.c.supplier, valid_lines.c.reference_number,
+                valid_lines.c.received_date, valid_lines.c.received_by, literal(datetime.now())
+            )
+        ).returning(
+            InventoryInflow.id, InventoryInflow.spare_part_id, InventoryInflow.location_id,
+            InventoryInflow.quantity, InventoryInflow.received_date
+        )
+    ).all()
+
+    # Ledger rows plus one grouped balance upsert
+    record_movements(db, [
+        {
+            "spare_part_id": inflow.spare_part_id,
+            "location_id": inflow.location_id,
+            "quantity": inflow.quantity,
+            "movement_type": "receipt",
+            "reference_type": "inflow",
+            "reference_id": inflow.id,
+            "occurred_at": inflow.received_date
+        }
+        for inflow in inflows
+    ], locked)
+
+    return {**result, "posted_lines": len(inflows)}
@@ -0,0 +1,349 @@
+# app/services/reliability.py
+"""
+Reliability KPIs (MTTR, MTBF, availability, backlog) per asset, asset category and plant.
+Work orders are summed into reliability_rollups, one row per asset and month, and the KPIs are
+read from those rows only:
+
+* MTTR         - repair hours / failures, where a failure is a completed corrective work order
+                 (one not generated by a PM plan) with start_date and end_date
+* MTBF         - (asset hours in the range - repair hours) / failures
+* availability - (asset hours in the range - repair hours) / asset hours in the range
+* backlog      - work orders opened and not yet closed (completed or cancelled) at the end of the range
+
+A work order closes in the month of its end_date, which the write paths set when the status moves
+into a closed one. Later edits therefore never move a close into another month.
+
+The write paths call `record` with the rows as they were before the write, and the difference is
+added to the rollups with an upsert; `rebuild` recomputes the whole table in one vectorized pass.
+Work orders without an asset are not counted.
+"""
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import and_, case, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.asset import Asset
+from app.models.asset_category import AssetCategory
+from app.models.location import Location
+from app.models.pm_plan import PMOccurrence
+from app.models.reliability import ReliabilityRollup
+from app.models.work_order import WorkOrder
+
+CLOSED_STATUSES = ("completed", "cancelled")
+MEASURES = ("opened", "closed", "opened_hours", "closed_hours", "failures", "repair_hours")
+_COUNTS = ("opened", "closed", "failures")
+
+# group_by -> (Asset column holding the group id, group table joined for names, its name column)
+GROUPS = {
+    "asset": (Asset.id, None, Asset.name),
+    "category": (Asset.asset_category_id, AssetCategory, AssetCategory.name),
+    "plant": (Asset.location_id, Location, Location.name),
+}
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _datetimes(values: Iterable) -> np.ndarray:
+    """Naive datetimes (None as NaT) as datetime64[s]; several times faster than NumPy's object conversion"""
+    seconds = np.array([(value - _EPOCH).total_seconds() if value is not None else np.nan for value in values])
+    out = np.full(len(seconds), np.datetime64("NaT"), dtype="datetime64[s]")
+    known = ~np.isnan(seconds)
+    out[known] = seconds[known].astype(np.int64).astype("datetime64[s]")
+    return out
+
+
+def _source(ids: Optional[Iterable[int]] = None):
+    """The work order columns the rollups are computed from"""
+    preventive = select(PMOccurrence.id).where(PMOccurrence.work_order_id == WorkOrder.id).exists()
+    query = select(
+        WorkOrder.asset_id, WorkOrder.status, WorkOrder.requested_date, WorkOrder.start_date, WorkOrder.end_date,
+        WorkOrder.estimated_hours, preventive.label("preventive")
+    ).where(WorkOrder.asset_id.isnot(None))
+    if ids is not None:
+        query = query.where(WorkOrder.id.in_(list(ids)))
+    return query
+
+
+def contributions(rows: Sequence) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    What `rows` (from `_source`) add to the rollups, as events: (asset ids, months, one row of
+    MEASURES per event). A work order yields up to three events: opened, closed and failed.
+    """
+    asset = np.array([row.asset_id for row in rows], dtype=np.int64)
+    status = np.array([(row.status or "").lower() for row in rows], dtype=object)
+    requested, start, end = (_datetimes(row[position] for row in rows) for position in (2, 3, 4))
+    hours = np.array([float(row.estimated_hours or 0) for row in rows], dtype=np.float64)
+    preventive = np.array([bool(row.preventive) for row in rows], dtype=bool)
+
+    closed = np.isin(status, CLOSED_STATUSES) & ~np.isnat(end)
+    failed = (status == "completed") & ~preventive & ~np.isnat(start) & ~np.isnat(end)
+    failed[failed] = end[failed] >= start[failed]
+    repair = np.zeros(len(rows), dtype=np.float64)
+    repair[failed] = np.round((end[failed] - start[failed]) / np.timedelta64(1, "h"), 2)
+
+    assets, months, values = [], [], []
+    for mask, at, measures in (
+        (~np.isnat(requested), requested, {"opened": 1, "opened_hours": hours}),
+        (closed, end, {"closed": 1, "closed_hours": hours}),
+        (failed, end, {"failures": 1, "repair_hours": repair}),
+    ):
+        matrix = np.zeros((int(mask.sum()), len(MEASURES)), dtype=np.float64)
+        for name, value in measures.items():
+            matrix[:, MEASURES.index(name)] = np.broadcast_to(value, mask.shape)[mask]
+        assets.append(asset[mask])
+        months.append(at[mask].astype("datetime64[M]"))
+        values.append(matrix)
+    return np.concatenate(assets), np.concatenate(months), np.concatenate(values)
+
+
+def aggregate(asset: np.ndarray, month: np.ndarray, values: np.ndarray) -> List[dict]:
+    """Sum events into one rollup row per (asset, month); rows that sum to nothing are dropped"""
+    if not len(asset):
+        return []
+    # One integer key per pair: a 1-D unique sorts far faster than unique rows of a 2-D array
+    offset = 1 << 23
+    keys, inverse = np.unique((asset << 24) + month.astype(np.int64) + offset, return_inverse=True)
+    totals = np.zeros((len(keys), len(MEASURES)), dtype=np.float64)
+    for column in range(len(MEASURES)):
+        totals[:, column] = np.bincount(inverse.reshape(-1), weights=values[:, column], minlength=len(keys))
+    totals = np.round(totals, 2)
+    keep = np.any(totals != 0, axis=1)
+    keys = keys[keep]
+    periods = ((keys & ((1 << 24) - 1)) - offset).astype("datetime64[M]").astype("datetime64[D]")
+
+    rows = []
+    for asset_id, period, total in zip((keys >> 24).tolist(), periods.tolist(), totals[keep].tolist()):
+        row = {"asset_id": asset_id, "period": period}
+        for name, value in zip(MEASURES, total):
+            row[name] = int(round(value)) if name in _COUNTS else value
+        rows.append(row)
+    return rows
+
+
+def snapshot(db: Session, ids: Iterable[int]) -> list:
+    """Rows of work orders `ids` as they are now, to pass to `record` after changing them"""
+    ids = list(ids)
+    return db.execute(_source(ids)).all() if ids else []
+
+
+def record(db: Session, ids: Iterable[int], before: Sequence = ()) -> int:
+    """
+    Add to the rollups the difference between work orders `ids` now and `before` (their `snapshot`
+    from before the write; empty for new work orders). Returns the number of rollup rows touched.
+    The caller commits, so the rollups change in the same transaction as the work orders.
+    """
+    after = snapshot(db, ids)
+    new_asset, new_month, new_values = contributions(after)
+    old_asset, old_month, old_values = contributions(before)
+    rows = aggregate(
+        np.concatenate([new_asset, old_asset]),
+        np.concatenate([new_month, old_month]),
+        np.concatenate([new_values, -old_values])
+    )
+    if not rows:
+        return 0
+    table = ReliabilityRollup.__table__
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(table)
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[table.c.asset_id, table.c.period],
+            set_={name: table.c[name] + statement.excluded[name] for name in MEASURES}
+        ),
+        rows
+    )
+    return len(rows)
+
+
+def compute(db: Session, batch_size: int = 50000) -> List[dict]:
+    """Rollup rows recomputed from every work order, read in batches"""
+    events = []
+    result = db.connection().execution_options(yield_per=batch_size).execute(_source())
+    for rows in result.partitions():
+        events.append(contributions(rows))
+    if not events:
+        return []
+    return aggregate(*(np.concatenate(parts) for parts in zip(*events)))
+
+
+def date_closes(db: Session) -> int:
+    """
+    Give closed work orders without an end_date their last update as one, so they keep the month
+    they were last counted in. Only rows from before end_date was set on closing need it.
+    """
+    result = db.execute(
+        update(WorkOrder)
+        .where(WorkOrder.status.in_(CLOSED_STATUSES), WorkOrder.end_date.is_(None))
+        .values(end_date=func.coalesce(WorkOrder.updated_at, WorkOrder.created_at, WorkOrder.requested_date))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def rebuild(db: Session) -> int:
+    """
+    Date any undated closes, then replace the rollups with a full recompute; returns the number of
+    rows written. The caller commits.
+    """
+    date_closes(db)
+    rows = compute(db)
+    db.execute(delete(ReliabilityRollup))
+    if rows:
+        db.execute(insert(ReliabilityRollup.__table__), rows)
+    return len(rows)
+
+
+def differences(db: Session) -> List[dict]:
+    """Rollup rows that differ from a full recompute, with the stored and computed measures"""
+    computed = {(row["asset_id"], row["period"]): row for row in compute(db)}
+    stored = {}
+    for rollup in db.execute(select(ReliabilityRollup.__table__)).mappings():
+        stored[(rollup["asset_id"], rollup["period"])] = {
+            name: int(rollup[name]) if name in _COUNTS else float(rollup[name]) for name in MEASURES
+        }
+    zero = dict.fromkeys(MEASURES, 0)
+    out = []
+    for key in sorted(set(computed) | set(stored)):
+        expected = {name: computed.get(key, zero)[name] for name in MEASURES}
+        actual = stored.get(key, zero)
+        if any(abs(expected[name] - actual[name]) > 0.005 for name in MEASURES):
+            out.append({"asset_id": key[0], "period": key[1], "stored": actual, "computed": expected})
+    return out
+
+
+def month_end(month: date) -> date:
+    """First day of the month after `month`"""
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _hours(start: date, end: date, as_of: datetime) -> float:
+    """Hours from the start of `start` to the earlier of `end` and `as_of`"""
+    until = min(datetime.combine(end, datetime.min.time()), as_of)
+    return max((until - datetime.combine(start, datetime.min.time())).total_seconds() / 3600, 0.0)
+
+
+def _kpis(assets: int, hours: float, failures: int, repair_hours: float) -> dict:
+    capacity = assets * hours
+    uptime = max(capacity - repair_hours, 0.0)
+    return {
+        "mttr_hours": round(repair_hours / failures, 2) if failures else None,
+        "mtbf_hours": round(uptime / failures, 2) if failures else None,
+        "availability": round(uptime / capacity, 4) if capacity else None
+    }
+
+
+def _measures(start: date, end: date):
+    """Rollup sums: the flows within [start, end) and the backlog left open at `end`"""
+    in_range = and_(ReliabilityRollup.period >= start, ReliabilityRollup.period < end)
+    before_end = ReliabilityRollup.period < end
+
+    def within(column):
+        return func.coalesce(func.sum(case((in_range, column), else_=0)), 0)
+
+    return (
+        within(ReliabilityRollup.opened).label("opened"),
+        within(ReliabilityRollup.closed).label("closed"),
+        within(ReliabilityRollup.failures).label("failures"),
+        within(ReliabilityRollup.repair_hours).label("repair_hours"),
+        func.coalesce(func.sum(case(
+            (before_end, ReliabilityRollup.opened - ReliabilityRollup.closed), else_=0
+        )), 0).label("backlog"),
+        func.coalesce(func.sum(case(
+            (before_end, ReliabilityRollup.opened_hours - ReliabilityRollup.closed_hours), else_=0
+        )), 0).label("backlog_hours")
+    )
+
+
+def summary(db: Session, group_by: str, start: date, end: date, as_of: Optional[datetime] = None) -> dict:
+    """
+    KPIs per group over the months [start, end). Every group with assets is listed, including
+    those without work orders. Asset hours run to `as_of` (default now) within the current month.
+    """
+    as_of = as_of or datetime.now()
+    group_column, group_table, name_column = GROUPS[group_by]
+    hours = _hours(start, end, as_of)
+
+    assets_query = select(group_column, name_column, func.count(Asset.id)).select_from(Asset)
+    if group_table is not None:
+        assets_query = assets_query.outerjoin(group_table, group_table.id == group_column)
+    groups = db.execute(assets_query.group_by(group_column, name_column)).all()
+
+    sums: Dict[Optional[int], object] = {
+        row[0]: row
+        for row in db.execute(
+            select(group_column, *_measures(start, end)).select_from(ReliabilityRollup).join(
+                Asset, Asset.id == ReliabilityRollup.asset_id
+            ).group_by(group_column)
+        )
+    }
+
+    out = []
+    for group_id, name, assets in groups:
+        row = sums.get(group_id)
+        failures = int(row.failures) if row else 0
+        repair_hours = float(row.repair_hours) if row else 0.0
+        out.append({
+            "id": group_id,
+            "name": name,
+            "assets": assets,
+            "failures": failures,
+            "repair_hours": round(repair_hours, 2),
+            **_kpis(assets, hours, failures, repair_hours),
+            "opened": int(row.opened) if row else 0,
+            "closed": int(row.closed) if row else 0,
+            "backlog": int(row.backlog) if row else 0,
+            "backlog_hours": round(float(row.backlog_hours), 2) if row else 0.0
+        })
+    out.sort(key=lambda group: (-group["failures"], group["name"] or ""))
+    return {"group_by": group_by, "start": start, "end": end, "hours": round(hours, 2), "groups": out}
+
+
+def trend(
+    db: Session, start: date, end: date, group_by: Optional[str] = None, group_id: Optional[int] = None,
+    as_of: Optional[datetime] = None
+) -> dict:
+    """KPIs per month over [start, end) for every asset, or for one group"""
+    as_of = as_of or datetime.now()
+    asset_filter = []
+    if group_by is not None:
+        asset_filter.append(GROUPS[group_by][0] == group_id)
+    assets = db.execute(select(func.count(Asset.id)).where(*asset_filter)).scalar()
+
+    # Every month before `end` is read, so the backlog can be carried forward into the range
+    rows = db.execute(
+        select(
+            ReliabilityRollup.period,
+            func.sum(ReliabilityRollup.opened), func.sum(ReliabilityRollup.closed),
+            func.sum(ReliabilityRollup.opened_hours), func.sum(ReliabilityRollup.closed_hours),
+            func.sum(ReliabilityRollup.failures), func.sum(ReliabilityRollup.repair_hours)
+        ).join(Asset, Asset.id == ReliabilityRollup.asset_id).where(
+            ReliabilityRollup.period < end, *asset_filter
+        ).group_by(ReliabilityRollup.period).order_by(ReliabilityRollup.period)
+    ).all()
+    periods = np.array([row[0] for row in rows], dtype="datetime64[M]")
+    values = np.array([[float(value or 0) for value in row[1:]] for row in rows], dtype=np.float64).reshape(-1, 6)
+    backlog = np.cumsum(values[:, 0] - values[:, 1])
+    backlog_hours = np.cumsum(values[:, 2] - values[:, 3])
+
+    first, stop = np.datetime64(start, "M"), np.datetime64(end, "M")
+    months = []
+    for month in np.arange(first, stop).tolist():
+        position = int(np.searchsorted(periods, np.datetime64(month, "M"), side="right")) - 1
+        here = position >= 0 and periods[position] == np.datetime64(month, "M")
+        opened, closed, _, _, failures, repair_hours = values[position] if here else np.zeros(6)
+        month_start = date(month.year, month.month, 1)
+        months.append({
+            "month": month_start.strftime("%Y-%m"),
+            "failures": int(failures),
+            "repair_hours": round(float(repair_hours), 2),
+            **_kpis(assets, _hours(month_start, month_end(month_start), as_of), int(failures), float(repair_hours)),
+            "opened": int(opened),
+            "closed": int(closed),
+            "backlog": int(round(backlog[position])) if position >= 0 else 0,
+            "backlog_hours": round(float(backlog_hours[position]), 2) if position >= 0 else 0.0
+        })
+    return {"group_by": group_by, "group_id": group_id, "assets": assets, "months": months}
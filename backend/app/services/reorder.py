@@ -0,0 +1,235 @@
+# app/services/reorder.py
+"""
+Reorder-point and demand-forecast engine.
+Balances and daily WorkOrderPart consumption are loaded into NumPy arrays and every
+part/location pair is scored in one vectorized pass:
+
+* demand rate  - exponentially smoothed daily consumption over the history window
+* safety stock - z * smoothed standard deviation * sqrt(lead time)
+* reorder point - max(minimum_quantity, rate * lead time + safety stock)
+
+Results are cached per parameter set until the next stock movement or part change.
+"""
+import threading
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core import cache
+from app.models.inventory import InventoryMaster, InventoryBalance
+from app.models.stock_movement import StockMovement
+from app.models.work_order import WorkOrderPart
+
+
+@dataclass(frozen=True)
+class ReorderParameters:
+    lead_time_days: int = 14
+    review_days: int = 30
+    service_z: float = 1.65  # ~95% cycle service level
+    alpha: float = 0.1  # smoothing factor per day
+    history_days: int = 180
+
+
+@dataclass
+class ReorderResult:
+    """Column arrays, one entry per part/location pair, sorted most urgent first"""
+    spare_part_id: np.ndarray
+    location_id: np.ndarray
+    in_stock: np.ndarray
+    minimum_quantity: np.ndarray
+    daily_rate: np.ndarray
+    days_of_cover: np.ndarray
+    safety_stock: np.ndarray
+    reorder_point: np.ndarray
+    suggested_quantity: np.ndarray
+    unit_price: np.ndarray
+
+    def __len__(self):
+        return len(self.spare_part_id)
+
+
+# Parameter sets kept per stock version; each result holds a few arrays per part/location pair
+CACHE_MAX_ENTRIES = 8
+
+_cache: Dict[Tuple, Tuple[Tuple, ReorderResult]] = {}
+_cache_lock = threading.Lock()
+
+
+def stock_version(db: Session) -> Tuple:
+    """Changes whenever a stock movement is recorded or a part is created or edited"""
+    return db.execute(
+        select(
+            select(func.max(StockMovement.id)).scalar_subquery(),
+            select(func.max(WorkOrderPart.id)).scalar_subquery(),
+            select(func.max(InventoryMaster.updated_at)).scalar_subquery(),
+            select(func.count(InventoryMaster.id)).scalar_subquery()
+        )
+    ).one()._tuple()
+
+
+def get_reorder_result(db: Session, params: ReorderParameters, today: Optional[date] = None) -> ReorderResult:
+    """Return the cached result for `params` and the day, recomputing it if stock has moved since"""
+    # Keyed on the actual day, so a result from before midnight is not served after it
+    today = today or date.today()
+    version = stock_version(db)
+    key = (params, today)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+
+    result = compute_reorder(db, params, today)
+    with _cache_lock:
+        # Results for superseded stock versions are never served again
+        for stale in [k for k, (v, _) in _cache.items() if v != version]:
+            del _cache[stale]
+        while len(_cache) >= CACHE_MAX_ENTRIES:
+            del _cache[next(iter(_cache))]
+        _cache[key] = (version, result)
+    return result
+
+
+def compute_reorder(db: Session, params: ReorderParameters, today: Optional[date] = None) -> ReorderResult:
+    """Score every part/location pair with stock or recent consumption"""
+    today = today or date.today()
+    since = today - timedelta(days=params.history_days)
+
+    balances = db.execute(
+        select(InventoryBalance.spare_part_id, InventoryBalance.location_id, InventoryBalance.in_stock)
+    ).all()
+    consumption = db.execute(
+        select(
+            WorkOrderPart.spare_part_id,
+            WorkOrderPart.location_id,
+            func.date(WorkOrderPart.created_at).label("day"),
+            func.sum(WorkOrderPart.quantity_used)
+        ).where(
+            WorkOrderPart.created_at >= since,
+            WorkOrderPart.spare_part_id.isnot(None),
+            WorkOrderPart.location_id.isnot(None)
+        ).group_by(
+            WorkOrderPart.spare_part_id, WorkOrderPart.location_id, func.date(WorkOrderPart.created_at)
+        )
+    ).all()
+    parts = db.execute(
+        select(InventoryMaster.id, InventoryMaster.minimum_quantity, InventoryMaster.unit_price)
+    ).all()
+
+    bal = np.array([tuple(row) for row in balances], dtype=np.int64).reshape(-1, 3)
+    if consumption:
+        con_keys = np.array([(row[0], row[1]) for row in consumption], dtype=np.int64)
+        con_days = np.array([row[2] for row in consumption], dtype="datetime64[D]")
+        con_qty = np.array([row[3] for row in consumption], dtype=np.float64)
+    else:
+        con_keys = np.empty((0, 2), dtype=np.int64)
+        con_days = np.empty(0, dtype="datetime64[D]")
+        con_qty = np.empty(0, dtype=np.float64)
+
+    # Pair index over the union of balance and consumption keys
+    location_span = int(max(bal[:, 1].max(initial=0), con_keys[:, 1].max(initial=0))) + 1
+    bal_code = bal[:, 0] * location_span + bal[:, 1]
+    con_code = con_keys[:, 0] * location_span + con_keys[:, 1]
+    pair_codes, inverse = np.unique(np.concatenate([bal_code, con_code]), return_inverse=True)
+    bal_idx, con_idx = inverse[:len(bal_code)], inverse[len(bal_code):]
+    n = len(pair_codes)
+
+    spare_part_id = pair_codes // location_span
+    location_id = pair_codes % location_span
+    in_stock = np.zeros(n, dtype=np.int64)
+    in_stock[bal_idx] = bal[:, 2]
+
+    # Exponential smoothing with a zero start is a weighted sum of observations:
+    # level = sum(alpha * (1 - alpha) ** age * x), renormalised for the finite window
+    age = (np.datetime64(today, "D") - con_days).astype(np.int64).clip(min=0)
+    weights = params.alpha * (1.0 - params.alpha) ** age
+    norm = 1.0 - (1.0 - params.alpha) ** (params.history_days + 1)
+    daily_rate = np.bincount(con_idx, weights=weights * con_qty, minlength=n) / norm
+    second_moment = np.bincount(con_idx, weights=weights * con_qty ** 2, minlength=n) / norm
+    sigma = np.sqrt(np.clip(second_moment - daily_rate ** 2, 0.0, None))
+
+    # Part attributes looked up through a dense id -> row index table
+    part_ids = np.array([row[0] for row in parts], dtype=np.int64)
+    lookup = np.full(int(max(part_ids.max(initial=0), spare_part_id.max(initial=0))) + 1, -1, dtype=np.int64)
+    lookup[part_ids] = np.arange(len(part_ids))
+    part_index = lookup[spare_part_id]
+    known = part_index >= 0
+    part_minimum = np.array([row[1] or 0 for row in parts], dtype=np.int64)
+    part_price = np.array([float(row[2] or 0) for row in parts], dtype=np.float64)
+    minimum_quantity = np.where(known, part_minimum[part_index], 0) if len(parts) else np.zeros(n, dtype=np.int64)
+    unit_price = np.where(known, part_price[part_index], 0.0) if len(parts) else np.zeros(n)
+
+    safety_stock = params.service_z * sigma * np.sqrt(params.lead_time_days)
+    reorder_point = np.maximum(minimum_quantity, daily_rate * params.lead_time_days + safety_stock)
+    order_up_to = np.maximum(
+        minimum_quantity, daily_rate * (params.lead_time_days + params.review_days) + safety_stock
+    )
+    needs_order = in_stock <= reorder_point
+    suggested_quantity = np.where(needs_order, np.ceil(np.clip(order_up_to - in_stock, 0, None)), 0).astype(np.int64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_of_cover = np.where(daily_rate > 0, in_stock / daily_rate, np.inf)
+
+    # Most urgent first: lowest cover, then largest shortfall below the reorder point
+    ranking = np.lexsort((in_stock - reorder_point, days_of_cover))
+    ranking = ranking[known[ranking]]
+
+    return ReorderResult(
+        spare_part_id=spare_part_id[ranking],
+        location_id=location_id[ranking],
+        in_stock=in_stock[ranking],
+        minimum_quantity=minimum_quantity[ranking],
+        daily_rate=daily_rate[ranking],
+        days_of_cover=days_of_cover[ranking],
+        safety_stock=safety_stock[ranking],
+        reorder_point=reorder_point[ranking],
+        suggested_quantity=suggested_quantity[ranking],
+        unit_price=unit_price[ranking]
+    )
+
+
+def select_suggestions(
+    result: ReorderResult,
+    location_id: Optional[int] = None,
+    spare_part_id: Optional[int] = None,
+    only_reorder: bool = True
+) -> np.ndarray:
+    """Indexes into `result` matching the filters, in ranking order"""
+    mask = np.ones(len(result), dtype=bool)
+    if location_id is not None:
+        mask &= result.location_id == location_id
+    if spare_part_id is not None:
+        mask &= result.spare_part_id == spare_part_id
+    if only_reorder:
+        mask &= result.suggested_quantity > 0
+    return np.flatnonzero(mask)
+
+
+def suggestion_rows(db: Session, result: ReorderResult, indexes: np.ndarray) -> list:
+    """Serialize the selected pairs, resolving part and location names for just this page"""
+    parts = cache.parts.get_many(db, [int(result.spare_part_id[i]) for i in indexes])
+    locations = cache.locations.get_many(db, [int(result.location_id[i]) for i in indexes])
+
+    rows = []
+    for i in indexes:
+        part = parts.get(int(result.spare_part_id[i]))
+        location = locations.get(int(result.location_id[i]))
+        cover = float(result.days_of_cover[i])
+        rows.append({
+            "spare_part_id": int(result.spare_part_id[i]),
+            "part_code": part["part_code"] if part else None,
+            "part_name": part["part_name"] if part else None,
+            "location_id": int(result.location_id[i]),
+            "location_name": location["name"] if location else "Unknown",
+            "in_stock": int(result.in_stock[i]),
+            "minimum_quantity": int(result.minimum_quantity[i]),
+            "daily_rate": round(float(result.daily_rate[i]), 4),
+            "days_of_cover": round(cover, 1) if np.isfinite(cover) else None,
+            "safety_stock": round(float(result.safety_stock[i]), 2),
+            "reorder_point": round(float(result.reorder_point[i]), 2),
+            "suggested_quantity": int(result.suggested_quantity[i]),
+            "estimated_cost": round(float(result.suggested_quantity[i] * result.unit_price[i]), 2)
+        })
+    return rows
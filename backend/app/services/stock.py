@@ -0,0 +1,522 @@
+# app/services/stock.py
+"""
+Set-based stock mutations.
+Every change is appended to the stock_movements ledger and folded into inventory_balances,
+which is a materialized projection of the ledger. Balance rows are always locked in
+(spare_part_id, location_id) order, so concurrent writers queue instead of deadlocking, and
+written with a compare-and-swap on their version column, so a row that changed after it was
+read (where row locks are unavailable, or for rows that did not exist yet) fails the write
+instead of being overwritten. run_stock_transaction retries such conflicts and transient
+serialization/deadlock errors with jittered backoff.
+"""
+import random
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import Integer, and_, bindparam, column, delete, insert, literal, select, tuple_, union_all, update, values
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.core import events, metrics
+from app.models.inventory import InventoryBalance
+from app.models.location import Location
+from app.models.stock_movement import StockMovement, StockSnapshot
+from app.models.transfer import TransferHeader, TransferItem
+from app.models.work_order import WorkOrderPart
+
+BalanceKey = Tuple[int, int]  # (spare_part_id, location_id)
+
+BALANCE_COLUMNS = ("in_stock", "total_received", "total_consumption")
+
+# Attempts per stock transaction and the backoff ceiling between them, in seconds
+RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.02
+RETRY_MAX_DELAY = 0.5
+
+# SQLSTATEs worth retrying: serialization_failure, deadlock_detected, lock_not_available
+_RETRYABLE_SQLSTATES = {"40001": "serialization", "40P01": "deadlock", "55P03": "lock_timeout"}
+
+T = TypeVar("T")
+
+
+class StockConflict(Exception):
+    """Balance rows changed between read and write"""
+
+    def __init__(self, keys: Iterable[BalanceKey] = ()):
+        self.keys = sorted(set(keys))
+        super().__init__(f"Stock changed concurrently for {len(self.keys)} balance(s); retry the request")
+
+
+class InsufficientStock(Exception):
+    """Some balances cannot cover the requested quantities; `shortages` lists them"""
+
+    def __init__(self, shortages: List[dict]):
+        self.shortages = shortages
+        super().__init__(f"Insufficient stock for {len(shortages)} part/location(s)")
+
+
+class LockedBalances(dict):
+    """{key: in_stock} for locked balance rows, with the version each row was read at; _swap_balances advances both"""
+
+    def __init__(self, rows=()):
+        super().__init__()
+        self.versions: Dict[BalanceKey, int] = {}
+        for row in rows:
+            key = (row.spare_part_id, row.location_id)
+            self[key] = row.in_stock
+            self.versions[key] = row.version
+
+
+def upsert_insert(db: Session, model):
+    """Dialect-specific INSERT supporting on_conflict_do_update"""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def lock_balances(db: Session, keys: Iterable[BalanceKey]) -> LockedBalances:
+    """
+    Lock the existing balance rows for `keys` (SELECT ... FOR UPDATE, in key order)
+    and return their current in_stock and version. Keys without a row are absent.
+    """
+    keys = sorted(set(keys))
+    if not keys:
+        return LockedBalances()
+
+    rows = db.query(
+        InventoryBalance.spare_part_id,
+        InventoryBalance.location_id,
+        InventoryBalance.in_stock,
+        InventoryBalance.version
+    ).filter(
+        tuple_(InventoryBalance.spare_part_id, InventoryBalance.location_id).in_(keys)
+    ).order_by(
+        InventoryBalance.spare_part_id, InventoryBalance.location_id
+    ).with_for_update().all()
+
+    return LockedBalances(rows)
+
+
+def apply_balance_deltas(db: Session, deltas: Dict[BalanceKey, Dict[str, int]], locked: Optional[LockedBalances] = None):
+    """
+    Add signed per-column deltas to balance rows, creating missing rows.
+    `deltas` maps (spare_part_id, location_id) to {"in_stock": ..., "total_received": ..., ...}.
+    With `locked` (from lock_balances), rows are compared-and-swapped against the versions read
+    there and rows it found missing must still be missing; otherwise StockConflict is raised.
+    Without it, deltas are added unconditionally in one upsert.
+    Every changed balance is announced as a balance.changed event when the transaction commits.
+    """
+    if not deltas:
+        return
+    if locked is not None:
+        _swap_balances(db, deltas, locked)
+    else:
+        _add_balances(db, deltas)
+
+    for (part_id, location_id), delta in sorted(deltas.items()):
+        if not any(delta.get(column, 0) for column in BALANCE_COLUMNS):
+            continue
+        # Rows read under lock (and advanced by _swap_balances) give the balance after this write
+        in_stock = locked[(part_id, location_id)] if locked is not None else None
+        stage_balance_event(db, part_id, location_id, delta.get("in_stock", 0), in_stock)
+
+
+def stage_balance_event(db: Session, part_id: int, location_id: int, change: int, in_stock: Optional[int] = None):
+    """Announce a balance change when the transaction commits"""
+    data = {"spare_part_id": part_id, "in_stock_change": change}
+    if in_stock is not None:
+        data["in_stock"] = in_stock
+    events.stage(db, "balance.changed", location_id, data)
+
+
+def _add_balances(db: Session, deltas: Dict[BalanceKey, Dict[str, int]]):
+    """Unconditional upsert adding the deltas"""
+    rows = [
+        {
+            "spare_part_id": part_id,
+            "location_id": location_id,
+            **{column: delta.get(column, 0) for column in BALANCE_COLUMNS}
+        }
+        for (part_id, location_id), delta in sorted(deltas.items())
+    ]
+
+    stmt = upsert_insert(db, InventoryBalance).values(rows)
+    table = InventoryBalance.__table__
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.spare_part_id, table.c.location_id],
+        set_={column: table.c[column] + stmt.excluded[column] for column in BALANCE_COLUMNS}
+    )
+    db.execute(stmt)
+
+
+def _swap_balances(db: Session, deltas: Dict[BalanceKey, Dict[str, int]], locked: LockedBalances):
+    """Version-checked UPDATE of rows read in `locked`, INSERT of the rows it found missing"""
+    table = InventoryBalance.__table__
+    existing = [key for key in sorted(deltas) if key in locked.versions]
+    missing = [key for key in sorted(deltas) if key not in locked.versions]
+    conflicts = []
+
+    if existing:
+        stmt = update(table).where(and_(
+            table.c.spare_part_id == bindparam("key_part"),
+            table.c.location_id == bindparam("key_location"),
+            table.c.version == bindparam("key_version")
+        )).values(
+            version=table.c.version + 1,
+            **{column: table.c[column] + bindparam(f"delta_{column}") for column in BALANCE_COLUMNS}
+        )
+        params = [
+            {
+                "key_part": key[0],
+                "key_location": key[1],
+                "key_version": locked.versions[key],
+                **{f"delta_{column}": deltas[key].get(column, 0) for column in BALANCE_COLUMNS}
+            }
+            for key in existing
+        ]
+        connection = db.connection()
+        if connection.dialect.supports_sane_multi_rowcount:
+            if connection.execute(stmt, params).rowcount != len(params):
+                conflicts.extend(existing)
+        else:
+            for key, row in zip(existing, params):
+                if connection.execute(stmt, row).rowcount != 1:
+                    conflicts.append(key)
+
+    if missing:
+        rows = [
+            {
+                "spare_part_id": part_id,
+                "location_id": location_id,
+                "version": 1,
+                **{column: deltas[(part_id, location_id)].get(column, 0) for column in BALANCE_COLUMNS}
+            }
+            for part_id, location_id in missing
+        ]
+        stmt = upsert_insert(db, InventoryBalance).values(rows).on_conflict_do_nothing(
+            index_elements=[table.c.spare_part_id, table.c.location_id]
+        ).returning(table.c.spare_part_id, table.c.location_id)
+        inserted = {tuple(row) for row in db.execute(stmt).all()}
+        # A row created by another writer since lock_balances looked
+        conflicts.extend(key for key in missing if key not in inserted)
+
+    if conflicts:
+        for key in conflicts:
+            locked.versions.pop(key, None)
+        raise StockConflict(conflicts)
+
+    for key in existing:
+        locked.versions[key] += 1
+    for key in missing:
+        locked.versions[key] = 1
+    # `locked` now holds the balances as written
+    for key in deltas:
+        locked[key] = locked.get(key, 0) + deltas[key].get("in_stock", 0)
+
+
+def movement_deltas(movements: Iterable[dict]) -> Dict[BalanceKey, Dict[str, int]]:
+    """Fold ledger movements into per-balance column deltas"""
+    deltas: Dict[BalanceKey, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(BALANCE_COLUMNS, 0))
+    for movement in movements:
+        delta = deltas[(movement["spare_part_id"], movement["location_id"])]
+        delta["in_stock"] += movement["quantity"]
+        if movement["movement_type"] == "receipt":
+            delta["total_received"] += movement["quantity"]
+        elif movement["movement_type"] == "consumption":
+            delta["total_consumption"] -= movement["quantity"]
+    return deltas
+
+
+def record_movements(db: Session, movements: List[dict], locked: Optional[LockedBalances] = None, project: bool = True):
+    """
+    Append movements to the ledger and, unless `project` is False, fold them into the
+    balance projection. Callers lock the affected balances (lock_balances) before validating
+    stock and pass the result as `locked` so the balance writes are version-checked.
+    Each movement is a dict of spare_part_id, location_id, signed quantity, movement_type,
+    occurred_at and optionally reference_type/reference_id.
+    """
+    if not movements:
+        return
+
+    now = datetime.utcnow()
+    db.execute(insert(StockMovement), [
+        {"reference_type": None, "reference_id": None, "created_at": now, **movement}
+        for movement in movements
+    ])
+
+    # Snapshots taken after a back-dated movement no longer match the ledger
+    earliest = min(movement["occurred_at"] for movement in movements)
+    keys = sorted({(movement["spare_part_id"], movement["location_id"]) for movement in movements})
+    db.execute(
+        delete(StockSnapshot).where(
+            tuple_(StockSnapshot.spare_part_id, StockSnapshot.location_id).in_(keys),
+            StockSnapshot.snapshot_at >= earliest
+        ).execution_options(synchronize_session=False)
+    )
+
+    if project:
+        apply_balance_deltas(db, movement_deltas(movements), locked)
+
+
+def execute_transfers(db: Session, transfers: List, atomic: bool = False) -> List[dict]:
+    """
+    Validate and post many transfers in the caller's transaction.
+    Every affected balance row is locked once up front; transfers are checked in request
+    order against the locked stock, so later transfers see the effect of earlier ones.
+    With `atomic`, one rejected transfer rejects the whole batch.
+    Returns one result per transfer, in request order.
+    """
+    keys = set()
+    location_ids = set()
+    for transfer in transfers:
+        location_ids.update((transfer.from_location_id, transfer.to_location_id))
+        for item in transfer.items:
+            keys.add((item.spare_part_id, transfer.from_location_id))
+            keys.add((item.spare_part_id, transfer.to_location_id))
+
+    known_locations = {
+        row.id for row in db.query(Location.id).filter(Location.id.in_(location_ids)).all()
+    }
+    stock = lock_balances(db, keys)
+    # Validation runs against a copy, so `stock` still holds the balances as read when it is written
+    available = dict(stock)
+
+    results = []
+    accepted = []
+    for index, transfer in enumerate(transfers):
+        error = _validate_transfer(transfer, available, known_locations)
+        if error:
+            results.append({"index": index, "status": "rejected", "error": error})
+            continue
+
+        for item in transfer.items:
+            source = (item.spare_part_id, transfer.from_location_id)
+            dest = (item.spare_part_id, transfer.to_location_id)
+            available[source] -= item.quantity
+            available[dest] = available.get(dest, 0) + item.quantity
+
+        results.append({"index": index, "status": "completed", "transfer_id": None})
+        accepted.append((index, transfer))
+
+    if atomic and len(accepted) != len(transfers):
+        for result in results:
+            if result["status"] == "completed":
+                result.update(status="rejected", error="Batch rejected: another transfer in the batch failed")
+                del result["transfer_id"]
+        return results
+
+    if not accepted:
+        return results
+
+    now = datetime.now()
+    header_ids = db.execute(
+        insert(TransferHeader).returning(TransferHeader.id, sort_by_parameter_order=True),
+        [
+            {
+                "transfer_date": transfer.transfer_date,
+                "from_location_id": transfer.from_location_id,
+                "to_location_id": transfer.to_location_id,
+                "transferred_by": transfer.transferred_by,
+                "status": "completed",
+                "notes": transfer.notes,
+                "created_at": now
+            }
+            for _, transfer in accepted
+        ]
+    ).scalars().all()
+
+    item_rows = []
+    movements = []
+    for (index, transfer), transfer_id in zip(accepted, header_ids):
+        results[index]["transfer_id"] = transfer_id
+        for item in transfer.items:
+            item_rows.append({
+                "transfer_id": transfer_id,
+                "spare_part_id": item.spare_part_id,
+                "quantity": item.quantity,
+                "created_at": now
+            })
+            reference = {"reference_type": "transfer", "reference_id": transfer_id, "occurred_at": transfer.transfer_date}
+            movements.append({
+                "spare_part_id": item.spare_part_id,
+                "location_id": transfer.from_location_id,
+                "quantity": -item.quantity,
+                "movement_type": "transfer_out",
+                **reference
+            })
+            movements.append({
+                "spare_part_id": item.spare_part_id,
+                "location_id": transfer.to_location_id,
+                "quantity": item.quantity,
+                "movement_type": "transfer_in",
+                **reference
+            })
+    db.execute(insert(TransferItem), item_rows)
+
+    record_movements(db, movements, stock)
+    return results
+
+
+def consume_parts(db: Session, work_order_id: int, lines: List, consumed_at: Optional[datetime] = None) -> dict:
+    """
+    Record part consumption for a work order in the caller's transaction.
+    Quantities are summed per (part, location) and every balance is decremented by one
+    UPDATE ... FROM whose WHERE clause also requires enough stock, so the check and the write
+    cannot be separated by a concurrent consumer. If any balance falls short, InsufficientStock
+    is raised (the caller rolls back). Returns the WorkOrderPart rows and the updated balances.
+    """
+    consumed_at = consumed_at or datetime.now()
+    requested: Dict[BalanceKey, int] = defaultdict(int)
+    for line in lines:
+        requested[(line.spare_part_id, line.location_id)] += line.quantity_used
+
+    table = InventoryBalance.__table__
+    wanted = _keyed_rows(db, [(part_id, location_id, quantity) for (part_id, location_id), quantity in sorted(requested.items())])
+    updated = db.execute(
+        update(table).where(
+            table.c.spare_part_id == wanted.c.spare_part_id,
+            table.c.location_id == wanted.c.location_id,
+            table.c.in_stock >= wanted.c.quantity
+        ).values(
+            in_stock=table.c.in_stock - wanted.c.quantity,
+            total_consumption=table.c.total_consumption + wanted.c.quantity,
+            version=table.c.version + 1
+        ).returning(
+            table.c.id, table.c.spare_part_id, table.c.location_id, table.c.in_stock,
+            table.c.total_received, table.c.total_consumption
+        )
+    ).all()
+
+    if len(updated) != len(requested):
+        short = [key for key in sorted(requested) if key not in {(row.spare_part_id, row.location_id) for row in updated}]
+        available = {
+            (row.spare_part_id, row.location_id): row.in_stock
+            for row in db.query(InventoryBalance.spare_part_id, InventoryBalance.location_id, InventoryBalance.in_stock)
+            .filter(tuple_(InventoryBalance.spare_part_id, InventoryBalance.location_id).in_(short))
+        }
+        raise InsufficientStock([
+            {"spare_part_id": part_id, "location_id": location_id,
+             "requested": requested[(part_id, location_id)], "available": available.get((part_id, location_id), 0)}
+            for part_id, location_id in short
+        ])
+
+    parts = db.execute(
+        insert(WorkOrderPart).returning(
+            WorkOrderPart.id, WorkOrderPart.spare_part_id, WorkOrderPart.location_id,
+            WorkOrderPart.quantity_used, WorkOrderPart.created_at, sort_by_parameter_order=True
+        ),
+        [
+            {
+                "work_order_id": work_order_id,
+                "spare_part_id": line.spare_part_id,
+                "location_id": line.location_id,
+                "quantity_used": line.quantity_used,
+                "created_at": consumed_at
+            }
+            for line in lines
+        ]
+    ).all()
+
+    for row in updated:
+        stage_balance_event(db, row.spare_part_id, row.location_id, -requested[(row.spare_part_id, row.location_id)], row.in_stock)
+
+    # The UPDATE above already changed the balances, so only the ledger side is written
+    record_movements(db, [
+        {
+            "spare_part_id": part.spare_part_id,
+            "location_id": part.location_id,
+            "quantity": -part.quantity_used,
+            "movement_type": "consumption",
+            "reference_type": "work_order",
+            "reference_id": work_order_id,
+            "occurred_at": consumed_at
+        }
+        for part in parts
+    ], project=False)
+
+    return {
+        "parts": [dict(part._mapping) for part in parts],
+        "balances": sorted((dict(row._mapping) for row in updated), key=lambda b: (b["spare_part_id"], b["location_id"]))
+    }
+
+
+def _keyed_rows(db: Session, rows: List[Tuple[int, int, int]]):
+    """(spare_part_id, location_id, quantity) rows as a derived table usable in UPDATE ... FROM"""
+    names = ("spare_part_id", "location_id", "quantity")
+    if db.get_bind().dialect.name == "postgresql":
+        return values(*(column(name, Integer) for name in names), name="wanted").data(rows)
+    # SQLite has no column list on VALUES aliases; a UNION ALL of bound rows is equivalent
+    return union_all(*(
+        select(*(literal(value, Integer).label(name) for name, value in zip(names, row))) for row in rows
+    )).subquery("wanted")
+
+
+def _validate_transfer(transfer, stock: Dict[BalanceKey, int], known_locations: set):
+    """Return an error message if `transfer` cannot be posted against `stock`, else None"""
+    if transfer.from_location_id == transfer.to_location_id:
+        return "Source and destination locations must differ"
+    if transfer.from_location_id not in known_locations:
+        return f"Location {transfer.from_location_id} not found"
+    if transfer.to_location_id not in known_locations:
+        return f"Location {transfer.to_location_id} not found"
+    if not transfer.items:
+        return "Transfer has no items"
+
+    needed: Dict[int, int] = defaultdict(int)
+    for item in transfer.items:
+        if item.quantity <= 0:
+            return f"Quantity for part {item.spare_part_id} must be positive"
+        needed[item.spare_part_id] += item.quantity
+
+    for part_id, quantity in needed.items():
+        available = stock.get((part_id, transfer.from_location_id))
+        if available is None:
+            return f"No stock found for part {part_id} at source location"
+        if available < quantity:
+            return f"Insufficient stock for part {part_id}"
+    return None
+
+
+def retry_reason(error: Exception) -> Optional[str]:
+    """Why `error` is worth retrying the whole transaction for, or None if it is not"""
+    if isinstance(error, StockConflict):
+        return "version_conflict"
+    if isinstance(error, DBAPIError):
+        sqlstate = getattr(error.orig, "sqlstate", None) or getattr(error.orig, "pgcode", None)
+        if sqlstate in _RETRYABLE_SQLSTATES:
+            return _RETRYABLE_SQLSTATES[sqlstate]
+        if "database is locked" in str(error.orig):
+            return "lock_timeout"
+    return None
+
+
+def run_stock_transaction(db: Session, operation: str, work: Callable[[], T]) -> T:
+    """
+    Run `work` and commit, retrying the whole transaction on version conflicts and transient
+    serialization/deadlock/lock errors with exponential backoff and full jitter.
+    `work` must be safe to re-run from scratch. Raises StockConflict once attempts run out;
+    any other error is rolled back and re-raised.
+    """
+    for attempt in range(1, RETRY_ATTEMPTS + 1):
+        try:
+            result = work()
+            db.commit()
+            return result
+        except Exception as error:
+            db.rollback()
+            reason = retry_reason(error)
+            if reason is None:
+                raise
+            if isinstance(error, StockConflict):
+                for _, location_id in error.keys:
+                    metrics.stock_conflicts.inc(operation=operation, location_id=location_id)
+            if attempt == RETRY_ATTEMPTS:
+                metrics.stock_retries_exhausted.inc(operation=operation)
+                if isinstance(error, StockConflict):
+                    raise
+                raise StockConflict() from error
+            metrics.stock_retries.inc(operation=operation, reason=reason)
+            time.sleep(random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)))
@@ -0,0 +1,240 @@
+# app/services/work_order_bulk.py
+"""
+Bulk creation and update of work orders for integrations and imports.
+Every record is checked before anything is written: referenced assets, types and users are
+looked up with one query per table, and text lengths are checked against the columns. Valid
+records are then written with one multi-row INSERT (numbers drawn as a single block) or one
+executemany UPDATE, inside the caller's transaction.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import String, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.asset import Asset
+from app.models.user import User
+from app.models.work_order import WorkOrder, WorkOrderType
+from app.core import events
+from app.services import reliability, work_order_numbers
+
+MAX_RECORDS = 5000
+
+ALL_OR_NOTHING, BEST_EFFORT = "all_or_nothing", "best_effort"
+
+# Foreign key fields of a record -> (model, label used in error messages)
+REFERENCES = {
+    "asset_id": (Asset, "asset"),
+    "type_id": (WorkOrderType, "work order type"),
+    "requested_by": (User, "user"),
+    "assigned_to": (User, "user"),
+}
+
+# Fields that may be left out of an update but not set to null or blank
+_NOT_EMPTY = ("title", "status", "priority")
+
+_STRING_LIMITS = {
+    column.name: column.type.length
+    for column in WorkOrder.__table__.columns
+    if isinstance(column.type, String) and column.type.length
+}
+
+
+def _existing(db: Session, model, ids: Iterable[int]) -> set:
+    ids = set(ids)
+    if not ids:
+        return set()
+    return {row[0] for row in db.query(model.id).filter(model.id.in_(ids)).all()}
+
+
+def _check_fields(db: Session, records: List[dict], errors: Dict[int, List[str]], stored: Optional[dict] = None):
+    """
+    Reference, length and date checks shared by creates and updates; `stored` has the current
+    row (with start_date and end_date) of work orders whose updates change only one of the two
+    """
+    stored = stored or {}
+    # Both user fields share one lookup
+    wanted: Dict[type, set] = {}
+    for record in records:
+        for field, (model, _) in REFERENCES.items():
+            if record.get(field) is not None:
+                wanted.setdefault(model, set()).add(record[field])
+    found = {model: _existing(db, model, ids) for model, ids in wanted.items()}
+
+    for index, record in enumerate(records):
+        for field, (model, label) in REFERENCES.items():
+            value = record.get(field)
+            if value is not None and value not in found[model]:
+                errors.setdefault(index, []).append(f"{field}: {label} {value} not found")
+        for field, length in _STRING_LIMITS.items():
+            value = record.get(field)
+            if isinstance(value, str) and len(value) > length:
+                errors.setdefault(index, []).append(f"{field}: longer than {length} characters")
+        for field in _NOT_EMPTY:
+            if field in record and not (record[field] or "").strip():
+                errors.setdefault(index, []).append(f"{field}: must not be empty")
+        current = stored.get(record.get("id"))
+        start = record.get("start_date") if "start_date" in record or current is None else current.start_date
+        end = record.get("end_date") if "end_date" in record or current is None else current.end_date
+        if start and end and end < start:
+            errors.setdefault(index, []).append("end_date: before start_date")
+
+
+def validate_creates(db: Session, records: List[dict]) -> Dict[int, List[str]]:
+    """Errors by record index for new work orders; empty if all are valid"""
+    errors: Dict[int, List[str]] = {}
+    _check_fields(db, records, errors)
+    return errors
+
+
+def validate_updates(db: Session, records: List[dict]) -> Dict[int, List[str]]:
+    """Errors by record index for updates (each record carries the work order `id`)"""
+    errors: Dict[int, List[str]] = {}
+    known = _existing(db, WorkOrder, (record["id"] for record in records))
+    seen = set()
+    for index, record in enumerate(records):
+        if record["id"] not in known:
+            errors.setdefault(index, []).append(f"id: work order {record['id']} not found")
+        elif record["id"] in seen:
+            errors.setdefault(index, []).append(f"id: work order {record['id']} appears more than once")
+        seen.add(record["id"])
+    # An update of one date is checked against the other as stored
+    one_date = [record["id"] for record in records if ("start_date" in record) != ("end_date" in record)]
+    stored = {}
+    if one_date:
+        stored = {
+            row.id: row for row in db.execute(
+                select(WorkOrder.id, WorkOrder.start_date, WorkOrder.end_date).where(WorkOrder.id.in_(one_date))
+            )
+        }
+    _check_fields(db, records, errors, stored)
+    return errors
+
+
+def insert_work_orders(
+    db: Session,
+    records: List[dict],
+    requested_date: Optional[datetime] = None,
+    numbers: Optional[List[str]] = None,
+    record_rollups: bool = True
+) -> List[tuple]:
+    """
+    Insert work orders in one statement; returns (id, work_order_number) per record, in order.
+    Numbers not passed in are reserved on a separate connection, so on SQLite this must happen
+    before the session has written anything in its current transaction. Without `record_rollups`
+    the caller passes the ids to reliability.record itself, once the rows are complete.
+    """
+    if not records:
+        return []
+    now = datetime.now()
+    requested_date = requested_date or now
+    numbers = numbers or work_order_numbers.allocator.allocate(len(records))
+    rows = [
+        {
+            **record,
+            "work_order_number": number,
+            "requested_date": record.get("requested_date") or requested_date,
+            "priority": record.get("priority") or "medium",
+            "status": record.get("status") or "open",
+        }
+        for record, number in zip(records, numbers)
+    ]
+    for row in rows:
+        if row["status"].lower() in reliability.CLOSED_STATUSES and not row.get("end_date"):
+            row["end_date"] = now
+    # Numbers are unique, so ids are matched by number rather than by the order rows come back in;
+    # that keeps the insert batched on databases without a guaranteed RETURNING order
+    result = db.execute(insert(WorkOrder).returning(WorkOrder.work_order_number, WorkOrder.id), rows)
+    ids = dict(result.all())
+    if record_rollups:
+        reliability.record(db, ids.values())
+    stage_created_events(db, [{**row, "id": ids[row["work_order_number"]]} for row in rows])
+    return [(ids[number], number) for number in numbers]
+
+
+def update_work_orders(db: Session, records: List[dict]):
+    """
+    Apply partial updates (each with `id` and only the fields to change) as one executemany per field set,
+    date work orders left closed without an end_date, move their reliability rollup counts along and
+    announce status changes
+    """
+    now = datetime.utcnow()
+    ids = [record["id"] for record in records]
+    before = reliability.snapshot(db, ids)
+    statuses = _statuses(db, [record["id"] for record in records if "status" in record or "end_date" in record])
+    records = [_date_close(record, statuses.get(record["id"])) for record in records]
+    db.execute(update(WorkOrder), [{**record, "updated_at": now} for record in records])
+    reliability.record(db, ids, before)
+
+    changed = [
+        record for record in records
+        if "status" in record and record["id"] in statuses and record["status"] != statuses[record["id"]].status
+    ]
+    locations = _asset_locations(db, [record.get("asset_id", statuses[record["id"]].asset_id) for record in changed])
+    for record in changed:
+        old = statuses[record["id"]]
+        asset_id = record.get("asset_id", old.asset_id)
+        events.stage(db, "work_order.status_changed", locations.get(asset_id), {
+            "id": record["id"],
+            "work_order_number": old.work_order_number,
+            "status": record["status"],
+            "previous_status": old.status,
+            "asset_id": asset_id
+        })
+
+
+def _date_close(record: dict, old) -> dict:
+    """`record`, with an end_date of now if it leaves the work order closed without one"""
+    if old is None:
+        return record
+    status = record.get("status", old.status) or ""
+    end_date = record["end_date"] if "end_date" in record else old.end_date
+    if status.lower() in reliability.CLOSED_STATUSES and end_date is None:
+        return {**record, "end_date": datetime.now()}
+    return record
+
+
+def _statuses(db: Session, ids: List[int]) -> dict:
+    if not ids:
+        return {}
+    rows = db.execute(
+        select(
+            WorkOrder.id, WorkOrder.status, WorkOrder.work_order_number, WorkOrder.asset_id, WorkOrder.end_date
+        ).where(WorkOrder.id.in_(ids))
+    ).all()
+    return {row.id: row for row in rows}
+
+
+def _asset_locations(db: Session, asset_ids: Iterable[Optional[int]]) -> Dict[int, Optional[int]]:
+    """Location of each asset; work order events are routed by it"""
+    wanted = {asset_id for asset_id in asset_ids if asset_id is not None}
+    if not wanted:
+        return {}
+    return dict(db.execute(select(Asset.id, Asset.location_id).where(Asset.id.in_(wanted))).all())
+
+
+def stage_created_events(db: Session, rows: List[dict]):
+    """A work_order.created event per new work order (dicts with id and the inserted columns), sent on commit"""
+    locations = _asset_locations(db, (row.get("asset_id") for row in rows))
+    for row in rows:
+        events.stage(db, "work_order.created", locations.get(row.get("asset_id")), {
+            "id": row["id"],
+            "work_order_number": row["work_order_number"],
+            "status": row.get("status") or "open",
+            "priority": row.get("priority") or "medium",
+            "asset_id": row.get("asset_id")
+        })
+
+
+def results(errors: Dict[int, List[str]], count: int, written: Optional[Dict[int, dict]] = None) -> List[dict]:
+    """One result per submitted record, in order"""
+    written = written or {}
+    out = []
+    for index in range(count):
+        if index in errors:
+            out.append({"index": index, "status": "error", "errors": errors[index]})
+        elif index in written:
+            out.append({"index": index, **written[index]})
+        else:
+            out.append({"index": index, "status": "skipped"})
+    return out
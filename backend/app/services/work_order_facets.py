@@ -0,0 +1,58 @@
+# app/services/work_order_facets.py
+"""
+Facet counts for the work order list: how many filtered work orders fall on each status, type,
+priority and plant. PostgreSQL computes every facet in one pass with GROUPING SETS; other
+databases run the equivalent UNION ALL of per-facet GROUP BYs as a single statement.
+"""
+from sqlalchemy import func, literal, select, tuple_, union_all
+from sqlalchemy.orm import Session
+
+FACETS = ("status", "type", "priority", "plant")
+
+
+def count_facets(db: Session, filtered) -> dict:
+    """
+    Counts per value of each facet column of `filtered` (a subquery with FACETS columns),
+    most frequent first, plus the total. Work orders without a value count under null.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        rows = _grouping_sets(db, filtered)
+    else:
+        rows = _union(db, filtered)
+
+    result = {facet: [] for facet in FACETS}
+    total = 0
+    for facet, value, count in rows:
+        if facet is None:
+            total = count
+        else:
+            result[facet].append({"value": value, "count": count})
+    for facet in FACETS:
+        result[facet].sort(key=lambda bucket: (-bucket["count"], str(bucket["value"])))
+    return {"total": total, "facets": result}
+
+
+def _grouping_sets(db: Session, filtered) -> list:
+    columns = [filtered.c[facet] for facet in FACETS]
+    stmt = select(
+        *columns, *[func.grouping(column) for column in columns], func.count()
+    ).group_by(
+        func.grouping_sets(*[tuple_(column) for column in columns], tuple_())
+    )
+    rows = []
+    for row in db.execute(stmt):
+        values, grouped, count = row[:len(FACETS)], row[len(FACETS):-1], row[-1]
+        # grouping() is 0 for the column a row is grouped by; all 1 for the grand total
+        facet = next((FACETS[i] for i, flag in enumerate(grouped) if flag == 0), None)
+        rows.append((facet, values[FACETS.index(facet)] if facet else None, count))
+    return rows
+
+
+def _union(db: Session, filtered) -> list:
+    selects = [
+        select(literal(facet).label("facet"), filtered.c[facet].label("value"), func.count().label("count"))
+        .group_by(filtered.c[facet])
+        for facet in FACETS
+    ]
+    selects.append(select(literal(None).label("facet"), literal(None).label("value"), func.count().label("count")).select_from(filtered))
+    return [tuple(row) for row in db.execute(union_all(*selects))]
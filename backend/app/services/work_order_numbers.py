@@ -0,0 +1,83 @@
+# app/services/work_order_numbers.py
+"""
+Work order numbers (WO-<year>-<n>) from a per-year counter row.
+Each process reserves a block of BLOCK_SIZE numbers with one locked UPDATE in its own short
+transaction and hands them out from memory, so creating a work order needs no extra query and two
+processes never receive the same number. Numbers reserved by a process that exits unused are skipped,
+so the sequence can have gaps and is only ordered within a process.
+"""
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import BigInteger, cast, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.db.session import engine
+from app.models.work_order import WorkOrder, WorkOrderCounter
+
+BLOCK_SIZE = 50
+
+
+def format_number(year: int, number: int) -> str:
+    return f"WO-{year}-{number:04d}"
+
+
+def _digits_only(suffix, dialect_name: str):
+    """Whether `suffix` is all digits; other numbers (e.g. legacy WO-2026-001A) cannot be cast"""
+    if dialect_name == "postgresql":
+        return suffix.op("~")("^[0-9]+$")
+    return (suffix != "") & suffix.op("NOT GLOB")("*[^0-9]*")
+
+
+class WorkOrderNumberAllocator:
+    """Hands out numbers from reserved blocks; safe to share between threads"""
+
+    def __init__(self, block_size: int = BLOCK_SIZE):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._blocks: Dict[int, Tuple[int, int]] = {}  # year -> [next, end) still unused
+
+    def allocate(self, count: int = 1, year: Optional[int] = None) -> List[str]:
+        """`count` unused numbers for `year` (default: this year), in increasing order"""
+        year = year or datetime.now().year
+        numbers: List[int] = []
+        with self._lock:
+            while len(numbers) < count:
+                start, end = self._blocks.get(year, (0, 0))
+                if start >= end:
+                    start, end = self._reserve(year, max(self.block_size, count - len(numbers)))
+                taken = min(end - start, count - len(numbers))
+                numbers.extend(range(start, start + taken))
+                self._blocks[year] = (start + taken, end)
+        return [format_number(year, number) for number in numbers]
+
+    def _reserve(self, year: int, size: int) -> Tuple[int, int]:
+        """Advance the year's counter by `size`; committed at once so the row lock is held only briefly"""
+        advance = (
+            update(WorkOrderCounter)
+            .where(WorkOrderCounter.year == year)
+            .values(next_number=WorkOrderCounter.next_number + size)
+            .returning(WorkOrderCounter.next_number)
+        )
+        with engine.begin() as connection:
+            advanced = connection.execute(advance).scalar()
+            if advanced is None:
+                # First number of the year: start after any number already issued for it
+                prefix = format_number(year, 0)[:-4]
+                suffix = func.substr(WorkOrder.work_order_number, len(prefix) + 1)
+                issued = connection.execute(
+                    select(func.max(cast(suffix, BigInteger)))
+                    .where(WorkOrder.work_order_number.like(prefix + "%"), _digits_only(suffix, connection.dialect.name))
+                ).scalar() or 0
+                dialect = postgresql if connection.dialect.name == "postgresql" else sqlite
+                connection.execute(
+                    dialect.insert(WorkOrderCounter)
+                    .values(year=year, next_number=issued + 1)
+                    .on_conflict_do_nothing(index_elements=[WorkOrderCounter.year])
+                )
+                advanced = connection.execute(advance).scalar()
+        return advanced - size, advanced
+
+
+allocator = WorkOrderNumberAllocator()
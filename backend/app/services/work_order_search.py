@@ -0,0 +1,171 @@
+# app/services/work_order_search.py
+"""
+Full-text search over work orders.
+On PostgreSQL, work_orders carries a generated, weighted tsvector column (number > title > description)
+with a GIN index, matched with websearch_to_tsquery and ranked with ts_rank_cd; a pg_trgm index on
+work_order_number serves partial numbers. On SQLite an external-content FTS5 table kept in sync by
+triggers plays the same part, queried with prefix terms and ranked with bm25.
+The schema is installed on first use; if that is not possible, search falls back to ILIKE.
+"""
+import logging
+import re
+import threading
+from typing import Optional, Tuple
+
+from sqlalchemy import case, column, false, func, inspect, literal_column, or_, table, text
+from sqlalchemy.orm import Session
+
+from app.models.work_order import WorkOrder
+
+logger = logging.getLogger(__name__)
+
+SNIPPET_START, SNIPPET_STOP = "<mark>", "</mark>"
+
+POSTGRES_SCHEMA = (
+    """ALTER TABLE work_orders ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(work_order_number, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(title, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'C')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_work_orders_search_vector ON work_orders USING gin (search_vector)",
+)
+POSTGRES_TRIGRAM_SCHEMA = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_work_orders_number_trgm ON work_orders USING gin (work_order_number gin_trgm_ops)",
+)
+SQLITE_SCHEMA = (
+    """CREATE VIRTUAL TABLE work_orders_fts USING fts5(
+        work_order_number, title, description, content='work_orders', content_rowid='id'
+    )""",
+    """CREATE TRIGGER work_orders_fts_insert AFTER INSERT ON work_orders BEGIN
+        INSERT INTO work_orders_fts(rowid, work_order_number, title, description)
+        VALUES (new.id, new.work_order_number, new.title, new.description);
+    END""",
+    """CREATE TRIGGER work_orders_fts_delete AFTER DELETE ON work_orders BEGIN
+        INSERT INTO work_orders_fts(work_orders_fts, rowid, work_order_number, title, description)
+        VALUES ('delete', old.id, old.work_order_number, old.title, old.description);
+    END""",
+    """CREATE TRIGGER work_orders_fts_update AFTER UPDATE OF work_order_number, title, description ON work_orders BEGIN
+        INSERT INTO work_orders_fts(work_orders_fts, rowid, work_order_number, title, description)
+        VALUES ('delete', old.id, old.work_order_number, old.title, old.description);
+        INSERT INTO work_orders_fts(rowid, work_order_number, title, description)
+        VALUES (new.id, new.work_order_number, new.title, new.description);
+    END""",
+    "INSERT INTO work_orders_fts(work_orders_fts) VALUES ('rebuild')",
+)
+
+_fts = table("work_orders_fts", column("rowid"))
+_installed = {}  # database URL -> whether full-text search is available
+_install_lock = threading.Lock()
+
+
+def install(connection) -> bool:
+    """Create the search column/table and indexes if missing; True if full-text search is usable"""
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        columns = {c["name"] for c in inspect(connection).get_columns("work_orders")}
+        if "search_vector" not in columns:
+            for statement in POSTGRES_SCHEMA:
+                connection.execute(text(statement))
+        try:
+            with connection.begin_nested():
+                for statement in POSTGRES_TRIGRAM_SCHEMA:
+                    connection.execute(text(statement))
+        except Exception as e:
+            # Partial numbers then scan work_order_number; word search keeps its index
+            logger.warning(f"Work order number trigram index not created: {e}")
+        return True
+    if dialect == "sqlite":
+        if "work_orders_fts" not in inspect(connection).get_table_names():
+            for statement in SQLITE_SCHEMA:
+                connection.execute(text(statement))
+        return True
+    return False
+
+
+def available(db: Session) -> bool:
+    """Install on first use per database; remembers failures so they are not retried on every query"""
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _installed:
+        with _install_lock:
+            if key not in _installed:
+                try:
+                    with bind.begin() as connection:
+                        _installed[key] = install(connection)
+                except Exception as e:
+                    logger.warning(f"Work order full-text search unavailable, using ILIKE: {e}")
+                    _installed[key] = False
+    return _installed[key]
+
+
+_QUERY_TERM = re.compile(r'(-?)"([^"]*)"|(\S+)')
+
+
+def fts5_query(search: str) -> Optional[str]:
+    """
+    Translate web-search syntax ("quoted phrase", -exclude, or) into an FTS5 query.
+    Bare words match as prefixes so results narrow while typing.
+    """
+    include, exclude = [], []
+    for negated, phrase, word in _QUERY_TERM.findall(search):
+        if word and word.lower() == "or":
+            if include and include[-1] != "OR":
+                include.append("OR")
+            continue
+        if word.startswith("-") and len(word) > 1:
+            negated, word = "-", word[1:]
+        term = phrase if phrase else word
+        if not term.strip('"'):
+            continue
+        quoted = '"%s"' % term.replace('"', '""') + ("" if phrase else "*")
+        (exclude if negated else include).append(quoted)
+    if include and include[-1] == "OR":
+        include.pop()
+    if not include:
+        return None
+    return " ".join(include) + "".join(" NOT " + term for term in exclude)
+
+
+def apply(query, db: Session, search: str, highlight: bool = False) -> Tuple[object, Optional[object]]:
+    """
+    Restrict a work order query to `search` matches.
+    Returns (query, rank); rank is None on the ILIKE fallback. With `highlight`, a `snippet`
+    column with matches wrapped in <mark> tags is added.
+    """
+    dialect = db.get_bind().dialect.name
+    if not available(db):
+        pattern = f"%{search}%"
+        query = query.filter(or_(
+            WorkOrder.title.ilike(pattern), WorkOrder.description.ilike(pattern), WorkOrder.work_order_number.ilike(pattern)
+        ))
+        if highlight:
+            query = query.add_columns(literal_column("NULL").label("snippet"))
+        return query, None
+
+    if dialect == "postgresql":
+        tsquery = func.websearch_to_tsquery("english", search)
+        vector = literal_column("work_orders.search_vector")
+        number_match = WorkOrder.work_order_number.ilike(f"%{search.strip()}%")
+        query = query.filter(or_(vector.op("@@")(tsquery), number_match))
+        rank = func.ts_rank_cd(vector, tsquery) + case((number_match, 1.0), else_=0.0)
+        if highlight:
+            # Computed after the sort and limit, so only for returned rows
+            snippet = func.ts_headline(
+                "english", func.coalesce(WorkOrder.description, WorkOrder.title), tsquery,
+                f"StartSel={SNIPPET_START}, StopSel={SNIPPET_STOP}, MaxWords=20, MinWords=8, MaxFragments=2"
+            )
+            query = query.add_columns(snippet.label("snippet"))
+        return query, rank
+
+    match = fts5_query(search)
+    if match is None:
+        return query.filter(false()), None
+    fts = literal_column("work_orders_fts")
+    query = query.join(_fts, _fts.c.rowid == WorkOrder.id).filter(fts.op("MATCH")(match))
+    # bm25 is lower for better matches; columns weighted number > title > description
+    rank = -func.bm25(fts, 10.0, 5.0, 1.0)
+    if highlight:
+        snippet = func.snippet(fts, -1, SNIPPET_START, SNIPPET_STOP, "…", 16)
+        query = query.add_columns(snippet.label("snippet"))
+    return query, rank
@@ -0,0 +1,33 @@
+"""
+Tests run against a throwaway SQLite database; every table is emptied after each test.
+"""
+import os
+import tempfile
+
+# The engine is created on import, so point it at the test database first
+_DB_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'cmms_test.db')}"
+
+import pytest
+
+import app.models  # noqa: F401  (registers every table)
+from app.db.session import Base, SessionLocal, engine
+
+Base.metadata.create_all(engine)
+
+
+@pytest.fixture(autouse=True)
+def empty_tables():
+    yield
+    with engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
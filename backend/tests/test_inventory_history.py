@@ -0,0 +1,87 @@
+"""
+Transfer and receipt history: plain list bodies, cursors in headers, ordered by the filtered date.
+"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.models import InventoryInflow, InventoryMaster, Location, TransferHeader, User
+
+client = TestClient(app)
+URL = f"{settings.api_v1_prefix}/inventory"
+
+
+@pytest.fixture
+def transfers(db):
+    """Nine transfers a day apart, entered in date order except a back-dated one entered last"""
+    user = User(username="storeman", email="storeman@example.com", hashed_password="x")
+    source, target = Location(name="Main store"), Location(name="Line side")
+    db.add_all([user, source, target])
+    db.flush()
+    entered = datetime(2025, 6, 1)
+    dates = [datetime(2025, 1, day) for day in (2, 3, 4, 5, 6, 7, 8, 9)] + [datetime(2025, 1, 1)]
+    for n, transfer_date in enumerate(dates):
+        db.add(TransferHeader(
+            transfer_date=transfer_date, from_location_id=source.id, to_location_id=target.id,
+            transferred_by=user.id, created_at=entered + timedelta(minutes=n)
+        ))
+    db.commit()
+
+
+def pages(path: str, **params) -> list:
+    out, cursor = [], None
+    while True:
+        response = client.get(f"{URL}/{path}", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        assert isinstance(response.json(), list)
+        out.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return out
+
+
+def test_transfer_pages_follow_the_transfer_date(transfers):
+    result = pages("transfers", limit=4)
+
+    dates = [transfer["transfer_date"] for page in result for transfer in page]
+    assert [len(page) for page in result] == [4, 4, 1]
+    assert dates == sorted(dates, reverse=True)
+    assert dates[-1] == "2025-01-01T00:00:00"
+
+
+def test_transfer_date_filter_matches_the_pages(transfers):
+    result = pages("transfers", limit=2, date_to="2025-01-04T00:00:00")
+
+    assert [transfer["transfer_date"][:10] for page in result for transfer in page] == [
+        "2025-01-04", "2025-01-03", "2025-01-02", "2025-01-01"
+    ]
+
+
+def test_receipt_pages_follow_the_received_date(db):
+    user = User(username="storeman", email="storeman@example.com", hashed_password="x")
+    location = Location(name="Main store")
+    part = InventoryMaster(part_code="BRG-6204", part_name="Bearing 6204", unit_of_issue="ea")
+    db.add_all([user, location, part])
+    db.flush()
+    entered = datetime(2025, 6, 1)
+    for n, day in enumerate([2, 3, 4, 5, 1]):
+        db.add(InventoryInflow(
+            spare_part_id=part.id, location_id=location.id, quantity=1, received_by=user.id,
+            received_date=datetime(2025, 1, day), supplier="Acme", reference_number=f"DN-{n}",
+            created_at=entered + timedelta(minutes=n)
+        ))
+    db.commit()
+
+    result = pages("receipts", limit=2, date_to="2025-01-04T00:00:00")
+
+    assert [receipt["received_date"][:10] for page in result for receipt in page] == [
+        "2025-01-04", "2025-01-03", "2025-01-02", "2025-01-01"
+    ]
+    streamed = client.get(f"{URL}/receipts", params={"output": "ndjson"}).text.splitlines()
+    assert [json.loads(line)["received_date"][:10] for line in streamed] == [
+        "2025-01-05", "2025-01-04", "2025-01-03", "2025-01-02", "2025-01-01"
+    ]
@@ -0,0 +1,65 @@
+"""
+Bulk goods receipts through /inventory/receipts/bulk.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.models import InventoryBalance, InventoryInflow, InventoryMaster, Location, User
+from app.services import receipts
+from app.services.stock import StockConflict
+
+client = TestClient(app)
+URL = f"{settings.api_v1_prefix}/inventory/receipts/bulk"
+
+
+@pytest.fixture
+def part(db):
+    part = InventoryMaster(part_code="BRG-6204", part_name="Bearing 6204", unit_of_issue="ea")
+    db.add_all([User(username="storeman", email="storeman@example.com", hashed_password="x"), Location(name="Main store"), part])
+    db.commit()
+    return part
+
+
+def post(db, content: bytes, filename: str = "note.csv"):
+    form = {"location_id": db.query(Location.id).scalar(), "received_by": db.query(User.id).scalar()}
+    return client.post(URL, files={"file": (filename, content)}, data=form)
+
+
+def test_import_is_retried_after_a_stock_conflict(db, part, monkeypatch):
+    record_movements = receipts.record_movements
+    calls = []
+
+    def conflict_once(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise StockConflict()
+        return record_movements(*args, **kwargs)
+
+    monkeypatch.setattr(receipts, "record_movements", conflict_once)
+    response = post(db, b"part_code,quantity,supplier,reference_number\nBRG-6204,4,Acme,DN-1\nBRG-6204,6,Acme,DN-1\n")
+
+    assert response.status_code == 200, response.text
+    assert response.json()["posted_lines"] == 2
+    assert len(calls) == 2
+    assert db.query(InventoryInflow).count() == 2
+    assert db.query(InventoryBalance).filter_by(spare_part_id=part.id).one().in_stock == 10
+
+
+def test_fractional_quantities_are_rejected_not_truncated(db, part):
+    lines = [
+        b'{"part_code": "BRG-6204", "quantity": 2.7}',
+        b'{"part_code": "BRG-6204", "quantity": true}',
+        b'{"part_code": "BRG-6204", "quantity": "2.5"}',
+        b'{"part_code": "BRG-6204", "quantity": 3.0}'
+    ]
+    response = post(db, b"\n".join(lines), filename="note.ndjson")
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["posted_lines"] == 1
+    assert [(error["line"], error["error"]) for error in body["errors"]] == [
+        (line, "quantity must be an integer") for line in (1, 2, 3)
+    ]
+    assert db.query(InventoryBalance).filter_by(spare_part_id=part.id).one().in_stock == 3
@@ -0,0 +1,97 @@
+"""
+The reliability rollups kept by the work order write paths match a full recompute.
+"""
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.models import Asset, AssetCategory, Location, PMPlan, User, WorkOrder
+from app.services import pm_scheduler, reliability
+
+client = TestClient(app)
+URL = f"{settings.api_v1_prefix}/work-orders"
+
+
+@pytest.fixture
+def assets(db):
+    technician = User(username="tech", email="tech@example.com", hashed_password="x")
+    category = AssetCategory(name="Pumps")
+    location = Location(name="Plant 1")
+    db.add_all([technician, category, location])
+    db.flush()
+    pumps = [Asset(name=f"Pump {i}", asset_category_id=category.id, location_id=location.id) for i in range(3)]
+    db.add_all(pumps)
+    db.commit()
+    return technician.id, [pump.id for pump in pumps]
+
+
+def patch(records):
+    response = client.patch(f"{URL}/bulk", json={"records": records})
+    assert response.status_code == 200, response.text
+
+
+def test_rollups_follow_bulk_writes_and_assignments(db, assets):
+    technician_id, asset_ids = assets
+    response = client.post(f"{URL}/bulk", json={"records": [
+        {"title": f"Repair {i}", "asset_id": asset_ids[i % 3]} for i in range(12)
+    ]})
+    assert response.status_code == 201, response.text
+    ids = [result["id"] for result in response.json()["results"]]
+
+    patch(
+        [{"id": work_order_id, "status": "completed"} for work_order_id in ids[:4]]
+        + [{"id": ids[4], "status": "completed", "start_date": "2025-03-01T08:00:00", "end_date": "2025-03-01T12:00:00"}]
+        + [{"id": ids[5], "status": "cancelled"}, {"id": ids[6], "status": "in_progress"}]
+    )
+    closed = {row.id: row.end_date for row in db.query(WorkOrder.id, WorkOrder.end_date).filter(WorkOrder.id.in_(ids[:6]))}
+    assert all(closed.values())
+
+    # Edits after closing must not move the closes into another month
+    patch([{"id": work_order_id, "description": "Checked again"} for work_order_id in ids[:6]])
+    response = client.post(f"{URL}/assignments/apply", json={"reassign": True, "assignments": [
+        {"work_order_id": work_order_id, "assigned_to": technician_id, "scheduled_date": str(date(2025, 4, 1))}
+        for work_order_id in ids
+    ]})
+    assert response.status_code == 200, response.text
+    patch([{"id": ids[0], "status": "open"}, {"id": ids[7], "asset_id": asset_ids[0]}])
+
+    db.expire_all()
+    assert {row.id: row.end_date for row in db.query(WorkOrder.id, WorkOrder.end_date).filter(WorkOrder.id.in_(ids[:6]))} == closed
+    assert reliability.differences(db) == []
+
+
+def test_rebuild_dates_closes_without_an_end_date(db, assets):
+    _, asset_ids = assets
+    client.post(f"{URL}/bulk", json={"records": [{"title": "Legacy", "asset_id": asset_ids[0]}]})
+    # As left by versions that did not set end_date on closing
+    db.query(WorkOrder).update({WorkOrder.status: "completed", WorkOrder.end_date: None})
+    db.commit()
+
+    reliability.rebuild(db)
+    db.commit()
+
+    assert db.query(WorkOrder.end_date).scalar() is not None
+    assert reliability.differences(db) == []
+
+
+def test_pm_work_orders_are_recorded_as_preventive(db, assets, monkeypatch):
+    _, asset_ids = assets
+    db.add(PMPlan(name="Lubrication", asset_id=asset_ids[0], interval_days=30, start_date=date(2025, 1, 1)))
+    db.commit()
+    record = reliability.record
+    recorded = []
+
+    def spy(db, ids, before=()):
+        recorded.extend(reliability.snapshot(db, ids))
+        return record(db, ids, before)
+
+    monkeypatch.setattr(reliability, "record", spy)
+    result = pm_scheduler.generate(db, as_of=date(2025, 1, 10))
+    db.commit()
+
+    assert result["created"] == 1
+    assert [row.preventive for row in recorded] == [True]
+    assert reliability.differences(db) == []
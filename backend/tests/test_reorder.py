@@ -0,0 +1,23 @@
+"""
+Caching of reorder suggestions.
+"""
+from datetime import date
+
+from app.services import reorder
+
+
+def test_live_results_are_not_served_after_midnight(db, monkeypatch):
+    days = iter([date(2025, 3, 1), date(2025, 3, 1), date(2025, 3, 2)])
+
+    class Today(date):
+        @classmethod
+        def today(cls):
+            return next(days)
+
+    monkeypatch.setattr(reorder, "date", Today)
+    monkeypatch.setattr(reorder, "_cache", {})
+    params = reorder.ReorderParameters()
+
+    first = reorder.get_reorder_result(db, params)
+    assert reorder.get_reorder_result(db, params) is first
+    assert reorder.get_reorder_result(db, params) is not first
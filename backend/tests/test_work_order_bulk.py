@@ -0,0 +1,43 @@
+"""
+Validation of bulk work order updates through PATCH /work-orders/bulk.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.models import WorkOrder
+
+client = TestClient(app)
+URL = f"{settings.api_v1_prefix}/work-orders/bulk"
+
+
+@pytest.fixture
+def work_order_id():
+    response = client.post(URL, json={"records": [{"title": "Replace seal"}]})
+    assert response.status_code == 201, response.text
+    work_order_id = response.json()["results"][0]["id"]
+    response = client.patch(URL, json={"records": [{"id": work_order_id, "start_date": "2025-05-10T08:00:00"}]})
+    assert response.status_code == 200, response.text
+    return work_order_id
+
+
+def errors(record: dict) -> list:
+    response = client.patch(URL, json={"records": [record]})
+    assert response.status_code == 400, response.text
+    return response.json()["detail"]["results"][0]["errors"]
+
+
+@pytest.mark.parametrize("field", ["status", "priority"])
+def test_null_status_and_priority_are_rejected(db, work_order_id, field):
+    assert errors({"id": work_order_id, field: None}) == [f"{field}: must not be empty"]
+    row = db.get(WorkOrder, work_order_id)
+    assert (row.status, row.priority) == ("open", "medium")
+
+
+def test_one_date_is_checked_against_the_stored_other(work_order_id):
+    assert errors({"id": work_order_id, "end_date": "2025-05-09T08:00:00"}) == ["end_date: before start_date"]
+
+    response = client.patch(URL, json={"records": [{"id": work_order_id, "end_date": "2025-05-10T12:00:00"}]})
+    assert response.status_code == 200, response.text
+    assert errors({"id": work_order_id, "start_date": "2025-05-11T08:00:00"}) == ["end_date: before start_date"]
@@ -0,0 +1,106 @@
+"""
+Work order numbers handed out from many threads, and by several allocators standing in for
+separate processes, never collide. The counter tests also run on PostgreSQL when
+TEST_POSTGRES_URL points at a database they may create a scratch schema in.
+"""
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.exc import OperationalError
+
+from app.db.session import Base, SessionLocal, engine
+from app.models.work_order import WorkOrder
+from app.services import work_order_numbers
+from app.services.work_order_bulk import insert_work_orders
+from app.services.work_order_numbers import WorkOrderNumberAllocator
+
+THREADS = 16
+YEAR = 2030
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def bind(request, monkeypatch):
+    """The engine the allocator reserves blocks on"""
+    if request.param == "sqlite":
+        yield engine
+        return
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    admin = create_engine(url)
+    try:
+        with admin.begin() as connection:
+            connection.execute(text(f"CREATE SCHEMA {schema}"))
+    except OperationalError as e:
+        pytest.skip(f"PostgreSQL is not reachable: {e}")
+    postgres = create_engine(url, connect_args={"options": f"-csearch_path={schema}"})
+    try:
+        Base.metadata.create_all(postgres)
+        monkeypatch.setattr(work_order_numbers, "engine", postgres)
+        yield postgres
+    finally:
+        postgres.dispose()
+        with admin.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        admin.dispose()
+
+
+def _issue(bind, numbers):
+    """Work orders with these numbers, as if issued before the counter existed"""
+    with bind.begin() as connection:
+        connection.execute(insert(WorkOrder), [
+            {"work_order_number": number, "title": "Legacy", "requested_date": datetime(YEAR, 1, 1)}
+            for number in numbers
+        ])
+
+
+def test_counter_starts_after_numeric_numbers_only(bind):
+    _issue(bind, [f"WO-{YEAR}-0041", f"WO-{YEAR}-001A", f"WO-{YEAR}-", f"WO-{YEAR - 1}-0900"])
+
+    assert WorkOrderNumberAllocator().allocate(2, year=YEAR) == [f"WO-{YEAR}-0042", f"WO-{YEAR}-0043"]
+
+
+def test_allocate_from_many_threads_is_unique(bind):
+    # Small blocks so the threads keep reserving new ones, from four allocators sharing one counter
+    allocators = [WorkOrderNumberAllocator(block_size=7) for _ in range(4)]
+
+    def allocate(thread: int):
+        allocator = allocators[thread % len(allocators)]
+        return [number for count in (1, 3, 10) * 25 for number in allocator.allocate(count, year=YEAR)]
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        numbers = [number for batch in pool.map(allocate, range(THREADS)) for number in batch]
+
+    assert len(numbers) == THREADS * 25 * 14
+    assert len(set(numbers)) == len(numbers)
+    assert all(number.startswith(f"WO-{YEAR}-") for number in numbers)
+    assert min(int(number.rsplit("-", 1)[1]) for number in numbers) == 1
+
+
+def test_insert_work_orders_from_many_threads_is_unique(monkeypatch):
+    monkeypatch.setattr("app.services.work_order_numbers.allocator", WorkOrderNumberAllocator(block_size=5))
+
+    def insert(thread: int):
+        db = SessionLocal()
+        try:
+            created = []
+            for batch in range(25):
+                created += insert_work_orders(db, [{"title": f"Thread {thread} batch {batch} #{i}"} for i in range(8)])
+                db.commit()
+            return created
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        created = [row for rows in pool.map(insert, range(THREADS)) for row in rows]
+
+    numbers = [number for _, number in created]
+    assert len(numbers) == THREADS * 25 * 8
+    assert len(set(numbers)) == len(numbers)
+    with SessionLocal() as db:
+        assert db.scalar(select(func.count(func.distinct(WorkOrder.work_order_number)))) == len(numbers)